@@ -2,26 +2,31 @@ from __future__ import annotations
 import os
 from pathlib import Path
 import time
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import NamedTuple, Optional
 import logging
 import sys
 import re
 import html
-import urllib.request
-import urllib.error
+import zlib
 
 from fastapi import FastAPI, HTTPException, Request, Query
-from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import ORJSONResponse, Response, HTMLResponse, PlainTextResponse, FileResponse
+from fastapi.responses import ORJSONResponse, Response, HTMLResponse, PlainTextResponse, FileResponse, StreamingResponse
 import json
+import orjson
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
 from .config_loader import ConfigLoader
+from .events import VersionEvents, close_on_exit_signals
 from .indexer import DocsIndexer
-from .models import Health, PostPage, PageMeta, PostManifest, PostChunk, PostMeta
+from .models import Health, PostPage, PageMeta, PostManifest, PostChunk, PostMeta, HashedChunk
+from .response_cache import ResponseCache, etag_for_bytes
+from .search_push import BAIDU_BATCH_LIMIT, BING_BATCH_LIMIT, SearchPushQueue, baidu_payload, bing_payload
+from .shared_index import SharedIndex
+from .static_assets import AssetManifest
 
 ROOT = Path(__file__).resolve().parent.parent
 
@@ -31,6 +36,9 @@ def _env_path(var_name: str, default_path: Path) -> Path:
       - BLOG_DOCS_DIR
       - BLOG_PUBLIC_DIR
       - BLOG_CONFIG_PATH
+      - BLOG_RENDER_CACHE_DIR
+      - BLOG_LQIP_CACHE_DIR
+      - BLOG_ASSET_CACHE_DIR
     """
     val = os.environ.get(var_name)
     if val:
@@ -43,10 +51,32 @@ def _env_path(var_name: str, default_path: Path) -> Path:
 DOCS_DIR = _env_path("BLOG_DOCS_DIR", ROOT / "docs")
 PUBLIC_DIR = _env_path("BLOG_PUBLIC_DIR", ROOT / "public")
 CONFIG_PATH = _env_path("BLOG_CONFIG_PATH", ROOT / "config.json")
-
-# 配置日志：控制台输出 INFO 以上，run.log 只记录 FATAL
-root_logger = logging.getLogger()
-if not root_logger.handlers:
+# 渲染缓存目录；设置 BLOG_RENDER_CACHE=0 可关闭
+RENDER_CACHE_DIR: Optional[Path] = _env_path("BLOG_RENDER_CACHE_DIR", ROOT / ".cache" / "render")
+if (os.environ.get("BLOG_RENDER_CACHE") or "1").strip().lower() in ("0", "false", "off", "no"):
+    RENDER_CACHE_DIR = None
+
+# 图片 LQIP/尺寸缓存目录（按 图片路径+mtime+size 寻址）；设置 BLOG_LQIP_CACHE=0 可关闭
+LQIP_CACHE_DIR: Optional[Path] = _env_path("BLOG_LQIP_CACHE_DIR", ROOT / ".cache" / "lqip")
+if (os.environ.get("BLOG_LQIP_CACHE") or "1").strip().lower() in ("0", "false", "off", "no"):
+    LQIP_CACHE_DIR = None
+# 内存中保留的 LQIP 条数（LRU）
+try:
+    LQIP_MEMORY_ITEMS = max(0, int(os.environ.get("BLOG_LQIP_MEMORY_ITEMS") or 4096))
+except ValueError:
+    LQIP_MEMORY_ITEMS = 4096
+
+# 静态资源预压缩变体的缓存目录（按内容哈希寻址）；设置 BLOG_ASSET_CACHE=0 时只保存在内存中
+ASSET_CACHE_DIR: Optional[Path] = _env_path("BLOG_ASSET_CACHE_DIR", ROOT / ".cache" / "assets")
+if (os.environ.get("BLOG_ASSET_CACHE") or "1").strip().lower() in ("0", "false", "off", "no"):
+    ASSET_CACHE_DIR = None
+
+
+def _setup_logging() -> None:
+    # 配置日志：控制台输出 INFO 以上，run.log 只记录 FATAL
+    root_logger = logging.getLogger()
+    if root_logger.handlers:
+        return
     console = logging.StreamHandler(sys.stdout)
     console.setLevel(logging.INFO)
     console.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s"))
@@ -59,7 +89,20 @@ if not root_logger.handlers:
     root_logger.addHandler(console)
     root_logger.addHandler(fatal_handler)
 
-app = FastAPI(title="Markdown Blog", default_response_class=ORJSONResponse)
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    # 导入本模块只构建各组件；扫描、文件监听、共享索引与退出信号处理在服务启动时才开始
+    # （静态导出等一次性任务导入本模块时不会启动它们）
+    _setup_logging()
+    start_services()
+    try:
+        yield
+    finally:
+        stop_services()
+
+
+app = FastAPI(title="Markdown Blog", default_response_class=ORJSONResponse, lifespan=_lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -69,16 +112,153 @@ app.add_middleware(
 )
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
-indexer = DocsIndexer(DOCS_DIR, PUBLIC_DIR)
-indexer.start_watch()
+def _env_workers(var_name: str, default: int = 1) -> int:
+    """解析进程数配置：数字，或 auto（按 CPU 核数）。"""
+    val = (os.environ.get(var_name) or "").strip().lower()
+    if not val:
+        return default
+    if val == "auto":
+        # 容器内优先按可用 CPU 亲和性计算
+        try:
+            return max(1, len(os.sched_getaffinity(0)))
+        except AttributeError:
+            return os.cpu_count() or 1
+    try:
+        return max(1, int(val))
+    except ValueError:
+        return default
+
+
+INDEX_WORKERS = _env_workers("BLOG_INDEX_WORKERS")
+# 索引时预压缩文章/分块响应体；安装 brotli 包后同时生成 br 变体
+PRECOMPRESS = (os.environ.get("BLOG_PRECOMPRESS") or "1").strip().lower() not in ("0", "false", "off", "no")
+
+# 文件变更防抖窗口（毫秒）：一次保存/git pull 产生的多个事件合并为一批处理
+try:
+    WATCH_DEBOUNCE = max(0.0, float(os.environ.get("BLOG_WATCH_DEBOUNCE_MS") or 300) / 1000.0)
+except ValueError:
+    WATCH_DEBOUNCE = 0.3
 
-config_loader = ConfigLoader(CONFIG_PATH)
-config_loader.start_watch()
+# 懒渲染：启动时只解析 frontmatter，正文在首次访问时渲染并放入限额 LRU（BLOG_LAZY_CACHE_MB，默认 64）
+LAZY_RENDER = (os.environ.get("BLOG_LAZY_RENDER") or "0").strip().lower() in ("1", "true", "on", "yes")
+try:
+    LAZY_CACHE_BYTES = max(0, int(float(os.environ.get("BLOG_LAZY_CACHE_MB") or 64) * 1024 * 1024))
+except ValueError:
+    LAZY_CACHE_BYTES = 64 * 1024 * 1024
 
-app.mount("/static", StaticFiles(directory=str(PUBLIC_DIR)), name="static")
+# 多进程共享索引（uvicorn --workers N）：设置 BLOG_SHARED_INDEX 为快照文件路径后，由一个进程构建并写出快照，
+# 其余进程 mmap 只读装载；BLOG_SHARED_INDEX_ROLE=reader 时本进程从不构建（快照由其他进程负责）
+_shared_path = (os.environ.get("BLOG_SHARED_INDEX") or "").strip()
+SHARED_INDEX_PATH: Optional[Path] = Path(_shared_path).resolve() if _shared_path else None
+SHARED_INDEX_READER = (os.environ.get("BLOG_SHARED_INDEX_ROLE") or "auto").strip().lower() == "reader"
+if SHARED_INDEX_PATH is not None and not SharedIndex.supported():
+    logging.getLogger(__name__).warning("BLOG_SHARED_INDEX requires flock; each process builds its own index")
+    SHARED_INDEX_PATH = None
 
-# Build tag for static cache-busting (helps clients/CDN fetch the latest app.js/app.css)
-BUILD_TAG = os.environ.get("BLOG_BUILD_TAG") or str(int(time.time()))
+
+class SiteComponents(NamedTuple):
+    indexer: DocsIndexer
+    config_loader: ConfigLoader
+    assets: AssetManifest
+
+
+def create_components() -> SiteComponents:
+    """按上述环境变量构建文章索引、站点配置与静态资源指纹表：不扫描文章，不启动文件监听或共享索引。
+
+    服务进程在 start_services() 中扫描（或装载共享索引）并开始监听；静态导出只调用 scan_all()。
+    """
+    docs = DocsIndexer(DOCS_DIR, PUBLIC_DIR, cache_dir=RENDER_CACHE_DIR, scan_workers=INDEX_WORKERS,
+                       precompress=PRECOMPRESS, watch_debounce=WATCH_DEBOUNCE,
+                       lqip_cache_dir=LQIP_CACHE_DIR, lqip_background=True,
+                       lazy=LAZY_RENDER, lazy_cache_bytes=LAZY_CACHE_BYTES,
+                       auto_scan=False, lqip_memory_items=LQIP_MEMORY_ITEMS)
+    # 静态资源指纹：外壳中的 /static/<rel> 改写为 /static/<name>.<hash>.<ext>，该地址的内容永不变化，可长期缓存
+    manifest = AssetManifest(PUBLIC_DIR, cache_dir=ASSET_CACHE_DIR, precompress=PRECOMPRESS)
+    manifest.build()
+    return SiteComponents(docs, ConfigLoader(CONFIG_PATH), manifest)
+
+
+indexer, config_loader, assets = create_components()
+shared_index: Optional[SharedIndex] = None
+
+# 版本变更推送（SSE）：取代前端对 /api/version 的轮询
+version_events = VersionEvents(lambda: {"docsVersion": indexer.version, "configVersion": config_loader.version})
+# 单批变更的 slug 超过该数量时不再逐个列出（changed/removed 为 null），客户端按整体变更处理
+MAX_EVENT_SLUGS = 200
+
+
+def _on_docs_version(version: int, changed: list[str], removed: list[str]) -> None:
+    many = len(changed) + len(removed) > MAX_EVENT_SLUGS
+    version_events.publish("docs", {
+        "docsVersion": version,
+        "configVersion": config_loader.version,
+        "changed": None if many else changed,
+        "removed": None if many else removed,
+    })
+
+
+indexer.add_listener(_on_docs_version)
+config_loader.add_listener(lambda version: version_events.publish("config", {"docsVersion": indexer.version, "configVersion": version}))
+
+
+def start_services() -> None:
+    """服务进程启动：全量扫描（或装载/构建共享索引）并开始监听 docs、配置与 public/ 的变化。"""
+    global shared_index
+    if SHARED_INDEX_PATH is None:
+        indexer.scan_all()
+        indexer.start_watch()
+    else:
+        shared_index = SharedIndex(indexer, SHARED_INDEX_PATH, reader_only=SHARED_INDEX_READER)
+        shared_index.start()
+    config_loader.start_watch()
+    assets.start_watch()
+    close_on_exit_signals(version_events.close)
+
+
+def stop_services() -> None:
+    if shared_index is not None:
+        # 构建者写出尚未写出的变化
+        shared_index.stop()
+    indexer.stop_watch()
+    config_loader.stop_watch()
+    assets.stop_watch()
+
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+
+class FingerprintedStaticFiles(StaticFiles):
+    """指纹地址按内容哈希返回 immutable 响应并直接发送预压缩变体；其余路径与 StaticFiles 相同。"""
+
+    async def get_response(self, path: str, scope) -> Response:
+        asset = assets.resolve(Path(path).as_posix())
+        if asset is None:
+            return await super().get_response(path, scope)
+        request = Request(scope)
+        accepted = _preferred_encodings(request)
+        enc: Optional[str] = None
+        variant = None
+        for candidate in accepted:
+            variant = assets.variant(asset, candidate)
+            if variant is not None:
+                enc = candidate
+                break
+        # 每种编码一个强 ETag；原文件可能被 GZipMiddleware 即时压缩，客户端接受压缩时只能给弱 ETag
+        etag = asset.etag(enc) if enc or not accepted else "W/" + asset.etag()
+        headers = {"Cache-Control": IMMUTABLE_CACHE, "ETag": etag, "Vary": "Accept-Encoding"}
+        not_modified = _maybe_304(request, etag, headers)
+        if not_modified is not None:
+            return not_modified
+        if enc is not None:
+            headers["Content-Encoding"] = enc
+            if isinstance(variant, Path):
+                return FileResponse(variant, media_type=asset.media_type, headers=headers)
+            return Response(variant, media_type=asset.media_type, headers=headers)
+        # 变体尚未生成：发送原文件，由 GZipMiddleware 按需压缩
+        return FileResponse(PUBLIC_DIR / asset.rel, media_type=asset.media_type, headers=headers)
+
+
+app.mount("/static", FingerprintedStaticFiles(directory=str(PUBLIC_DIR)), name="static")
 
 SITE_ORIGIN = (os.environ.get("BLOG_SITE_ORIGIN") or "http://localhost:8000").rstrip('/')
 
@@ -99,81 +279,105 @@ elif not BING_PUSH_ENDPOINT:
     BING_PUSH_ENDPOINT = ""
 BING_SITE_URL = (os.environ.get("BING_SITE_URL") or SITE_ORIGIN)
 
-
-def _maybe_304(request: Request, etag: Optional[str]) -> Optional[Response]:
+# 搜索引擎推送的批量等待窗口（毫秒）与去重时长（小时，期间同一 URL 只推送一次）
+try:
+    PUSH_BATCH_DELAY = max(0.0, float(os.environ.get("BLOG_PUSH_BATCH_DELAY_MS") or 2000) / 1000.0)
+except ValueError:
+    PUSH_BATCH_DELAY = 2.0
+try:
+    PUSH_DEDUP_TTL = max(0.0, float(os.environ.get("BLOG_PUSH_DEDUP_HOURS") or 24) * 3600.0)
+except ValueError:
+    PUSH_DEDUP_TTL = 86400.0
+
+push_queues: dict[str, SearchPushQueue] = {}
+if BAIDU_PUSH_ENDPOINT:
+    push_queues["baidu"] = SearchPushQueue("baidu", BAIDU_PUSH_ENDPOINT, baidu_payload, BAIDU_BATCH_LIMIT,
+                                           batch_delay=PUSH_BATCH_DELAY, dedup_ttl=PUSH_DEDUP_TTL)
+if BING_PUSH_ENDPOINT and BING_SITE_URL:
+    push_queues["bing"] = SearchPushQueue("bing", BING_PUSH_ENDPOINT, bing_payload(BING_SITE_URL), BING_BATCH_LIMIT,
+                                          batch_delay=PUSH_BATCH_DELAY, dedup_ttl=PUSH_DEDUP_TTL)
+
+
+def _maybe_304(request: Request, etag: Optional[str], headers: Optional[dict] = None) -> Optional[Response]:
     if not etag:
         return None
     inm = request.headers.get("if-none-match")
     if inm and etag in inm:
-        return Response(status_code=304)
+        return Response(status_code=304, headers={"ETag": etag, **(headers or {})})
     return None
 
 
+def _preferred_encodings(request: Request) -> list[str]:
+    """按服务端偏好（br > gzip）返回客户端可接受的压缩编码。"""
+    header = (request.headers.get("accept-encoding") or "").lower()
+    accepted: set[str] = set()
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(token)
+    return [enc for enc in ("br", "gzip") if enc in accepted or "*" in accepted]
+
+
+def _flushing_stream(request: Request, parts, media_type: str, headers: dict) -> StreamingResponse:
+    """流式响应：每一段产出后立即送达客户端。
+
+    GZipMiddleware 对流式响应不做 flush，压缩数据会滞留到结束；客户端接受 gzip 时这里自行压缩，
+    每段后 Z_SYNC_FLUSH。设置了 Content-Encoding 的响应中间件会原样透传。
+    """
+    if "gzip" not in _preferred_encodings(request):
+        return StreamingResponse(parts, media_type=media_type, headers=headers)
+
+    async def compressed():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        async for part in parts:
+            yield compressor.compress(part) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+    return StreamingResponse(compressed(), media_type=media_type,
+                             headers={**headers, "Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+
+
+def _precompressed_response(request: Request, lookup, headers: dict) -> Optional[Response]:
+    """若索引中有客户端可接受的预压缩变体，直接返回，绕过 GZipMiddleware 的逐请求压缩。"""
+    for enc in _preferred_encodings(request):
+        body = lookup(enc)
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers={
+                **headers,
+                "Content-Encoding": enc,
+                "Vary": "Accept-Encoding",
+            })
+    return None
+
+
+# /api/posts 响应缓存：(q, page, pageSize, paged) -> (已序列化的 JSON, ETag)，docs 版本变化时整体失效
+_posts_cache: ResponseCache[tuple[bytes, str]] = ResponseCache(maxsize=512)
+
+
 class PushPayload(BaseModel):
     url: str
 
 
 def _push_to_search_engines(url: str) -> dict:
+    """URL 放入各引擎的后台推送队列，立即返回入队结果（不等待推送完成）。"""
     result: dict[str, dict] = {}
-    if BAIDU_PUSH_ENDPOINT:
-        result["baidu"] = _push_baidu([url])
-    else:
-        result["baidu"] = {"ok": False, "skipped": True, "reason": "BAIDU endpoint missing"}
-    if BING_PUSH_ENDPOINT and BING_SITE_URL:
-        result["bing"] = _push_bing([url])
-    else:
-        result["bing"] = {"ok": False, "skipped": True, "reason": "Bing endpoint missing"}
+    for name, reason in (("baidu", "BAIDU endpoint missing"), ("bing", "Bing endpoint missing")):
+        queue = push_queues.get(name)
+        result[name] = queue.submit(url) if queue else {"ok": False, "skipped": True, "reason": reason}
     return result
 
 
-def _push_baidu(urls: list[str]) -> dict:
-    payload = "\n".join(urls).encode("utf-8")
-    req = urllib.request.Request(
-        BAIDU_PUSH_ENDPOINT,
-        data=payload,
-        headers={"Content-Type": "text/plain"},
-        method="POST",
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            raw = resp.read().decode("utf-8", "ignore")
-            try:
-                body = json.loads(raw) if raw else {}
-            except Exception:
-                body = {"raw": raw}
-            return {"ok": True, "status": resp.status, "body": body}
-    except urllib.error.HTTPError as exc:
-        raw = exc.read().decode("utf-8", "ignore")
-        return {"ok": False, "status": exc.code, "body": raw or exc.reason}
-    except Exception as exc:
-        return {"ok": False, "error": str(exc)}
-
-
-def _push_bing(urls: list[str]) -> dict:
-    payload = json.dumps({"siteUrl": BING_SITE_URL, "urlList": urls}).encode("utf-8")
-    req = urllib.request.Request(
-        BING_PUSH_ENDPOINT,
-        data=payload,
-        headers={"Content-Type": "application/json; charset=utf-8"},
-        method="POST",
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            raw = resp.read().decode("utf-8", "ignore")
-            parsed = None
-            if raw:
-                try:
-                    parsed = json.loads(raw)
-                except Exception:
-                    parsed = raw
-            return {"ok": True, "status": resp.status, "body": parsed}
-    except urllib.error.HTTPError as exc:
-        raw = exc.read().decode("utf-8", "ignore")
-        return {"ok": False, "status": exc.code, "body": raw or exc.reason}
-    except Exception as exc:
-        return {"ok": False, "error": str(exc)}
-
-
 @app.get("/api/health", response_model=Health)
 async def health() -> Health:
     return Health(status="ok", docsVersion=indexer.version, configVersion=config_loader.version)
@@ -184,6 +388,33 @@ async def version():
     return {"docsVersion": indexer.version, "configVersion": config_loader.version}
 
 
+@app.get("/api/events")
+async def events(request: Request):
+    """SSE：连接时先发 hello（当前版本号），之后每次 docs/config 版本变化推送一条事件。
+
+    docs 事件附带 changed/removed slug 列表（不含 hidden 文章）；断线重连时按 Last-Event-ID 补发。
+    """
+    stream = version_events.stream(request.headers.get("last-event-id"))
+    # X-Accel-Buffering：禁止 nginx 缓冲事件流
+    return _flushing_stream(request, stream, "text/event-stream", {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/api/stats/indexer")
+async def indexer_stats():
+    # 启动扫描耗时与文件变更队列指标（队列深度、延迟、最近一批）
+    scan = {k: v for k, v in indexer.scan_stats.items() if k != "per_file_ms"}
+    return ORJSONResponse({
+        "docsVersion": indexer.version,
+        "scan": scan,
+        "watch": indexer.watch_stats(),
+        "memory": indexer.memory_stats(),
+        "events": version_events.stats(),
+        "shared": shared_index.stats() if shared_index is not None else None,
+        "assets": assets.stats(),
+        "push": {name: q.stats() for name, q in push_queues.items()},
+    }, headers={"Cache-Control": "no-store"})
+
+
 @app.get("/api/config")
 async def get_config(request: Request):
     cfg = config_loader.get()
@@ -208,17 +439,36 @@ async def list_posts(
     pageSize: int = Query(default=10, ge=1, le=2000),
     paged: bool = Query(default=False, description="为 true 时返回分页对象；否则按旧格式返回数组")
 ):
-    all_items = indexer.search_posts(q)
+    cache_key = (q, page, pageSize, paged)
+    docs_version = indexer.version
+    entry = _posts_cache.get(cache_key, docs_version)
+    if entry is None:
+        body = _build_posts_body(q, page, pageSize, paged)
+        entry = (body, etag_for_bytes(body))
+        _posts_cache.put(cache_key, docs_version, entry)
+    body, etag = entry
+    # 允许浏览器/CDN 存储，但每次需带 If-None-Match 回源校验
+    headers = {"Cache-Control": "no-cache", "ETag": etag}
+    not_modified = _maybe_304(request, etag, headers)
+    if not_modified is not None:
+        return not_modified
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _build_posts_body(q: Optional[str], page: int, pageSize: int, paged: bool) -> bytes:
     if not paged and q is None and page == 1:
         # 兼容旧格式：无搜索且第一页、未显式请求分页 -> 返回完整数组
-        items = [m.model_dump() for m in all_items]
-        return ORJSONResponse(items, headers={
-            "Cache-Control": "no-store"
-        })
-    total = len(all_items)
+        return orjson.dumps([m.model_dump() for m in indexer.list_posts()])
     start = (page - 1) * pageSize
     end = start + pageSize
-    page_items = all_items[start:end]
+    if not q:
+        # 无搜索：直接从预排序的 public 分区切出当前页
+        total = indexer.count_posts()
+        page_items = indexer.list_posts(offset=start, limit=pageSize)
+    else:
+        all_items = indexer.search_posts(q)
+        total = len(all_items)
+        page_items = all_items[start:end]
     total_pages = (total + pageSize - 1) // pageSize if pageSize else 1
     resp = PostPage(
         items=[m for m in page_items],
@@ -231,24 +481,31 @@ async def list_posts(
             hasNext=page < total_pages,
         )
     )
-    return ORJSONResponse(resp.model_dump(), headers={
-        "Cache-Control": "no-store"
-    })
+    return orjson.dumps(resp.model_dump())
+
+
+def _post_manifest(slug: str) -> Optional[PostManifest]:
+    mf = indexer.get_post_manifest(slug)
+    if not mf:
+        return None
+    meta, total, toc_html, chunk_types, ph_ids, chunk_hashes = mf
+    return PostManifest(
+        slug=meta.slug, title=meta.title, date=meta.date, tags=meta.tags,
+        summary=meta.summary, totalChunks=total, toc_html=toc_html or None,
+        chunk_types=chunk_types, ph_ids=ph_ids, chunk_hashes=chunk_hashes
+    )
 
 
 @app.get("/api/post/{slug}")
 async def get_post(slug: str, request: Request, chunked: bool | None = Query(default=False)):
     if chunked:
-        mf = indexer.get_post_manifest(slug)
-        if not mf:
+        pm = _post_manifest(slug)
+        if pm is None:
             raise HTTPException(status_code=404, detail="Post not found")
-        meta, total, toc_html, chunk_types, ph_ids = mf
-        pm = PostManifest(
-            slug=meta.slug, title=meta.title, date=meta.date, tags=meta.tags,
-            summary=meta.summary, totalChunks=total, toc_html=toc_html or None,
-            chunk_types=chunk_types, ph_ids=ph_ids
-        )
         return ORJSONResponse(pm.model_dump(), headers={"Cache-Control": "no-store"})
+    pre = _precompressed_response(request, lambda enc: indexer.get_post_encoded(slug, enc), {"Cache-Control": "no-store"})
+    if pre is not None:
+        return pre
     post = indexer.get_post(slug)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
@@ -257,12 +514,89 @@ async def get_post(slug: str, request: Request, chunked: bool | None = Query(def
     })
 
 @app.get("/api/post/{slug}/chunk/{index}")
-async def get_post_chunk(slug: str, index: int):
-    html = indexer.get_post_chunk(slug, index)
-    if html is None:
+async def get_post_chunk(slug: str, index: int, request: Request):
+    pre = _precompressed_response(request, lambda enc: indexer.get_chunk_encoded(slug, enc, index=index), {"Cache-Control": "no-store"})
+    if pre is not None:
+        return pre
+    payload = indexer.get_chunk_payload(slug, index=index)
+    if payload is None:
         raise HTTPException(status_code=404, detail="Chunk not found")
-    pc = PostChunk(slug=slug, index=index, html=html)
-    return ORJSONResponse(pc.model_dump(), headers={"Cache-Control": "no-store"})
+    return ORJSONResponse(PostChunk(**payload).model_dump(), headers={"Cache-Control": "no-store"})
+
+
+# 批量取块的 index 列表上限
+MAX_BATCH_CHUNKS = 1000
+
+
+@app.get("/api/post/{slug}/chunks")
+async def get_post_chunks(
+    slug: str,
+    request: Request,
+    start: int = Query(default=0, ge=0),
+    end: int | None = Query(default=None, ge=0, description="不含；缺省为最后一块"),
+    indices: str | None = Query(default=None, description="逗号分隔的块索引；指定时忽略 start/end"),
+    hashes: str | None = Query(default=None, description="逗号分隔的块内容哈希；指定时忽略 indices/start/end"),
+    stream: bool = Query(default=False, description="为 true 时以 NDJSON 逐块输出"),
+):
+    """一次请求获取多个分块：区间、索引列表或内容哈希列表。
+
+    普通模式返回 {"slug", "chunks": [{"slug", "index", "html"}, ...]}；
+    stream=true 时返回 application/x-ndjson，每行一个 {"slug", "index", "html"} 对象，按顺序逐块输出。
+    按 hashes 取块时每项另带 "hash"，且响应只由 URL 中的哈希决定，可与 /c/{digest} 一样长期缓存。
+    """
+    wanted: Optional[list[int]] = None
+    digests: Optional[list[str]] = None
+    if hashes is not None:
+        digests = [h for h in (x.strip() for x in hashes.split(",")) if h]
+        if len(digests) > MAX_BATCH_CHUNKS:
+            raise HTTPException(status_code=400, detail=f"hashes 最多 {MAX_BATCH_CHUNKS} 个")
+    elif indices is not None:
+        try:
+            wanted = [int(x) for x in indices.split(",") if x.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="indices 须为逗号分隔的整数")
+        if len(wanted) > MAX_BATCH_CHUNKS:
+            raise HTTPException(status_code=400, detail=f"indices 最多 {MAX_BATCH_CHUNKS} 个")
+    found = indexer.get_post_chunks(slug, indices=wanted, start=start, end=end, hashes=digests)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Chunk not found")
+    selected, chunk_at = found
+    if digests is not None:
+        headers = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+        def item(n: int, i: int) -> dict:
+            return {"slug": slug, "index": i, "hash": digests[n], "html": chunk_at(i)}
+    else:
+        headers = {"Cache-Control": "no-store"}
+
+        def item(n: int, i: int) -> dict:
+            return {"slug": slug, "index": i, "html": chunk_at(i)}
+    if not stream:
+        # 直接序列化，不逐块构造 PostChunk 模型
+        body = orjson.dumps({"slug": slug, "chunks": [item(n, i) for n, i in enumerate(selected)]})
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def lines():
+        for n, i in enumerate(selected):
+            yield orjson.dumps(item(n, i)) + b"\n"
+
+    return _flushing_stream(request, lines(), "application/x-ndjson", headers)
+
+
+@app.get("/api/post/{slug}/c/{digest}")
+async def get_post_chunk_by_hash(slug: str, digest: str, request: Request):
+    # 内容寻址：同一 URL 的内容永不变化，可被浏览器/CDN 长期缓存
+    payload = indexer.get_chunk_payload(slug, digest=digest)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Chunk not found")
+    headers = {"Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{digest}"'}
+    not_modified = _maybe_304(request, f'"{digest}"', headers)
+    if not_modified is not None:
+        return not_modified
+    pre = _precompressed_response(request, lambda enc: indexer.get_chunk_encoded(slug, enc, digest=digest), headers)
+    if pre is not None:
+        return pre
+    return ORJSONResponse(HashedChunk(**payload).model_dump(), headers=headers)
 
 
 @app.post("/api/push")
@@ -276,39 +610,57 @@ async def push_url(payload: PushPayload):
     if SITE_ORIGIN and not url.startswith(SITE_ORIGIN) and not is_local:
         raise HTTPException(status_code=400, detail="仅允许推送本站链接")
     
-    result = await run_in_threadpool(lambda: _push_to_search_engines(url))
+    result = _push_to_search_engines(url)
     return ORJSONResponse(result, headers={"Cache-Control": "no-store"})
 
 
 
+# 统计类接口缓存：docs 版本变化时失效；热力图另按当天区分（统计窗口随日期滑动）
+_stats_cache: ResponseCache[tuple[bytes, str]] = ResponseCache(maxsize=8)
+
+
+def _cached_stats_response(request: Request, key, build, cache_control: str) -> Response:
+    docs_version = indexer.version
+    entry = _stats_cache.get(key, docs_version)
+    if entry is None:
+        body = orjson.dumps(build(), option=orjson.OPT_NON_STR_KEYS)
+        entry = (body, etag_for_bytes(body))
+        _stats_cache.put(key, docs_version, entry)
+    body, etag = entry
+    headers = {"Cache-Control": cache_control, "ETag": etag}
+    not_modified = _maybe_304(request, etag, headers)
+    if not_modified is not None:
+        return not_modified
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @app.get("/api/stats/post_activity")
-async def get_post_activity():
-    from datetime import datetime, timedelta
+async def get_post_activity(request: Request):
+    from datetime import date
+
+    # We only care about the last year of activity; cal-heatmap prefers unix timestamps in seconds
+    since = time.time() - 365 * 86400
+    return _cached_stats_response(
+        request, ("activity", date.today().toordinal()),
+        lambda: indexer.post_activity(since), "public, max-age=3600",
+    )
+
+
+@app.get("/api/tags")
+async def get_tags(request: Request):
+    # 标签 -> 文章数与 slug 列表（新->旧），仅统计 public 文章
+    return _cached_stats_response(request, "tags", indexer.tag_stats, "no-cache")
 
-    posts = indexer._sorted_posts(metas_only=True)
-    
-    # We only care about the last year of activity
-    one_year_ago = datetime.now() - timedelta(days=365)
-    
-    activity = {}
-    for post in posts:
-        if not post.date:
-            continue
-        try:
-            # Assuming date is in ISO format like '2023-10-27T10:00:00Z' or just '2023-10-27'
-            post_date = datetime.fromisoformat(post.date.replace('Z', '+00:00'))
-            if post_date > one_year_ago:
-                # cal-heatmap prefers unix timestamps in seconds
-                timestamp = int(post_date.timestamp())
-                day_start_timestamp = timestamp - (timestamp % 86400) # Floor to the start of the day
-                activity[day_start_timestamp] = activity.get(day_start_timestamp, 0) + 1
-        except (ValueError, TypeError):
-            continue
-            
-    return ORJSONResponse(activity, headers={"Cache-Control": "public, max-age=3600"})
 
+@app.get("/api/archive")
+async def get_archive(request: Request):
+    # 年/月归档（新->旧），仅统计 public 文章
+    return _cached_stats_response(request, "archive", indexer.archive_stats, "no-cache")
 
-def _inject_site_config(html_text: str, request: Optional[Request] = None, post_meta: Optional[PostMeta] = None) -> str:
+
+def _inject_site_config(html_text: str, request: Optional[Request] = None, post_meta: Optional[PostMeta] = None,
+                        base: Optional[str] = None) -> str:
+    # base：站点根 URL（无请求上下文时使用，如静态导出）；缺省时由 request 推导
     try:
         cfg = config_loader.get()
         payload = cfg.model_dump()
@@ -336,7 +688,7 @@ def _inject_site_config(html_text: str, request: Optional[Request] = None, post_
         page_meta_tags: list[str] = []
         if post_meta:
             html_text = _replace_title_with_post(html_text, site_name, post_meta)
-            page_meta_tags = _build_post_meta_tags(site_name, post_meta, request)
+            page_meta_tags = _build_post_meta_tags(site_name, post_meta, request, base)
 
         snippet = "\n".join([
             f"<script id=\"site-config\" type=\"application/json\">{cfg_json}</script>",
@@ -344,15 +696,8 @@ def _inject_site_config(html_text: str, request: Optional[Request] = None, post_
             *page_meta_tags,
         ])
 
-        def add_ver(s: str) -> str:
-            out = s
-            out = out.replace('/static/app.js"', f'/static/app.js?v={BUILD_TAG}"')
-            out = out.replace('/static/app.css"', f'/static/app.css?v={BUILD_TAG}"')
-            out = out.replace('/static/highlight.min.js"', f'/static/highlight.min.js?v={BUILD_TAG}"')
-            out = out.replace('/static/push.js"', f'/static/push.js?v={BUILD_TAG}"')
-            return out
-
-        html_text = add_ver(html_text)
+        # 静态资源引用改写为内容指纹地址（内容不变则地址不变，重启不会使客户端缓存失效）
+        html_text = assets.rewrite(html_text)
         if "</head>" in html_text:
             return html_text.replace("</head>", snippet + "\n</head>")
         if "</body>" in html_text:
@@ -380,7 +725,7 @@ def _replace_title_with_post(html_text: str, site_name: str, post_meta: PostMeta
     return replacement + html_text
 
 
-def _build_post_meta_tags(site_name: str, post_meta: PostMeta, request: Optional[Request]) -> list[str]:
+def _build_post_meta_tags(site_name: str, post_meta: PostMeta, request: Optional[Request], base: Optional[str] = None) -> list[str]:
     tags: list[str] = []
     summary = (post_meta.summary or "").strip()
     keywords = ", ".join([str(t) for t in (post_meta.tags or []) if str(t).strip()])
@@ -397,7 +742,10 @@ def _build_post_meta_tags(site_name: str, post_meta: PostMeta, request: Optional
         tags.append(f"<meta property=\"og:description\" content=\"{_escape_attr(og_desc)}\" data-page=\"post\" />")
 
     canonical_path = f"/post/{post_meta.slug}"
-    canonical = _build_abs(request, canonical_path) if request else canonical_path
+    if base:
+        canonical = base.rstrip('/') + canonical_path
+    else:
+        canonical = _build_abs(request, canonical_path) if request else canonical_path
     tags.append(f"<link rel=\"canonical\" href=\"{_escape_attr(canonical)}\" data-page=\"post\" />")
     tags.append(f"<meta property=\"og:url\" content=\"{_escape_attr(canonical)}\" data-page=\"post\" />")
 
@@ -407,13 +755,40 @@ def _build_post_meta_tags(site_name: str, post_meta: PostMeta, request: Optional
     return tags
 
 
-@app.get("/")
-async def home(request: Request):
+# 注入配置后的 index.html 外壳缓存：版本为 (index.html mtime, 配置版本, 静态资源指纹代数)。
+# 非文章页外壳不含文档内容，文档变化不使其失效；文章页外壳单独缓存，版本另加文档版本，
+# key 为 (slug, base_url)（canonical 依赖请求域名）
+_shell_cache: ResponseCache[bytes] = ResponseCache(maxsize=1)
+_post_shell_cache: ResponseCache[bytes] = ResponseCache(maxsize=1024)
+
+
+def _render_shell(request: Request, post_meta: Optional[PostMeta] = None) -> Optional[bytes]:
     index_html = PUBLIC_DIR / "index.html"
-    if index_html.exists():
+    try:
+        mtime = index_html.stat().st_mtime_ns
+    except OSError:
+        return None
+    if post_meta is not None:
+        cache = _post_shell_cache
+        version = (mtime, config_loader.version, assets.generation, indexer.version)
+        key = (post_meta.slug, str(request.base_url))
+    else:
+        cache = _shell_cache
+        version = (mtime, config_loader.version, assets.generation)
+        key = None
+    body = cache.get(key, version)
+    if body is None:
         text = index_html.read_text(encoding="utf-8")
-        text = _inject_site_config(text, request=request)
-        return HTMLResponse(text, headers={"Cache-Control": "no-cache, must-revalidate"})
+        body = _inject_site_config(text, request=request, post_meta=post_meta).encode("utf-8")
+        cache.put(key, version, body)
+    return body
+
+
+@app.get("/")
+async def home(request: Request):
+    body = _render_shell(request)
+    if body is not None:
+        return HTMLResponse(body, headers={"Cache-Control": "no-cache, must-revalidate"})
     return HTMLResponse("<h1>Markdown Blog</h1>")
 
 
@@ -424,75 +799,156 @@ def _build_abs(request: Request, path: str) -> str:
     return base + path
 
 
-@app.get("/robots.txt")
-async def robots(request: Request):
-    txt = "\n".join([
+def _robots_txt(base: str) -> str:
+    return "\n".join([
         "User-agent: *",
         "Allow: /",
-        f"Sitemap: {_build_abs(request, '/sitemap.xml')}"
+        f"Sitemap: {base.rstrip('/')}/sitemap.xml"
     ])
-    return PlainTextResponse(txt)
 
 
-@app.get("/sitemap.xml")
-async def sitemap(request: Request):
-    # 生成简易 sitemap：首页 + 文章
+@app.get("/robots.txt")
+async def robots(request: Request):
+    return PlainTextResponse(_robots_txt(str(request.base_url)))
+
+
+# 单个 sitemap 文件的 URL 上限（sitemaps.org 协议规定 50,000）；超出后 /sitemap.xml 变为 sitemap 索引
+SITEMAP_MAX_URLS = 50000
+_STREAM_CHUNK = 64 * 1024
+
+# sitemap/rss 缓存：值为 (包体, ETag, Last-Modified)
+_sitemap_cache: ResponseCache[tuple[bytes, str, str]] = ResponseCache(maxsize=64)
+_feed_cache: ResponseCache[tuple[bytes, str, str]] = ResponseCache(maxsize=16)
+
+
+def _xml_escape(s: str) -> str:
+    if not s:
+        return ""
+    return (s.replace("&", "&amp;")
+             .replace("<", "&lt;")
+             .replace(">", "&gt;")
+             .replace('"', "&quot;")
+             .replace("'", "&apos;"))
+
+
+def _iso_utc(ts: float) -> str:
+    from datetime import datetime, timezone
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _finish_xml(parts: list[str], last_ts: Optional[float]) -> tuple[bytes, str, str]:
+    import email.utils
+    body = "\n".join(parts).encode("utf-8")
+    last_modified = email.utils.formatdate(last_ts or time.time(), usegmt=True)
+    return body, etag_for_bytes(body), last_modified
+
+
+async def _aiter_bytes(body: bytes):
+    view = memoryview(body)
+    for i in range(0, len(view), _STREAM_CHUNK):
+        yield bytes(view[i:i + _STREAM_CHUNK])
+
+
+def _xml_response(request: Request, doc: tuple[bytes, str, str]) -> Response:
+    body, etag, last_modified = doc
+    headers = {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": "public, max-age=300"}
+    not_modified = _maybe_304(request, etag, headers)
+    if not_modified is not None:
+        return not_modified
+    # 缓存的包体按块流式写出，避免一次性写入大文档
+    return StreamingResponse(_aiter_bytes(body), media_type="application/xml",
+                             headers={**headers, "Content-Length": str(len(body))})
+
+
+def _sitemap_url_entries(base: str, start: int, end: int) -> list[str]:
+    """生成第 [start, end) 个 URL 的 <url> 片段；第 0 个为首页，其余为文章。"""
     from datetime import datetime
-    def xmlesc(s: str) -> str:
-        return (s.replace("&", "&amp;")
-                 .replace("<", "&lt;")
-                 .replace(">", "&gt;")
-                 .replace('"', "&quot;")
-                 .replace("'", "&apos;"))
-
-    urls = []
-    # 首页
-    urls.append({
-        "loc": _build_abs(request, "/"),
-        "lastmod": datetime.utcfromtimestamp(indexer.version or int(time.time())).strftime('%Y-%m-%dT%H:%M:%SZ'),
-        "changefreq": "daily",
-        "priority": "1.0",
-    })
+    parts: list[str] = []
+    now = _iso_utc(time.time())
+    if start == 0:
+        last = indexer.last_modified()
+        parts.append("  <url>")
+        parts.append(f"    <loc>{_xml_escape(base + '/')}</loc>")
+        parts.append(f"    <lastmod>{_iso_utc(last) if last else now}</lastmod>")
+        parts.append("    <changefreq>daily</changefreq>")
+        parts.append("    <priority>1.0</priority>")
+        parts.append("  </url>")
     # 文章（注意：前端为 hash 路由，站点仍列出 #/post/slug，实际抓取依赖于搜索引擎执行 JS）
-    for meta in indexer.list_posts():
-        slug = meta.slug
-        # 使用 hash 路由形式
-        loc = _build_abs(request, f"/#/post/{slug}")
-        last = meta.date or None
-        if last:
+    offset = max(0, start - 1)
+    for meta in indexer.list_posts(offset=offset, limit=max(0, end - 1 - offset)):
+        loc = f"{base}/#/post/{meta.slug}"
+        if meta.date:
             try:
                 # 标准化时间格式
-                dt = datetime.fromisoformat(last.replace('Z','+00:00'))
-                lastmod = dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+                dt = datetime.fromisoformat(meta.date.replace('Z', '+00:00'))
+                lastmod: Optional[str] = dt.strftime('%Y-%m-%dT%H:%M:%SZ')
             except Exception:
                 lastmod = None
         else:
             # 退化为当前时间
-            lastmod = datetime.utcfromtimestamp(int(time.time())).strftime('%Y-%m-%dT%H:%M:%SZ')
-        urls.append({
-            "loc": loc,
-            "lastmod": lastmod,
-            "changefreq": "weekly",
-            "priority": "0.8",
-        })
-
+            lastmod = now
+        parts.append("  <url>")
+        parts.append(f"    <loc>{_xml_escape(loc)}</loc>")
+        if lastmod:
+            parts.append(f"    <lastmod>{lastmod}</lastmod>")
+        parts.append("    <changefreq>weekly</changefreq>")
+        parts.append("    <priority>0.8</priority>")
+        parts.append("  </url>")
+    return parts
+
+
+def _build_sitemap(base: str, page: Optional[int]) -> Optional[tuple[bytes, str, str]]:
+    total = 1 + indexer.count_posts()
+    pages = (total + SITEMAP_MAX_URLS - 1) // SITEMAP_MAX_URLS
+    last = indexer.last_modified()
+    if page is None and pages > 1:
+        parts = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        ]
+        lastmod = _iso_utc(last or time.time())
+        for n in range(1, pages + 1):
+            parts.append("  <sitemap>")
+            parts.append(f"    <loc>{_xml_escape(f'{base}/sitemap-{n}.xml')}</loc>")
+            parts.append(f"    <lastmod>{lastmod}</lastmod>")
+            parts.append("  </sitemap>")
+        parts.append("</sitemapindex>")
+        return _finish_xml(parts, last)
+    n = page or 1
+    if n < 1 or n > pages:
+        return None
+    start = (n - 1) * SITEMAP_MAX_URLS
     parts = [
         '<?xml version="1.0" encoding="UTF-8"?>',
         '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
     ]
-    for u in urls:
-        parts.append("  <url>")
-        parts.append(f"    <loc>{xmlesc(u['loc'])}</loc>")
-        if u.get('lastmod'):
-            parts.append(f"    <lastmod>{u['lastmod']}</lastmod>")
-        if u.get('changefreq'):
-            parts.append(f"    <changefreq>{u['changefreq']}</changefreq>")
-        if u.get('priority'):
-            parts.append(f"    <priority>{u['priority']}</priority>")
-        parts.append("  </url>")
+    parts.extend(_sitemap_url_entries(base, start, min(total, start + SITEMAP_MAX_URLS)))
     parts.append("</urlset>")
-    xml = "\n".join(parts)
-    return Response(content=xml, media_type="application/xml")
+    return _finish_xml(parts, last)
+
+
+def _cached_sitemap(request: Request, page: Optional[int]) -> Response:
+    base = str(request.base_url).rstrip('/')
+    docs_version = indexer.version
+    key = (base, page)
+    doc = _sitemap_cache.get(key, docs_version)
+    if doc is None:
+        doc = _build_sitemap(base, page)
+        if doc is None:
+            raise HTTPException(status_code=404)
+        _sitemap_cache.put(key, docs_version, doc)
+    return _xml_response(request, doc)
+
+
+@app.get("/sitemap.xml")
+async def sitemap(request: Request):
+    # 首页 + 文章；超过 SITEMAP_MAX_URLS 时返回 sitemap 索引，子 sitemap 为 /sitemap-N.xml
+    return _cached_sitemap(request, None)
+
+
+@app.get("/sitemap-{page:int}.xml")
+async def sitemap_page(page: int, request: Request):
+    return _cached_sitemap(request, page)
 
 
 @app.get("/manifest.json")
@@ -505,32 +961,18 @@ async def get_sw():
     return FileResponse(PUBLIC_DIR / "sw.js", media_type="application/javascript")
 
 
-@app.get("/feed")
-@app.get("/rss.xml")
-async def rss(request: Request):
+def _build_rss(site_url: str) -> tuple[bytes, str, str]:
     # 生成 RSS 2.0 Feed
     from datetime import datetime
     import email.utils
 
-    def xmlesc(s: str) -> str:
-        if not s: return ""
-        return (s.replace("&", "&amp;")
-                 .replace("<", "&lt;")
-                 .replace(">", "&gt;")
-                 .replace('"', "&quot;")
-                 .replace("'", "&apos;"))
-
     cfg = config_loader.get()
     site_name = cfg.siteName or "学术博客"
     site_desc = cfg.description or ""
-    site_url = str(request.base_url).rstrip('/')
 
     items = []
     for meta in indexer.list_posts():
-        slug = meta.slug
-        link = f"{site_url}/post/{slug}"
-        title = meta.title
-        desc = meta.summary or ""
+        link = f"{site_url}/post/{meta.slug}"
         pub_date = ""
         if meta.date:
             try:
@@ -538,27 +980,38 @@ async def rss(request: Request):
                 pub_date = email.utils.format_datetime(dt)
             except Exception:
                 pass
-        
         items.append(f"""
     <item>
-      <title>{xmlesc(title)}</title>
+      <title>{_xml_escape(meta.title)}</title>
       <link>{link}</link>
       <guid>{link}</guid>
-      <description>{xmlesc(desc)}</description>
+      <description>{_xml_escape(meta.summary or "")}</description>
       <pubDate>{pub_date}</pubDate>
     </item>""")
 
     rss_xml = f"""<?xml version="1.0" encoding="UTF-8" ?>
 <rss version="2.0">
   <channel>
-    <title>{xmlesc(site_name)}</title>
+    <title>{_xml_escape(site_name)}</title>
     <link>{site_url}</link>
-    <description>{xmlesc(site_desc)}</description>
+    <description>{_xml_escape(site_desc)}</description>
     <language>zh-cn</language>
     {"".join(items)}
   </channel>
 </rss>"""
-    return Response(content=rss_xml, media_type="application/xml")
+    return _finish_xml([rss_xml], indexer.last_modified())
+
+
+@app.get("/feed")
+@app.get("/rss.xml")
+async def rss(request: Request):
+    site_url = str(request.base_url).rstrip('/')
+    version = (indexer.version, config_loader.version)
+    doc = _feed_cache.get(site_url, version)
+    if doc is None:
+        doc = _build_rss(site_url)
+        _feed_cache.put(site_url, version, doc)
+    return _xml_response(request, doc)
 
 
 @app.get("/{full_path:path}")
@@ -571,9 +1024,7 @@ async def spa(full_path: str, request: Request):
         slug = full_path[len("post/"):]
         if slug:
             post_meta = indexer.get_post_meta(slug)
-    index_html = PUBLIC_DIR / "index.html"
-    if index_html.exists():
-        text = index_html.read_text(encoding="utf-8")
-        text = _inject_site_config(text, request=request, post_meta=post_meta)
-        return HTMLResponse(text, headers={"Cache-Control": "no-cache, must-revalidate"})
+    body = _render_shell(request, post_meta)
+    if body is not None:
+        return HTMLResponse(body, headers={"Cache-Control": "no-cache, must-revalidate"})
     raise HTTPException(status_code=404)
\ No newline at end of file
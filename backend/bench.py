@@ -0,0 +1,369 @@
+"""索引管线基准：生成可复现的合成 docs/ 目录，测量 DocsIndexer 各阶段耗时与峰值内存。
+
+用法：
+    python -m backend.bench --posts 500 --out bench.json
+    python -m backend.bench --posts 500 --compare bench.json   # 与上次结果对比
+
+结果以 JSON 输出，便于回归比较；同一 --seed 生成的语料逐字节一致。
+"""
+from __future__ import annotations
+import argparse
+import gc
+import itertools
+import json
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import frontmatter
+
+from .lqip import Image
+
+# 合成语料用的词库
+_EN_WORDS = (
+    "index render cache chunk stream latency throughput buffer python markdown server client "
+    "request response header static asset search token query archive feed sitemap worker thread "
+    "process memory snapshot version watch event batch queue image placeholder preview"
+).split()
+_CJK_TEXT = (
+    "博客系统在启动时扫描文章目录并渲染全部内容，随后通过文件监听增量更新索引。"
+    "搜索功能支持中文双字切分与英文前缀匹配，标签与归档页面由增量统计直接生成。"
+    "图片在正文中以占位符呈现，模糊预览先行展示，原图按需加载。"
+)
+_TAGS = ["Python", "性能", "前端", "随笔", "FastAPI", "Markdown", "缓存", "搜索", "部署", "读书"]
+
+# 1x1 PNG：未安装 Pillow 时使用
+_TINY_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+
+
+def _sentence(rng: random.Random, cjk_ratio: float) -> str:
+    if rng.random() < cjk_ratio:
+        start = rng.randrange(0, len(_CJK_TEXT) - 30)
+        return _CJK_TEXT[start:start + rng.randint(15, 30)] + "。"
+    words = [rng.choice(_EN_WORDS) for _ in range(rng.randint(6, 16))]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random, cjk_ratio: float) -> str:
+    return " ".join(_sentence(rng, cjk_ratio) for _ in range(rng.randint(2, 5)))
+
+
+def _block(rng: random.Random, opts: Dict[str, Any], images: List[str]) -> str:
+    kinds = ["p", "p", "p", "list", "h"]
+    if opts["code"]:
+        kinds.append("code")
+    if opts["math"]:
+        kinds.append("math")
+    if opts["mermaid"]:
+        kinds.append("mermaid")
+    if opts["tables"]:
+        kinds.append("table")
+    kind = rng.choice(kinds)
+    cjk = opts["cjk_ratio"]
+    if kind == "h":
+        return f"{'#' * rng.randint(2, 3)} {_sentence(rng, cjk).rstrip('.。')}"
+    if kind == "list":
+        ordered = rng.random() < 0.5
+        return "\n".join(f"{i + 1 if ordered else '-'}{'.' if ordered else ''} {_sentence(rng, cjk)}" for i in range(rng.randint(2, 6)))
+    if kind == "code":
+        lines = [f"def {rng.choice(_EN_WORDS)}_{i}(x):\n    return x * {i}" for i in range(rng.randint(2, 6))]
+        return "```python\n" + "\n\n".join(lines) + "\n```"
+    if kind == "math":
+        return "$$\n\\sum_{i=1}^{n} x_i^2 = \\int_0^1 f(t)\\,dt\n$$"
+    if kind == "mermaid":
+        return "```mermaid\ngraph TD\n  A[scan] --> B[render]\n  B --> C[publish]\n```"
+    if kind == "table":
+        rows = ["| key | value | note |", "|---|---|---|"]
+        rows += [f"| {rng.choice(_EN_WORDS)} | {rng.randint(1, 999)} | {_sentence(rng, cjk)} |" for _ in range(rng.randint(2, 6))]
+        return "\n".join(rows)
+    text = _paragraph(rng, cjk)
+    if images and rng.random() < opts["image_ratio"]:
+        text += f"\n\n![figure]({rng.choice(images)})"
+    return text
+
+
+def generate_corpus(
+    root: Path,
+    posts: int = 200,
+    size: int = 4000,
+    cjk_ratio: float = 0.5,
+    code: bool = True,
+    math: bool = True,
+    mermaid: bool = True,
+    tables: bool = True,
+    images: int = 8,
+    image_ratio: float = 0.15,
+    seed: int = 1,
+) -> Dict[str, Any]:
+    """在 root 下生成合成文章目录；返回语料概要。size 为每篇正文的近似字符数。"""
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    img_dir = root / "img"
+    img_names: List[str] = []
+    if images:
+        img_dir.mkdir(exist_ok=True)
+        for i in range(images):
+            name = f"fig{i}.png"
+            if Image is not None:
+                w, h = rng.choice([(1600, 900), (1200, 1200), (800, 1400)])
+                Image.new("RGB", (w, h), (rng.randrange(256), rng.randrange(256), rng.randrange(256))).save(img_dir / name)
+            else:
+                (img_dir / name).write_bytes(_TINY_PNG)
+            img_names.append(f"../img/{name}")
+    opts = {"cjk_ratio": cjk_ratio, "code": code, "math": math, "mermaid": mermaid, "tables": tables, "image_ratio": image_ratio}
+    base = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    total = 0
+    for i in range(posts):
+        section = root / f"s{i % 10}"
+        section.mkdir(exist_ok=True)
+        blocks: List[str] = []
+        length = 0
+        while length < size:
+            b = _block(rng, opts, img_names)
+            blocks.append(b)
+            length += len(b)
+        date = (base + timedelta(hours=rng.randrange(0, 6 * 365 * 24))).isoformat()
+        tags = ", ".join(rng.sample(_TAGS, rng.randint(1, 3)))
+        visibility = rng.choices(["public", "unlisted", "hidden"], weights=[90, 7, 3])[0]
+        body = "\n\n".join(blocks)
+        text = f"---\ntitle: {_sentence(rng, cjk_ratio).rstrip('.。')}\ndate: {date}\ntags: {tags}\nvisibility: {visibility}\n---\n\n{body}\n"
+        (section / f"post-{i:05d}.md").write_text(text, encoding="utf-8")
+        total += len(text)
+    return {"posts": posts, "bytes": total, "images": len(img_names), "seed": seed}
+
+
+def peak_rss_kb() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return int(rss / 1024) if sys.platform == "darwin" else int(rss)
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    samples.sort()
+    return {
+        "n": repeat,
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "min_ms": round(samples[0], 3),
+    }
+
+
+# --dir 目录中的标记文件：再次运行时只会清空带有该标记的目录
+BENCH_MARKER = ".blog-bench"
+
+
+def run(docs: Path, repeat: int = 20, workers: int = 1, seed: int = 1, cache_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """对已生成的 docs 目录逐项计时；给出 cache_dir 时额外测量带渲染缓存的重启耗时。"""
+    from .indexer import DocsIndexer
+
+    rng = random.Random(seed)
+    results: Dict[str, Any] = {}
+    rss_before = peak_rss_kb()
+
+    gc.collect()
+    t0 = time.perf_counter()
+    idx = DocsIndexer(docs, docs.parent, cache_dir=cache_dir, scan_workers=workers)
+    results["scan_all"] = {"wall_ms": round((time.perf_counter() - t0) * 1000.0, 1), **{
+        k: v for k, v in idx.scan_stats.items() if k not in ("per_file_ms", "wall_ms")
+    }}
+    results["peak_rss_kb_after_scan"] = peak_rss_kb()
+    results["post_memory"] = idx.memory_stats()
+    if cache_dir is not None:
+        # 重启：内容未变，全部命中渲染缓存
+        def warm_start() -> None:
+            DocsIndexer(docs, docs.parent, cache_dir=cache_dir, scan_workers=workers)
+        results["warm_start"] = _timed(warm_start, max(1, repeat // 10))
+
+    files = sorted(docs.rglob("*.md"))
+    sample = [files[rng.randrange(len(files))] for _ in range(repeat)]
+    bodies = []
+    for p in sample:
+        bodies.append((p, frontmatter.loads(p.read_text(encoding="utf-8")).content))
+
+    it = itertools.count()
+
+    def index_one() -> None:
+        # 每次追加不同内容，确保真正重新渲染
+        p = sample[next(it) % len(sample)]
+        with p.open("a", encoding="utf-8") as f:
+            f.write(f"\n\n{_sentence(rng, 0.5)}\n")
+        idx.index_file(p)
+
+    results["index_file"] = _timed(index_one, repeat)
+
+    k = itertools.count()
+    results["render"] = _timed(lambda: idx._render(bodies[next(k) % len(bodies)][1]), repeat)
+    rendered = []
+    for p, body in bodies:
+        content_html, _, _ = idx._render(body)
+        rendered.append((p, idx._strip_leading_toc(content_html)))
+    j = itertools.count()
+
+    def chunk_one() -> None:
+        p, h = rendered[next(j) % len(rendered)]
+        idx._chunk_html(h, base_dir=p.parent, source=p)
+
+    results["chunk_html"] = _timed(chunk_one, repeat)
+    r = itertools.count()
+    results["render_post"] = _timed(lambda: idx._render_post(bodies[next(r) % len(bodies)][1], sample[0].parent, sample[0]), repeat)
+
+    results["postprocess"] = _postprocess_compare(idx, files, repeat)
+
+    queries = ["python", "cache", "博客", "搜索功能", "tag:性能", "render stream", "pro", "不存在的词"]
+    q = itertools.count()
+    results["search_posts"] = _timed(lambda: idx.search_posts(queries[next(q) % len(queries)]), max(repeat, len(queries)))
+    results["sorted_posts"] = _timed(idx._sorted_posts, repeat)
+    results["list_posts_page"] = _timed(lambda: idx.list_posts(0, 20), repeat)
+
+    idx.stop_watch()
+    results["peak_rss_kb"] = peak_rss_kb()
+    results["peak_rss_kb_before_index"] = rss_before
+    return results
+
+
+def _postprocess_compare(idx: Any, files: List[Path], repeat: int) -> Dict[str, Any]:
+    """比较逐遍实现与 postprocess.process 的后处理耗时（不含 md.convert），并校验两者输出一致。"""
+    from . import postprocess
+
+    inputs = []
+    for path in files:
+        body = frontmatter.loads(path.read_text(encoding="utf-8")).content or ""
+        inputs.append((path, *idx._convert(body)))
+    if not inputs:
+        return {}
+
+    def legacy(path: Path, h: str, toc: str) -> tuple:
+        content_html, text, _ = idx._finish_render(h, toc)
+        chunks, types, ph_ids, _ = idx._chunk_html(idx._strip_leading_toc(content_html), base_dir=path.parent, source=path)
+        return content_html, text, chunks, types, ph_ids
+
+    def single(path: Path, h: str, toc: str) -> tuple:
+        return tuple(postprocess.process(h, lambda img, ph: idx._img_placeholder(img, ph, path.parent, path)) or ())
+
+    fallbacks = 0
+    for args in inputs:
+        res = single(*args)
+        if not res:
+            fallbacks += 1
+        elif res != legacy(*args):
+            raise AssertionError(f"postprocess output differs for {args[0]}")
+
+    def timed(fn: Callable[..., Any]) -> float:
+        t0 = time.process_time()
+        for _ in range(max(1, repeat // 10)):
+            for args in inputs:
+                fn(*args)
+        return (time.process_time() - t0) / (max(1, repeat // 10) * len(inputs)) * 1e6
+
+    legacy_us = timed(legacy)
+    single_us = timed(single)
+    return {
+        "posts": len(inputs),
+        "fallbacks": fallbacks,
+        "legacy_us_per_post": round(legacy_us, 1),
+        "single_pass_us_per_post": round(single_us, 1),
+        "speedup": round(legacy_us / single_us, 2) if single_us else 0.0,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """与基线结果逐项比较（median_ms / wall_ms / peak_rss_kb），返回可读行。"""
+    lines: List[str] = []
+    cur, base = current.get("results", {}), baseline.get("results", {})
+    for name in sorted(set(cur) & set(base)):
+        a, b = cur[name], base[name]
+        if isinstance(a, dict) and isinstance(b, dict):
+            key = "median_ms" if "median_ms" in a else "wall_ms" if "wall_ms" in a else None
+            if key is None or key not in b:
+                continue
+            a, b = a[key], b[key]
+        if not isinstance(a, (int, float)) or not isinstance(b, (int, float)) or not b:
+            continue
+        lines.append(f"{name:28s} {b:>12.3f} -> {a:>12.3f}  ({(a - b) / b * 100:+.1f}%)")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m backend.bench", description=__doc__.splitlines()[0])
+    ap.add_argument("--posts", type=int, default=200)
+    ap.add_argument("--size", type=int, default=4000, help="每篇正文的近似字符数")
+    ap.add_argument("--cjk", type=float, default=0.5, help="中文句子占比 0..1")
+    ap.add_argument("--images", type=int, default=8, help="本地图片数（0 表示不插图）")
+    ap.add_argument("--image-ratio", type=float, default=0.15, help="段落后插图的概率")
+    ap.add_argument("--no-code", action="store_true")
+    ap.add_argument("--no-math", action="store_true")
+    ap.add_argument("--no-mermaid", action="store_true")
+    ap.add_argument("--no-tables", action="store_true")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--workers", type=int, default=1, help="scan_all 的渲染进程数")
+    ap.add_argument("--no-render-cache", action="store_true", help="不使用渲染缓存（不测量 warm_start）")
+    ap.add_argument("--dir", type=Path, default=None, help="语料目录（默认临时目录，结束后删除）；须为新目录、空目录或之前由本工具创建的目录")
+    ap.add_argument("--out", type=Path, default=None, help="结果 JSON 输出路径（默认打印到标准输出）")
+    ap.add_argument("--compare", type=Path, default=None, help="与之前的结果 JSON 对比")
+    args = ap.parse_args(argv)
+
+    tmp = None
+    if args.dir is None:
+        tmp = Path(tempfile.mkdtemp(prefix="blog-bench-"))
+        work = tmp
+    else:
+        work = args.dir
+        if work.exists():
+            # 只清空由本工具创建过的目录（含标记文件），避免误删 docs/ 等真实数据
+            if any(work.iterdir()) and not (work / BENCH_MARKER).is_file():
+                ap.error(f"--dir {work} 已存在且不是 bench 创建的目录；请指定新目录或空目录")
+            shutil.rmtree(work)
+        work.mkdir(parents=True)
+        (work / BENCH_MARKER).write_text("created by python -m backend.bench\n", encoding="utf-8")
+    try:
+        docs = work / "docs"
+        corpus = generate_corpus(
+            docs, posts=args.posts, size=args.size, cjk_ratio=args.cjk,
+            code=not args.no_code, math=not args.no_math, mermaid=not args.no_mermaid, tables=not args.no_tables,
+            images=args.images, image_ratio=args.image_ratio, seed=args.seed,
+        )
+        report = {
+            "corpus": corpus,
+            "params": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+            "env": {"python": platform.python_version(), "platform": platform.platform(), "pillow": Image is not None},
+            "results": run(docs, repeat=args.repeat, workers=args.workers, seed=args.seed,
+                           cache_dir=None if args.no_render_cache else work / "render-cache"),
+        }
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    body = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        args.out.write_text(body + "\n", encoding="utf-8")
+    else:
+        print(body)
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        print("\n".join(compare(report, baseline)), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
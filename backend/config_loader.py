@@ -2,7 +2,7 @@ from __future__ import annotations
 import json
 import threading
 from pathlib import Path
-from typing import Optional
+from typing import Callable, List, Optional
 
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
@@ -31,6 +31,8 @@ class ConfigLoader:
         self._config: SiteConfig = SiteConfig()
         self.version = 0
         self._observer: Optional[Observer] = None
+        # 版本变更监听：listener(version)，在锁外调用
+        self._listeners: List[Callable[[int], None]] = []
         self._load_initial()
 
     def _load_initial(self) -> None:
@@ -61,6 +63,15 @@ class ConfigLoader:
         with self._lock:
             self._config = cfg
             self.version += 1
+            version = self.version
+        for listener in list(self._listeners):
+            try:
+                listener(version)
+            except Exception:
+                pass
+
+    def add_listener(self, listener: Callable[[int], None]) -> None:
+        self._listeners.append(listener)
 
     def get(self) -> SiteConfig:
         with self._lock:
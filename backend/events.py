@@ -0,0 +1,169 @@
+from __future__ import annotations
+import asyncio
+import logging
+import secrets
+import signal
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# 客户端断线后的重连间隔（毫秒），通过 SSE 的 retry 字段下发
+RETRY_MS = 3000
+
+
+class VersionEvents:
+    """docs/config 版本变更的 SSE 广播。
+
+    - publish() 可在任意线程调用（watchdog、变更队列、LQIP 线程池等）：事件写入带序号的环形缓冲，
+      再经 call_soon_threadsafe 唤醒事件循环
+    - 所有订阅者等待同一个 Future，发布时一次性唤醒；每个连接只是一个挂起的生成器，不额外创建任务
+    - 断线重连带 Last-Event-ID 时从缓冲补发错过的事件；缓冲已覆盖不到（或来自重启前的进程）时
+      发送 hello 让客户端整体对齐。事件 id 形如 "<进程标识>-<序号>"
+    """
+
+    def __init__(self, snapshot: Callable[[], Dict[str, Any]], history: int = 256) -> None:
+        # snapshot() 返回当前版本号，用于 hello 事件
+        self._snapshot = snapshot
+        self._epoch = secrets.token_hex(4)
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._history: Deque[Tuple[int, bytes]] = deque(maxlen=max(1, history))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Future] = None
+        self._closed = False
+        self.subscribers = 0
+        self.published = 0
+
+    def publish(self, event: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._seq += 1
+            self._history.append((self._seq, self._format(self._seq, event, data)))
+            self.published += 1
+            loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._wake)
+            except RuntimeError:
+                pass
+
+    def close(self) -> None:
+        """结束所有订阅（进程退出时调用，避免长连接阻塞优雅停机）。
+
+        可能在信号处理器中调用，因此不获取锁。
+        """
+        self._closed = True
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._wake)
+            except RuntimeError:
+                pass
+
+    def _format(self, seq: int, event: str, data: Dict[str, Any]) -> bytes:
+        return b"id: %s-%d\nevent: %s\ndata: %s\n\n" % (self._epoch.encode("ascii"), seq, event.encode("ascii"), orjson.dumps(data))
+
+    def _parse_id(self, last_event_id: Optional[str]) -> Optional[int]:
+        epoch, _, seq = (last_event_id or "").strip().partition("-")
+        if epoch != self._epoch:
+            return None
+        try:
+            return int(seq)
+        except ValueError:
+            return None
+
+    def _wake(self) -> None:
+        # 仅在事件循环线程中执行
+        fut, self._wakeup = self._wakeup, None
+        if fut is not None and not fut.done():
+            fut.set_result(None)
+
+    def _waiter(self) -> asyncio.Future:
+        if self._wakeup is None or self._wakeup.done():
+            self._wakeup = asyncio.get_running_loop().create_future()
+        return self._wakeup
+
+    def _since(self, cursor: int) -> Tuple[List[bytes], int, bool]:
+        """cursor 之后的事件；第三项为 False 表示缓冲中已缺失部分事件（需 hello 对齐）。"""
+        with self._lock:
+            if not self._history or cursor >= self._seq:
+                return [], self._seq, True
+            oldest = self._history[0][0]
+            complete = cursor >= oldest - 1
+            return [msg for seq, msg in self._history if seq > cursor], self._seq, complete
+
+    def _hello(self) -> Tuple[bytes, int]:
+        with self._lock:
+            seq = self._seq
+        return self._format(seq, "hello", self._snapshot()), seq
+
+    async def stream(self, last_event_id: Optional[str] = None, heartbeat: float = 25.0) -> AsyncIterator[bytes]:
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+        self.subscribers += 1
+        try:
+            yield b"retry: %d\n\n" % RETRY_MS
+            cursor = self._parse_id(last_event_id)
+            if cursor is not None:
+                events, seq, complete = self._since(cursor)
+                if complete and cursor <= seq:
+                    for msg in events:
+                        yield msg
+                    cursor = seq
+                else:
+                    cursor = None
+            if cursor is None:
+                hello, cursor = self._hello()
+                yield hello
+            while not self._closed:
+                # 先取等待对象再检查缓冲：期间发布的事件要么已在缓冲中，要么会唤醒该等待对象
+                fut = self._waiter()
+                events, seq, complete = self._since(cursor)
+                if not complete:
+                    hello, seq = self._hello()
+                    events = [hello]
+                if events:
+                    for msg in events:
+                        yield msg
+                    cursor = seq
+                    continue
+                try:
+                    # shield：超时只取消本连接的等待，不影响共享的 Future
+                    await asyncio.wait_for(asyncio.shield(fut), heartbeat)
+                except asyncio.TimeoutError:
+                    # 注释行作为心跳，防止代理因空闲断开连接
+                    yield b": ping\n\n"
+        finally:
+            self.subscribers -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"subscribers": self.subscribers, "published": self.published, "last_id": self._seq}
+
+
+def close_on_exit_signals(callback: Callable[[], None]) -> None:
+    """在 SIGINT/SIGTERM 的现有处理器之前先调用 callback。
+
+    uvicorn 收到退出信号后会等待所有连接结束，SSE 长连接需在此时主动关闭；
+    uvicorn 在导入应用前已安装自己的处理器，这里链式包装它。
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return  # 只能在主线程设置信号处理器
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+
+        def handler(signum, frame, previous=previous):  # type: ignore[no-untyped-def]
+            try:
+                callback()
+            except Exception:
+                logger.exception("exit signal callback failed")
+            if callable(previous):
+                previous(signum, frame)
+            elif previous == signal.SIG_DFL:
+                signal.signal(signum, signal.SIG_DFL)
+                signal.raise_signal(signum)
+
+        signal.signal(sig, handler)
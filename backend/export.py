@@ -0,0 +1,256 @@
+"""静态站点导出：扫描一次 docs/，将前端用到的全部接口响应与页面外壳写成静态文件。
+
+用法：
+    python -m backend.export --out dist --base-url https://example.com
+
+docs/public/config 的位置与渲染选项沿用 app 的环境变量（BLOG_DOCS_DIR 等）。输出目录可直接交给
+nginx/CDN：/api/* 写为 .json 文件（前端检测到页面中的 #static-export 后按该布局请求），文章页外壳
+位于 post/<slug>/index.html，其余前端路由回退到 index.html；/api/push 仍需由 Python 进程提供。
+
+static/ 下的资源同时以内容指纹文件名（与服务端 /static 指纹地址一致）写出，页面外壳引用指纹地址。
+不小于 1000 字节的文本文件同时写出 .gz（安装 brotli 后另有 .br）预压缩变体，可配合
+gzip_static/brotli_static 使用。export-manifest.json 记录每个文件的内容哈希；再次导出到同一目录时，
+内容未变的文件不会重写，已不存在的文章对应的文件会被删除。
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+MANIFEST_NAME = "export-manifest.json"
+# 预压缩变体的文件后缀
+_VARIANT_SUFFIX = {"gzip": ".gz", "br": ".br"}
+# 需要预压缩的文件类型（图片、字体等已压缩格式不再处理）
+_COMPRESSIBLE = {".html", ".json", ".xml", ".txt", ".js", ".css", ".svg", ".map", ".webmanifest"}
+
+
+def _digest(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class _ExportWriter:
+    """按相对路径写出文件及其预压缩变体，跳过内容未变的文件，并记录导出清单。"""
+
+    def __init__(self, out: Path, compress: bool, previous: Dict[str, Any]) -> None:
+        self.out = out
+        self.compress = compress
+        self.previous = previous
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.written = 0
+        self.unchanged = 0
+        self.bytes = 0
+
+    def put(self, rel: str, body: bytes, variants: Optional[Dict[str, bytes]] = None) -> None:
+        """写出 rel；variants 为已有的预压缩结果（如索引中的预压缩响应体），缺省时按需压缩。"""
+        from .indexer import compress_variants
+
+        if rel in self.files:
+            return  # 内容寻址的分块在同一篇文章内可能重复
+        digest = _digest(body)
+        path = self.out / rel
+        prev = self.previous.get(rel)
+        if prev and prev.get("hash") == digest and path.exists() and \
+                all((self.out / (rel + _VARIANT_SUFFIX[enc])).exists() for enc in prev.get("encodings", [])):
+            self.files[rel] = prev
+            self.unchanged += 1
+            return
+        if not self.compress or Path(rel).suffix.lower() not in _COMPRESSIBLE:
+            variants = {}
+        elif variants is None:
+            variants = compress_variants(body)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(body)
+        for enc, suffix in _VARIANT_SUFFIX.items():
+            sibling = self.out / (rel + suffix)
+            if enc in variants:
+                sibling.write_bytes(variants[enc])
+            elif sibling.exists():
+                sibling.unlink()
+        self.files[rel] = {"hash": digest, "size": len(body), "encodings": sorted(variants)}
+        self.written += 1
+        self.bytes += len(body)
+
+    def put_json(self, rel: str, data: Any, variants: Optional[Dict[str, bytes]] = None) -> None:
+        self.put(rel, orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS), variants)
+
+    def remove_stale(self) -> int:
+        removed = 0
+        for rel in self.previous:
+            if rel in self.files:
+                continue
+            for name in [rel] + [rel + suffix for suffix in _VARIANT_SUFFIX.values()]:
+                try:
+                    (self.out / name).unlink()
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+def _encoded(lookup) -> Optional[Dict[str, bytes]]:
+    # 索引中已有的预压缩响应体（与导出的 JSON 逐字节对应）；没有时返回 None，由写出方自行压缩
+    out: Dict[str, bytes] = {}
+    for enc in _VARIANT_SUFFIX:
+        body = lookup(enc)
+        if body is not None:
+            out[enc] = bytes(body)
+    return out or None
+
+
+def _asset_variants(assets, asset) -> Optional[Dict[str, bytes]]:
+    # 服务端已生成的静态资源预压缩变体；缺失时返回 None，由写出方自行压缩
+    out: Dict[str, bytes] = {}
+    for enc in _VARIANT_SUFFIX:
+        variant = assets.variant(asset, enc)
+        if variant is not None:
+            out[enc] = variant.read_bytes() if isinstance(variant, Path) else variant
+    return out if len(out) == len(_VARIANT_SUFFIX) else None
+
+
+def _load_previous(out: Path) -> Dict[str, Any]:
+    try:
+        data = orjson.loads((out / MANIFEST_NAME).read_bytes())
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _static_marker(html_text: str) -> str:
+    # 标记静态站点，前端据此改用 .json 文件布局、关闭 SSE 与批量取块
+    marker = '<script id="static-export" type="application/json">{}</script>'
+    if "</head>" in html_text:
+        return html_text.replace("</head>", marker + "\n</head>", 1)
+    return marker + html_text
+
+
+def export_site(out: Path, base: str, compress: bool = True, copy_static: bool = True) -> Dict[str, Any]:
+    # 导入 app 只构建各组件（不扫描、不启动文件监听与共享索引），由这里完成一次全量扫描
+    from . import app as site
+
+    t0 = time.perf_counter()
+    indexer = site.indexer
+    indexer.scan_all()
+    base = base.rstrip("/")
+    if indexer.lazy:
+        # 懒渲染：先渲染一遍全部正文，触发后台 LQIP，待其回填后再导出
+        for meta in indexer._ordered_metas("listed"):
+            indexer.get_post_manifest(meta.slug)
+    indexer.wait_idle()
+
+    previous = _load_previous(out)
+    writer = _ExportWriter(out, compress, previous.get("files") or {})
+
+    # 文章与分块
+    metas = indexer._ordered_metas("listed")
+    for meta in metas:
+        slug = meta.slug
+        post = indexer.get_post(slug)
+        manifest = site._post_manifest(slug)
+        if post is None or manifest is None:
+            continue
+        writer.put_json(f"api/post/{slug}.json", post.model_dump(),
+                        _encoded(lambda enc: indexer.get_post_encoded(slug, enc)))
+        writer.put_json(f"api/post/{slug}/manifest.json", manifest.model_dump())
+        for i in range(manifest.totalChunks):
+            writer.put_json(f"api/post/{slug}/chunk/{i}.json", indexer.get_chunk_payload(slug, index=i),
+                            _encoded(lambda enc: indexer.get_chunk_encoded(slug, enc, index=i)))
+        for digest in manifest.chunk_hashes or []:
+            writer.put_json(f"api/post/{slug}/c/{digest}.json", indexer.get_chunk_payload(slug, digest=digest),
+                            _encoded(lambda enc: indexer.get_chunk_encoded(slug, enc, digest=digest)))
+
+    # 列表、配置与统计
+    writer.put("api/posts.json", site._build_posts_body(None, 1, 10, False))
+    writer.put_json("api/config.json", site.config_loader.get().model_dump())
+    writer.put_json("api/tags.json", indexer.tag_stats())
+    writer.put_json("api/archive.json", indexer.archive_stats())
+    writer.put_json("api/stats/post_activity.json", indexer.post_activity(time.time() - 365 * 86400))
+
+    # sitemap / rss / robots
+    pages = max(1, (1 + indexer.count_posts() + site.SITEMAP_MAX_URLS - 1) // site.SITEMAP_MAX_URLS)
+    writer.put("sitemap.xml", site._build_sitemap(base, None)[0])
+    if pages > 1:
+        for n in range(1, pages + 1):
+            writer.put(f"sitemap-{n}.xml", site._build_sitemap(base, n)[0])
+    writer.put("rss.xml", site._build_rss(base)[0])
+    writer.put("robots.txt", site._robots_txt(base).encode("utf-8"))
+
+    # 静态资源与根目录文件
+    if copy_static and site.PUBLIC_DIR.is_dir():
+        # 原路径与外壳引用的指纹路径各写一份（前端脚本中仍有按原路径拼接的资源地址）
+        site.assets.refresh()
+        for rel, asset in sorted(site.assets.items().items()):
+            body = (site.PUBLIC_DIR / rel).read_bytes()
+            variants = _asset_variants(site.assets, asset)
+            writer.put("static/" + rel, body, variants)
+            writer.put("static/" + asset.hashed_rel, body, variants)
+    for name in ("manifest.json", "sw.js"):
+        if (site.PUBLIC_DIR / name).is_file():
+            writer.put(name, (site.PUBLIC_DIR / name).read_bytes())
+    if (site.ROOT / "book.json").is_file():
+        writer.put("book.json", (site.ROOT / "book.json").read_bytes())
+
+    # 页面外壳：首页 + 每篇文章（带标题与 SEO meta），其余路由由服务器回退到 index.html
+    index_html = site.PUBLIC_DIR / "index.html"
+    if index_html.is_file():
+        text = index_html.read_text(encoding="utf-8")
+        writer.put("index.html", _static_marker(site._inject_site_config(text, base=base)).encode("utf-8"))
+        for meta in metas:
+            shell = site._inject_site_config(text, post_meta=meta, base=base)
+            writer.put(f"post/{meta.slug}/index.html", _static_marker(shell).encode("utf-8"))
+
+    # 代数：内容有变化时递增，作为静态站点的 docsVersion（前端轮询 /api/version.json 判断是否需要刷新）
+    version_rel = "api/version.json"
+    content_changed = writer.written > 0 or set(writer.files) != set(writer.previous) - {version_rel}
+    generation = int(previous.get("generation") or 0) + (1 if content_changed else 0)
+    writer.put_json(version_rel, {"docsVersion": generation, "configVersion": generation})
+
+    removed = writer.remove_stale()
+    (out / MANIFEST_NAME).write_bytes(orjson.dumps({
+        "generation": generation,
+        "base_url": base,
+        "generated_at": time.time(),
+        "files": writer.files,
+    }, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+    # 未启动文件监听；这里只停止后台 LQIP 线程池与其触发的变更队列
+    indexer.stop_watch()
+    return {
+        "out": str(out),
+        "generation": generation,
+        "posts": len(metas),
+        "files": len(writer.files),
+        "written": writer.written,
+        "unchanged": writer.unchanged,
+        "removed": removed,
+        "bytes_written": writer.bytes,
+        "wall_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m backend.export", description=__doc__.splitlines()[0])
+    ap.add_argument("--out", type=Path, required=True, help="输出目录")
+    ap.add_argument("--base-url", default=None, help="站点根 URL（用于 sitemap/rss/canonical），默认 BLOG_SITE_ORIGIN")
+    ap.add_argument("--no-compress", action="store_true", help="不写出 .gz/.br 预压缩变体")
+    ap.add_argument("--no-static", action="store_true", help="不复制 public/ 到 static/")
+    ap.add_argument("--clean", action="store_true", help="导出前清空输出目录")
+    args = ap.parse_args(argv)
+
+    out = args.out.resolve()
+    if args.clean and out.exists():
+        shutil.rmtree(out)
+    out.mkdir(parents=True, exist_ok=True)
+    base = args.base_url or (os.environ.get("BLOG_SITE_ORIGIN") or "http://localhost:8000")
+    result = export_site(out, base, compress=not args.no_compress, copy_static=not args.no_static)
+    sys.stdout.write(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode("utf-8") + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
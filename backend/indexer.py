@@ -1,27 +1,41 @@
 from __future__ import annotations
 import hashlib
 import html
+import logging
 import os
 import re
 import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from array import array
 from dataclasses import dataclass
-import base64
+import gzip
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple, Any
 
 import frontmatter
+import orjson
 from markdown import Markdown
 
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 
+from .lqip import LQIP_MEMORY_ITEMS, Image, LqipCache, lqip_fingerprint
 from .models import Post, PostMeta
+from .persistent import PersistentMap, PersistentSortedList
+from . import postprocess
+from .render_cache import RenderCache
+from .search import SearchIndex, SearchReader
+from .stats import PostAggregates
+
+logger = logging.getLogger(__name__)
 
 try:
-    from PIL import Image  # type: ignore
+    import brotli  # type: ignore
 except Exception:
-    Image = None  # Pillow 可选；缺失时跳过 LQIP 生成
+    brotli = None  # brotli 可选；缺失时仅预压缩 gzip
 
 
 MD_EXTENSIONS = [
@@ -47,16 +61,165 @@ MD_EXTENSIONS = [
 ]
 
 
+@dataclass
+class _EncodedPayloads:
+    """索引时预先压缩好的响应体：encoding -> bytes。过小的响应体不压缩（缺省项）。
+
+    chunks[i] 同时用于 /chunk/{i} 与 /c/{hash}：两个接口返回同一份分块 JSON（见 chunk_payload）。
+    """
+    post: Dict[str, bytes]
+    chunks: List[Dict[str, bytes]]
+
+
+_TAG_STRIP_RE = re.compile(r"<[^>]+>")
+_PH_START = b'<div class="img-ph" data-ph="'
+_PH_END = b'<div class="lazy-spinner"></div></div>'
+
+
+def _html_to_text(content_html: str) -> str:
+    # 与渲染时的纯文本提取一致：去标签 + 反转义
+    return html.unescape(_TAG_STRIP_RE.sub("", content_html))
+
+
+# 懒渲染模式下由 Markdown 源文本近似得到纯文本（摘要、字数与检索用），不经过 md.convert
+_MD_FENCE_RE = re.compile(r"^[ \t]*(?:```|~~~).*$", re.MULTILINE)
+_MD_IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_MD_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_MD_LINE_PREFIX_RE = re.compile(r"^[ \t]*(?:#{1,6}[ \t]+|>[ \t]?|[-*+][ \t]+(?:\[[ xX]\][ \t]+)?|\d+\.[ \t]+)", re.MULTILINE)
+_MD_EMPHASIS_RE = re.compile(r"\*\*|~~|==|[*`]")
+
+
+def _markdown_to_text(body: str) -> str:
+    text = _MD_FENCE_RE.sub("", body.replace("[TOC]", ""))
+    text = _MD_IMAGE_RE.sub("", text)
+    text = _MD_LINK_RE.sub(r"\1", text)
+    text = _MD_LINE_PREFIX_RE.sub("", text)
+    text = _MD_EMPHASIS_RE.sub("", text)
+    return _html_to_text(text)
+
+
 @dataclass
 class _PostData:
+    """单篇文章的渲染结果，正文只保存一份。
+
+    - buf：UTF-8 字节串，依次存放全部分块（文本块在前、图片块在后），offsets[i]:offsets[i+1] 为第 i 块
+    - 完整 content_html 不单独保存：由 文首部分（TOC）+ 文本块（占位符换回原 <img>）+ 末尾空白 还原；
+      无法精确还原时（layout 为 None）才把 content_html 追加在 buf 末尾
+    - content_text 只在建立检索索引前暂存（text），之后按需由 content_html 推导；
+      子串检索所用的小写文本存于 SearchIndex；懒渲染按需渲染的正文在首次子串匹配时推导并保存（text_lc）
+    - stub=True：懒渲染模式下只含元数据的占位，正文按需渲染后存于 _RenderedBodies
+    - title_from_path / deps：写入渲染缓存的附加信息（标题是否取自文件名；渲染时引用的本地图片状态）
+    """
     meta: PostMeta
-    content_html: str
-    content_text: str
     updated_at: float
-    chunks: List[str]
     toc_html: str
+    buf: bytes
+    offsets: array
+    # (文首部分（None 表示 toc_html + "\n"）, 末尾空白, 占位符在 buf 中的 [start, end) 字节区间)
+    layout: Optional[Tuple[Optional[str], str, array]]
     chunk_types: Optional[List[str]] = None
     ph_ids: Optional[List[Optional[str]]] = None
+    chunk_hashes: Optional[List[str]] = None
+    encoded: Optional[_EncodedPayloads] = None
+    text: Optional[str] = None
+    text_lc: Optional[str] = None
+    stub: bool = False
+    title_from_path: bool = False
+    # 图片路径 -> [mtime_ns, size]（文件不存在时为 None）
+    deps: Optional[Dict[str, Optional[List[int]]]] = None
+
+    @classmethod
+    def pack(cls, meta: PostMeta, content_html: str, content_text: Optional[str], updated_at: float, chunks: List[str],
+             toc_html: str, chunk_types: Optional[List[str]] = None, ph_ids: Optional[List[Optional[str]]] = None,
+             chunk_hashes: Optional[List[str]] = None) -> "_PostData":
+        parts = [c.encode("utf-8") for c in chunks]
+        offsets = array("I", [0])
+        for b in parts:
+            offsets.append(offsets[-1] + len(b))
+        data = cls(meta=meta, updated_at=updated_at, toc_html=toc_html, buf=b"".join(parts), offsets=offsets, layout=None,
+                   chunk_types=chunk_types, ph_ids=ph_ids, chunk_hashes=chunk_hashes, text=content_text)
+        data.layout = data._find_layout(content_html)
+        if data.layout is None:
+            data.buf += content_html.encode("utf-8")
+        return data
+
+    def _find_layout(self, content_html: str) -> Optional[Tuple[Optional[str], str, array]]:
+        n_img = sum(1 for t in (self.chunk_types or []) if t == 'image')
+        n_text = self.n_chunks - n_img
+        text_end = self.offsets[n_text]
+        spans = array("I")
+        pos = 0
+        for _ in range(n_img):
+            s = self.buf.find(_PH_START, pos, text_end)
+            e = self.buf.find(_PH_END, s, text_end) if s != -1 else -1
+            if e == -1:
+                return None
+            spans.append(s)
+            spans.append(e + len(_PH_END))
+            pos = e + len(_PH_END)
+        m = postprocess._LEADING_TOC_RE.match(content_html)
+        head = content_html[:m.end()] if m else ""
+        body = self._join_body(spans, n_text)
+        rest = content_html[len(head):]
+        if not rest.startswith(body) or rest[len(body):].strip():
+            return None
+        layout = (None if head == f"{self.toc_html}\n" else head, rest[len(body):], spans)
+        return layout
+
+    @property
+    def n_chunks(self) -> int:
+        return len(self.offsets) - 1
+
+    def chunk(self, index: int) -> str:
+        # 从 memoryview 直接解码，不产生中间 bytes 副本
+        return str(memoryview(self.buf)[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+    def chunk_list(self) -> List[str]:
+        return [self.chunk(i) for i in range(self.n_chunks)]
+
+    def _join_body(self, spans: array, n_text: int) -> str:
+        mv = memoryview(self.buf)
+        out: List[str] = []
+        pos = 0
+        for k in range(len(spans) // 2):
+            out.append(str(mv[pos:spans[2 * k]], "utf-8"))
+            out.append(self.chunk(n_text + k))
+            pos = spans[2 * k + 1]
+        out.append(str(mv[pos:self.offsets[n_text]], "utf-8"))
+        return "".join(out)
+
+    @property
+    def content_html(self) -> str:
+        if self.layout is None:
+            return str(memoryview(self.buf)[self.offsets[-1]:], "utf-8")
+        head, tail, spans = self.layout
+        body = self._join_body(spans, self.n_chunks - len(spans) // 2)
+        return (f"{self.toc_html}\n" if head is None else head) + body + tail
+
+    @property
+    def content_text(self) -> str:
+        return self.text if self.text is not None else _html_to_text(self.content_html)
+
+    def search_text(self) -> str:
+        """小写纯文本，供懒渲染正文的子串检索；首次使用时推导并保存。"""
+        if self.text_lc is None:
+            self.text_lc = self.content_text.lower()
+        return self.text_lc
+
+    def memory_bytes(self) -> Dict[str, int]:
+        encoded = 0
+        if self.encoded is not None:
+            encoded = sum(len(v) for v in self.encoded.post.values())
+            encoded += sum(len(v) for d in self.encoded.chunks for v in d.values())
+        head = self.layout[0] if self.layout is not None else None
+        other = len(self.toc_html) + len(head or "") + (len(self.layout[1]) if self.layout else 0)
+        return {
+            "body": len(self.buf),
+            "offsets": self.offsets.itemsize * len(self.offsets) + (self.layout[2].itemsize * len(self.layout[2]) if self.layout else 0),
+            "toc_other": other,
+            "text": (len(self.text) if self.text is not None else 0) + len(self.text_lc or ""),
+            "encoded": encoded,
+        }
 
 
 # 配置扩展参数
@@ -77,61 +240,523 @@ MD_EXTENSION_CONFIGS = {
 }
 
 
+# 渲染管线版本：修改 _render/_chunk_html 等后处理逻辑导致输出变化时递增，使磁盘缓存整体失效
+RENDER_PIPELINE_VERSION = 3
+
+
+def _markdown_configs() -> Dict[str, Any]:
+    # 合并默认配置与全局配置
+    configs = MD_EXTENSION_CONFIGS.copy()
+    configs.update({
+        "codehilite": {
+            "guess_lang": False,
+            "pygments_style": "default",
+            "noclasses": False,
+        },
+        # 仅生成 TOC，不依赖文中 [TOC] 占位符
+        "toc": {
+            # 包含 H1-H6，避免只有一级标题时目录不全
+            "toc_depth": "1-6",
+            "toc_class": "toc",
+        }
+    })
+    return configs
+
+
+def render_fingerprint() -> str:
+    """渲染配置指纹：扩展列表、扩展参数、相关库版本与管线版本。任一变化都会使渲染缓存失效。"""
+    import json
+    try:
+        from importlib.metadata import version as _pkg_version
+    except Exception:  # pragma: no cover
+        _pkg_version = None  # type: ignore
+
+    def _default(o: Any) -> str:
+        # 自定义 fence 的 format 等可调用对象：以模块 + 限定名 + 字节码标识
+        code = getattr(o, "__code__", None)
+        digest = hashlib.sha1(code.co_code).hexdigest() if code is not None else ""
+        return f"{getattr(o, '__module__', '')}.{getattr(o, '__qualname__', type(o).__name__)}:{digest}"
+
+    versions = {}
+    for pkg in ("Markdown", "pymdown-extensions", "Pygments", "Pillow"):
+        try:
+            versions[pkg] = _pkg_version(pkg) if _pkg_version else ""
+        except Exception:
+            versions[pkg] = ""
+    blob = json.dumps({
+        "pipeline": RENDER_PIPELINE_VERSION,
+        "extensions": MD_EXTENSIONS,
+        "configs": _markdown_configs(),
+        "versions": versions,
+        "lqip": lqip_fingerprint() if Image is not None else None,
+    }, sort_keys=True, default=_default, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+# 低于该大小的响应体不预压缩（与 GZipMiddleware 的 minimum_size 一致）
+PRECOMPRESS_MIN_SIZE = 1000
+
+
+def compress_variants(body: bytes) -> Dict[str, bytes]:
+    if len(body) < PRECOMPRESS_MIN_SIZE:
+        return {}
+    out = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        out["br"] = brotli.compress(body, quality=9)
+    return out
+
+
+def _expected_encodings(size: int) -> Set[str]:
+    # compress_variants 对该大小的响应体会产生的编码集合（磁盘缓存的变体以此校验，如后来才安装 brotli）
+    if size < PRECOMPRESS_MIN_SIZE:
+        return set()
+    return {"gzip", "br"} if brotli is not None else {"gzip"}
+
+
+def chunk_payload(slug: str, index: int, digest: Optional[str], html: str) -> Dict[str, Any]:
+    """/chunk/{index} 与 /c/{hash} 共用的分块 JSON，使两者共享同一份预压缩结果。
+
+    对内容寻址的接口，index 为该内容在文章中首次出现的位置，仅供参考（客户端以清单中的位置为准）。
+    """
+    return {"slug": slug, "index": index, "hash": digest, "html": html}
+
+
+def _content_digest(raw: bytes) -> str:
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def chunk_hash(chunk: str) -> str:
+    return hashlib.blake2b(chunk.encode("utf-8"), digest_size=10).hexdigest()
+
+
+# 排序分区：all 含 hidden（统计用），public 用于列表，listed（public + unlisted）用于搜索
+_ORDER_PARTITIONS = ("all", "public", "listed")
+
+
+@dataclass(frozen=True)
+class _IndexSnapshot:
+    """某一时刻已发布索引的不可变视图。
+
+    写入方在写锁内基于旧快照构造新快照，再整体替换 DocsIndexer._snapshot；读取方只取一次引用，
+    之后全程无锁，且看到的各字段彼此一致。快照中的容器发布后不再修改；新快照由 copy() 得到的
+    写时复制容器构造（见 persistent），未改动的部分与旧快照共享。
+
+    共享索引的只读进程中，各字段为直接读取映射文件的只读实现（见 shared_index），接口与此处相同；
+    其 copy()/clone() 返回内存中的可写版本。
+    """
+    version: int
+    posts: Mapping[str, _PostData]
+    # slug -> (-时间戳, slug)，各分区内按该 key 升序即新->旧
+    sort_keys: Mapping[str, Tuple[float, str]]
+    order: Dict[str, Sequence[Tuple[float, str]]]
+    last_modified: Optional[float]
+    # 派生索引：与快照一同替换，发布后不再修改（增量发布在写时复制的副本上更新）
+    search: SearchReader
+    stats: PostAggregates
+
+
+def _partitions_for(pd: _PostData) -> Tuple[str, ...]:
+    vis = getattr(pd.meta, 'visibility', 'public')
+    if vis == 'public':
+        return ("all", "public", "listed")
+    if vis == 'unlisted':
+        return ("all", "listed")
+    return ("all",)
+
+
+# 并行扫描：每个工作进程持有一个不扫描的 DocsIndexer，仅用于渲染
+_WORKER_INDEXER: Optional["DocsIndexer"] = None
+
+
+def _scan_worker_init(docs_root: str, public_dir: Optional[str], precompress: bool, lqip_cache_dir: Optional[str] = None) -> None:
+    global _WORKER_INDEXER
+    # 工作进程内同步生成 LQIP（经磁盘缓存与主进程共享结果）
+    _WORKER_INDEXER = DocsIndexer(Path(docs_root), Path(public_dir) if public_dir else None, precompress=precompress,
+                                  lqip_cache_dir=Path(lqip_cache_dir) if lqip_cache_dir else None, auto_scan=False)
+
+
+def _scan_worker_render(job: Tuple[str, bytes]) -> Tuple[str, Optional["_PostData"], float]:
+    path_str, raw = job
+    t0 = time.perf_counter()
+    data = _WORKER_INDEXER._build_post(Path(path_str), raw) if _WORKER_INDEXER else None
+    if data is not None:
+        # 压缩同样在工作进程内完成
+        _WORKER_INDEXER._attach_encoded(data)
+    return path_str, data, (time.perf_counter() - t0) * 1000.0
+
+
+class _MarkdownPool:
+    """预先构建好的 Markdown 实例池，避免每次渲染都重新加载全部扩展。
+
+    实例用完即 reset()（清空 toc、脚注、缩写、htmlStash 等文档级状态）后归还；
+    转换过程中抛出异常的实例直接丢弃，不再复用。
+    """
+
+    def __init__(self, factory: Callable[[], Markdown], maxsize: int = 4) -> None:
+        self._factory = factory
+        self.maxsize = max(1, maxsize)
+        self._lock = threading.Lock()
+        self._idle: List[Markdown] = []
+        self.created = 0
+        self.acquired = 0
+
+    @contextmanager
+    def acquire(self) -> Iterator[Markdown]:
+        with self._lock:
+            md = self._idle.pop() if self._idle else None
+            self.acquired += 1
+        if md is None:
+            md = self._factory()
+            with self._lock:
+                self.created += 1
+        # 转换异常时异常直接抛出，实例不归还
+        yield md
+        md.reset()
+        with self._lock:
+            if len(self._idle) < self.maxsize:
+                self._idle.append(md)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"created": self.created, "idle": len(self._idle), "acquired": self.acquired}
+
+
+def _same_stub(a: _PostData, b: _PostData) -> bool:
+    return a is b or (a.updated_at == b.updated_at and a.meta == b.meta)
+
+
+class _RenderedBodies:
+    """懒渲染模式下按需渲染的正文：按字节数限额的 LRU。
+
+    条目以 slug 为键并记录渲染时对应的占位（stub）；占位被新版本替换后旧条目即失效。
+    共享索引的只读进程每次访问都从映射文件解码出新的占位对象，故同一版本的占位按内容比对。
+    同一篇文章的并发未命中只渲染一次（single-flight），其余请求等待其结果。
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        # slug -> (占位, 渲染结果, 字节数)
+        self._items: "OrderedDict[str, Tuple[_PostData, _PostData, int]]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, threading.Event] = {}
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.evictions = 0
+
+    def peek(self, stub: _PostData) -> Optional[_PostData]:
+        with self._lock:
+            item = self._items.get(stub.meta.slug)
+            return item[1] if item is not None and _same_stub(item[0], stub) else None
+
+    def get(self, stub: _PostData, render: Callable[[_PostData], Optional[_PostData]]) -> Optional[_PostData]:
+        slug = stub.meta.slug
+        while True:
+            with self._lock:
+                item = self._items.get(slug)
+                if item is not None and _same_stub(item[0], stub):
+                    self._items.move_to_end(slug)
+                    self.hits += 1
+                    return item[1]
+                ev = self._inflight.get(slug)
+                if ev is None:
+                    ev = threading.Event()
+                    self._inflight[slug] = ev
+                    self.misses += 1
+                    break
+                self.waits += 1
+            # 其他线程正在渲染：等待后重新查找（渲染失败或已被淘汰时由本线程重试）
+            ev.wait()
+        try:
+            data = render(stub)
+            if data is not None:
+                self._put(stub, data)
+            return data
+        finally:
+            with self._lock:
+                self._inflight.pop(slug, None)
+            ev.set()
+
+    def _put(self, stub: _PostData, data: _PostData) -> None:
+        size = sum(data.memory_bytes().values())
+        with self._lock:
+            self._discard_locked(stub.meta.slug)
+            self._items[stub.meta.slug] = (stub, data, size)
+            self._bytes += size
+            # 至少保留刚放入的一篇
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, (_, _, old) = self._items.popitem(last=False)
+                self._bytes -= old
+                self.evictions += 1
+
+    def discard(self, slug: str) -> None:
+        with self._lock:
+            self._discard_locked(slug)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def _discard_locked(self, slug: str) -> None:
+        item = self._items.pop(slug, None)
+        if item is not None:
+            self._bytes -= item[2]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "bodies": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "evictions": self.evictions,
+            }
+
+
+class _ChangeQueue:
+    """文件变更队列：去重、防抖，并在后台线程中按批次提交。
+
+    watchdog 线程只负责入队路径；处理时再根据文件是否存在决定重建或删除，
+    因此同一路径的多次 modified/created/deleted 事件会自然合并为一次操作。
+    一批变更在同一把锁内发布，只 bump 一次版本号。
+    """
+
+    def __init__(self, indexer: "DocsIndexer", debounce: float = 0.3, max_delay: float = 2.0) -> None:
+        self.indexer = indexer
+        # 最后一个事件后静默 debounce 秒再处理；但一批最长等待 max_delay 秒
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._pending: Dict[str, float] = {}
+        # 即使内容指纹未变也必须重新渲染的路径（如后台 LQIP 生成完成）
+        self._forced: Set[str] = set()
+        self._batch_started = 0.0
+        self._last_event = 0.0
+        self._stopping = False
+        self._applying = False
+        self._thread: Optional[threading.Thread] = None
+        self.events = 0
+        self.batches = 0
+        self.last_batch: Dict[str, Any] = {}
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="docs-change-queue", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        # 停止前处理完已入队的变更
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def put(self, path: Path, force: bool = False) -> None:
+        with self._cond:
+            now = time.monotonic()
+            self.events += 1
+            if not self._pending:
+                self._batch_started = now
+            self._pending.setdefault(str(path), now)
+            if force:
+                self._forced.add(str(path))
+            self._last_event = now
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                while not self._stopping:
+                    deadline = min(self._last_event + self.debounce, self._batch_started + self.max_delay)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, {}
+                forced, self._forced = self._forced, set()
+                started = self._batch_started
+                self._applying = True
+            try:
+                self._apply(batch, started, forced)
+            except Exception:
+                logger.exception("failed to apply docs change batch")
+            finally:
+                with self._cond:
+                    self._applying = False
+
+    def _apply(self, batch: Dict[str, float], started: float, forced: Optional[Set[str]] = None) -> None:
+        t0 = time.perf_counter()
+        upserts: List[_PostData] = []
+        removals: List[str] = []
+        for path_str in batch:
+            path = Path(path_str)
+            if path.exists():
+                data = self.indexer._load_post(path, force=path_str in (forced or ()))
+                if data is not None:
+                    upserts.append(data)
+            else:
+                try:
+                    removals.append(self.indexer._make_slug(path))
+                except ValueError:
+                    continue
+        changed = self.indexer._publish(upserts, removals)
+        self.batches += 1
+        self.last_batch = {
+            "paths": len(batch),
+            "indexed": len(upserts),
+            "removed": len(removals),
+            "changed": changed,
+            "lag_ms": round((time.monotonic() - started) * 1000.0, 1),
+            "apply_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+        }
+
+    def idle(self) -> bool:
+        with self._cond:
+            return not self._pending and not self._applying
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            depth = len(self._pending)
+            lag = (time.monotonic() - self._batch_started) * 1000.0 if depth else 0.0
+        return {
+            "depth": depth,
+            "lag_ms": round(lag, 1),
+            "events": self.events,
+            "batches": self.batches,
+            "last_batch": self.last_batch,
+        }
+
+
 class _DocsEventHandler(FileSystemEventHandler):
-    def __init__(self, indexer: "DocsIndexer") -> None:
+    def __init__(self, indexer: "DocsIndexer", queue: _ChangeQueue) -> None:
         super().__init__()
         self.indexer = indexer
+        self.queue = queue
+
+    @staticmethod
+    def _is_md(path: str) -> bool:
+        return path.lower().endswith(".md")
+
+    def _enqueue_dir(self, dir_path: str) -> None:
+        # 目录级事件：已索引的下属文章 + 目录中现存的 .md 都需要重新判定
+        for p in self.indexer._paths_under(Path(dir_path)):
+            self.queue.put(p)
+        d = Path(dir_path)
+        if d.is_dir():
+            for p in d.rglob('*.md'):
+                self.queue.put(p)
 
     def on_modified(self, event):
         if event.is_directory:
             return
-        if event.src_path.lower().endswith(".md"):
-            self.indexer.index_file(Path(event.src_path))
+        if self._is_md(event.src_path):
+            self.queue.put(Path(event.src_path))
 
     def on_created(self, event):
         if event.is_directory:
             return
-        if event.src_path.lower().endswith(".md"):
-            self.indexer.index_file(Path(event.src_path))
+        if self._is_md(event.src_path):
+            self.queue.put(Path(event.src_path))
 
     def on_deleted(self, event):
         if event.is_directory:
+            self._enqueue_dir(event.src_path)
             return
-        if event.src_path.lower().endswith(".md"):
-            self.indexer.remove_file(Path(event.src_path))
+        if self._is_md(event.src_path):
+            self.queue.put(Path(event.src_path))
+
+    def on_moved(self, event):
+        # 重命名 = 删除旧路径 + 新增新路径（编辑器原子保存常见 tmp -> .md）
+        if event.is_directory:
+            self._enqueue_dir(event.src_path)
+            self._enqueue_dir(event.dest_path)
+            return
+        if self._is_md(event.src_path):
+            self.queue.put(Path(event.src_path))
+        if self._is_md(event.dest_path):
+            self.queue.put(Path(event.dest_path))
 
 
 class DocsIndexer:
-    def __init__(self, docs_root: Path, public_dir: Optional[Path] = None) -> None:
+    def __init__(
+        self,
+        docs_root: Path,
+        public_dir: Optional[Path] = None,
+        cache_dir: Optional[Path] = None,
+        scan_workers: int = 1,
+        precompress: bool = True,
+        watch_debounce: float = 0.3,
+        lqip_cache_dir: Optional[Path] = None,
+        lqip_background: bool = False,
+        lazy: bool = False,
+        lazy_cache_bytes: int = 64 * 1024 * 1024,
+        auto_scan: bool = True,
+        lqip_memory_items: int = LQIP_MEMORY_ITEMS,
+    ) -> None:
         self.docs_root = docs_root
         self.public_dir = public_dir
+        # 写锁：串行化发布与指纹更新；读取方不取锁，只读取当前快照
         self._lock = threading.Lock()
-        self._posts: Dict[str, _PostData] = {}
-        self.version = 0
+        self._snapshot = _IndexSnapshot(version=0, posts=PersistentMap(), sort_keys=PersistentMap(),
+                                        order={p: PersistentSortedList() for p in _ORDER_PARTITIONS},
+                                        last_modified=None, search=SearchIndex(), stats=PostAggregates())
+        # 全量扫描互斥；扫描期间增量发布过的路径在扫描结果切换后重新入队
+        self._scan_lock = threading.Lock()
+        self._scan_dirty: Set[str] = set()
         self._observer: Optional[Any] = None
-        self._md = self._create_markdown()
-        self.scan_all()
+        self._changes = _ChangeQueue(self, debounce=watch_debounce)
+        # slug -> (size, mtime_ns, 内容哈希)：内容未变时跳过重新渲染与版本 bump
+        self._fingerprints: Dict[str, Tuple[int, int, str]] = {}
+        # 可选的磁盘渲染缓存：重启时仅重新渲染内容发生变化的文件
+        self._render_cache: Optional[RenderCache] = RenderCache(cache_dir, render_fingerprint()) if cache_dir else None
+        # 全量扫描的渲染进程数；<=1 时在当前进程内串行渲染
+        self.scan_workers = max(1, int(scan_workers or 1))
+        self.scan_stats: Dict[str, Any] = {}
+        # 索引时预压缩正文与分块响应体（gzip，及可选的 brotli）
+        self.precompress = precompress
+        # LQIP/尺寸缓存；后台模式下未命中的图片先以无预览占位发布，生成完成后再强制重渲染所属文章
+        self._lqip = LqipCache(lqip_cache_dir, background=lqip_background, on_ready=self._on_lqip_ready,
+                               max_memory=lqip_memory_items)
+        self._lqip_cache_dir = lqip_cache_dir
+        # 全量扫描期间完成的 LQIP 通知暂存，待扫描结果发布后再入队，避免被扫描结果覆盖
+        self._scanning = False
+        self._lqip_held: Set[str] = set()
+        # 当前线程正在渲染的文章引用的本地图片（写入渲染缓存，命中时校验）
+        self._render_deps = threading.local()
+        # Markdown 实例池（串行扫描、变更队列与按需渲染等线程共用）
+        self._md_pool = _MarkdownPool(self._create_markdown)
+        # 懒渲染：扫描时只解析 frontmatter 生成 PostMeta，正文在首次访问时渲染，
+        # 渲染结果放在按字节数限额的 LRU 中
+        self.lazy = lazy
+        self._bodies = _RenderedBodies(lazy_cache_bytes)
+        # 版本变更监听：listener(version, changed_slugs, removed_slugs)，在锁外调用
+        self._listeners: List[Callable[[int, List[str], List[str]], None]] = []
+        # 只读：快照由共享索引装载（adopt），本进程不扫描、不监听文件
+        self.read_only = False
+        if auto_scan:
+            self.scan_all()
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
 
     def _create_markdown(self) -> Markdown:
-        # 合并默认配置与全局配置
-        configs = MD_EXTENSION_CONFIGS.copy()
-        configs.update({
-            "codehilite": {
-                "guess_lang": False,
-                "pygments_style": "default",
-                "noclasses": False,
-            },
-            # 仅生成 TOC，不依赖文中 [TOC] 占位符
-            "toc": {
-                # 包含 H1-H6，避免只有一级标题时目录不全
-                "toc_depth": "1-6",
-                "toc_class": "toc",
-            }
-        })
-        
         md = Markdown(
             extensions=MD_EXTENSIONS,
-            extension_configs=configs
+            extension_configs=_markdown_configs()
         )
         return md
 
@@ -160,19 +785,27 @@ class DocsIndexer:
             return full_summary[:197] + "..."
         return full_summary
 
-    def _render(self, body: str) -> Tuple[str, str, str]:
-        # 重新创建 Markdown 实例以避免全局状态污染（如 toc）
-        md = self._create_markdown()
-        html_content = md.convert(body)
-        # 若文中未显式写 [TOC]，也自动在文首插入目录（由 toc 扩展生成）
-        try:
-            toc_html = getattr(md, "toc", "") or ""
-        except Exception:
-            toc_html = ""
+    def _convert(self, body: str) -> Tuple[str, str]:
+        """Markdown -> HTML（未后处理）；返回 (html, toc_html)。"""
+        # 从池中取已 reset 的实例，toc/脚注等状态不会在文档间残留
+        with self._md_pool.acquire() as md:
+            html_content = md.convert(body)
+            # 若文中未显式写 [TOC]，也自动在文首插入目录（由 toc 扩展生成）
+            try:
+                toc_html = getattr(md, "toc", "") or ""
+            except Exception:
+                toc_html = ""
         if toc_html and "[TOC]" not in body:
             # 默认仍在文首插入目录，便于非分块模式前端直接移动到侧栏；
             # 分块模式下会在后续切分前去除该文首 TOC（保持仅侧栏显示）。
             html_content = f"{toc_html}\n" + html_content
+        return html_content, toc_html
+
+    def _render(self, body: str) -> Tuple[str, str, str]:
+        return self._finish_render(*self._convert(body))
+
+    def _finish_render(self, html_content: str, toc_html: str) -> Tuple[str, str, str]:
+        """逐遍后处理的参考实现；_render_post 的单遍实现无法保证一致时退回到这里。"""
         # 后处理：标题分段内重置有序列表序号（避免由于段落/代码块等元素导致的 Markdown 序号断裂）
         # 逻辑：找到所有顶级标题（h1-h6），对其之间的区块中的 <ol> 重写内部 <li> 的序号，遇到新标题时重置。
         # 仅当 <ol> 标记未显式设置 start 属性时才重写。
@@ -185,6 +818,21 @@ class DocsIndexer:
         text = html.unescape(text)
         return html_content, text, toc_html
 
+    def _render_post(self, body: str, base_dir: Optional[Path] = None, source: Optional[Path] = None):
+        """渲染正文并完成全部后处理：返回 (html, text, toc_html, chunks, chunk_types, ph_ids, chunk_hashes)。
+
+        后处理（重编号、去标签取纯文本、去除文首 TOC、图片占位与分块）在 postprocess.process
+        中一次扫描完成，结果与 _render + _strip_leading_toc + _chunk_html 一致。
+        """
+        html_content, toc_html = self._convert(body)
+        done = postprocess.process(html_content, lambda img, ph: self._img_placeholder(img, ph, base_dir, source))
+        if done is None:
+            content_html, content_text, toc_html = self._finish_render(html_content, toc_html)
+            chunks, types, ph_ids, hashes = self._chunk_html(self._strip_leading_toc(content_html), base_dir=base_dir, source=source)
+            return content_html, content_text, toc_html, chunks, types, ph_ids, hashes
+        hashes = [chunk_hash(c) for c in done.chunks]
+        return done.html, done.text, toc_html, done.chunks, done.chunk_types, done.ph_ids, hashes
+
     def _strip_leading_toc(self, html_content: str) -> str:
         """移除文首自动插入的 TOC（<div class="toc">...</div>）块，供分块模式使用。
         仅当它出现在开头（忽略前导空白）时移除，避免误删正文中的目录片段。
@@ -197,93 +845,31 @@ class DocsIndexer:
             return html_content[m.end():]
         return html_content
 
-    def _chunk_html(self, html_content: str, base_dir: Optional[Path] = None) -> Tuple[List[str], List[str], List[Optional[str]]]:
+    def _chunk_html(self, html_content: str, base_dir: Optional[Path] = None, source: Optional[Path] = None) -> Tuple[List[str], List[str], List[Optional[str]], List[str]]:
         """按“行”（块级结尾）切分文本，并将每个 <img> 单独成块。
 
         返回：
         - chunks: List[str]
         - chunk_types: 同长度，'text' 或 'image'
         - ph_ids: 同长度，图片块对应其占位符 id；文本块为 None
+        - chunk_hashes: 同长度，块内容哈希，用于内容寻址的不可变 URL
         约定：chunks 顺序为：先所有文本块（保持原文顺序），再所有图片块（保持出现顺序）。
         文本中原来的 <img> 被替换为占位占位 DOM：<div class="img-ph" data-ph="phN"><div class="lazy-spinner"></div></div>
         这样可以先加载文本，再按 phN 回填图片。
         """
         if not html_content:
-            return [], [], []
+            return [], [], [], []
         # 1) 提取所有图片，生成占位符
         img_re = re.compile(r"<img\b[^>]*>", re.IGNORECASE | re.DOTALL)
         images: List[str] = []
         ph_for_img: List[str] = []
-        # 内部：根据 <img> 的 src 生成 LQIP（仅本地文件）；返回 (data_url, (w,h)) 或 (None, None)
-        def _gen_lqip(src_val: str) -> Tuple[Optional[str], Optional[Tuple[int, int]]]:
-            if not src_val:
-                return None, None
-            s = src_val.strip()
-            # data: 或 http(s): 跳过
-            if s.lower().startswith('data:') or s.lower().startswith('http:') or s.lower().startswith('https:'):
-                return None, None
-            # 解析本地路径：
-            # - 以 /static/ 开头 -> 映射到 public_dir
-            # - 以 / 开头 -> 若有 public_dir 则去掉前导 / 后拼接
-            # - 否则按 base_dir 相对路径解析
-            fs_path: Optional[Path] = None
-            try:
-                if s.startswith('/'):
-                    # /static/foo/bar.png -> PUBLIC_DIR/static/foo/bar.png
-                    if s.startswith('/static/') and self.public_dir:
-                        fs_path = self.public_dir / s.lstrip('/')
-                    elif self.public_dir:
-                        fs_path = self.public_dir / s.lstrip('/')
-                else:
-                    if base_dir:
-                        fs_path = (base_dir / s).resolve()
-            except Exception:
-                fs_path = None
-            if not fs_path or not fs_path.exists():
-                return None, None
-            # 生成小图（宽 24px）
-            if Image is None:
-                return None, None
-            try:
-                with Image.open(str(fs_path)) as im:
-                    im = im.convert('RGB')
-                    w0, h0 = im.size
-                    if w0 <= 0 or h0 <= 0:
-                        return None, None
-                    target_w = 24
-                    target_h = max(1, int(round(h0 * (target_w / float(w0)))))
-                    im_small = im.resize((target_w, target_h))
-                    import io
-                    buf = io.BytesIO()
-                    im_small.save(buf, format='JPEG', quality=30, optimize=True)
-                    b64 = base64.b64encode(buf.getvalue()).decode('ascii')
-                    data_url = f'data:image/jpeg;base64,{b64}'
-                    return data_url, (w0, h0)
-            except Exception:
-                return None, None
-            return None, None
         def repl_img(m):
             idx = len(images)
             html_img = m.group(0)
             images.append(html_img)
             ph = f"ph{idx}"
             ph_for_img.append(ph)
-            # 提取 src
-            src_m = re.search(r"\bsrc\s*=\s*(\"([^\"]*)\"|'([^']*)')", html_img, re.IGNORECASE)
-            src_val = src_m.group(2) if src_m and src_m.group(2) is not None else (src_m.group(3) if src_m else '')
-            lqip_url, wh = _gen_lqip(src_val or '')
-            style_bits: List[str] = []
-            if wh and wh[0] > 0 and wh[1] > 0:
-                style_bits.append(f"aspect-ratio: {wh[0]} / {wh[1]}")
-            if lqip_url:
-                # 直接内联背景，便于在图片块到达前展示模糊预览
-                style_bits.append(f"background-image: url('{lqip_url}')")
-                style_bits.append("background-size: cover")
-                style_bits.append("background-position: center")
-                style_bits.append("filter: blur(14px)")
-            style_attr = (" style=\"" + "; ".join(style_bits) + "\"") if style_bits else ""
-            data_attr = (f" data-lqip=\"{lqip_url}\"") if lqip_url else ""
-            return f'<div class="img-ph" data-ph="{ph}"{data_attr}{style_attr}><div class="lazy-spinner"></div></div>'
+            return self._img_placeholder(html_img, ph, base_dir, source)
         text_with_ph = img_re.sub(repl_img, html_content)
         # 2) 将文本按“行”（块级结束）切分
         # 使用常见块级元素结束作为换行点；保留分隔符在同一段末尾
@@ -326,7 +912,99 @@ class DocsIndexer:
             chunks.append(img_html)
             types.append('image')
             ph_ids.append(ph_for_img[idx])
-        return chunks, types, ph_ids
+        hashes = [chunk_hash(c) for c in chunks]
+        return chunks, types, ph_ids, hashes
+
+    def _gen_lqip(self, src_val: str, base_dir: Optional[Path], source: Optional[Path]) -> Tuple[Optional[str], Optional[Tuple[int, int]]]:
+        # 根据 <img> 的 src 生成 LQIP（仅本地文件）；返回 (data_url, (w,h)) 或 (None, None)
+        if not src_val:
+            return None, None
+        s = src_val.strip()
+        # data: 或 http(s): 跳过
+        if s.lower().startswith('data:') or s.lower().startswith('http:') or s.lower().startswith('https:'):
+            return None, None
+        # 解析本地路径：
+        # - 以 /static/ 开头 -> 映射到 public_dir
+        # - 以 / 开头 -> 若有 public_dir 则去掉前导 / 后拼接
+        # - 否则按 base_dir 相对路径解析
+        fs_path: Optional[Path] = None
+        try:
+            if s.startswith('/'):
+                # /static/foo/bar.png -> PUBLIC_DIR/static/foo/bar.png
+                if s.startswith('/static/') and self.public_dir:
+                    fs_path = self.public_dir / s.lstrip('/')
+                elif self.public_dir:
+                    fs_path = self.public_dir / s.lstrip('/')
+            else:
+                if base_dir:
+                    fs_path = (base_dir / s).resolve()
+        except Exception:
+            fs_path = None
+        if fs_path is not None:
+            self._record_dep(fs_path)
+        if not fs_path or not fs_path.exists():
+            return None, None
+        # 经缓存获取（后台模式下未命中时返回 (None, None)，生成完成后会重渲染 source）
+        return self._lqip.lookup(fs_path, source)
+
+    def _dep_name(self, fs_path: Path) -> str:
+        # 缓存中的图片路径相对 docs/ 或 public/ 记录，目录整体迁移后缓存仍然有效
+        for prefix, root in (("docs:", self.docs_root), ("public:", self.public_dir)):
+            if root is None:
+                continue
+            try:
+                return prefix + fs_path.relative_to(root).as_posix()
+            except ValueError:
+                continue
+        return str(fs_path)
+
+    def _dep_path(self, name: str) -> Optional[Path]:
+        if name.startswith("docs:"):
+            return self.docs_root / name[5:]
+        if name.startswith("public:"):
+            return self.public_dir / name[7:] if self.public_dir else None
+        return Path(name)
+
+    @staticmethod
+    def _dep_state(fs_path: Optional[Path]) -> Optional[List[int]]:
+        try:
+            st = fs_path.stat() if fs_path is not None else None
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size] if st is not None else None
+
+    def _lqip_keep(self, posts: Iterable[_PostData]) -> List[Tuple[Path, int, int]]:
+        # 渲染时记录的图片依赖即 LQIP 的查找 key（路径 + mtime + size）
+        keep: List[Tuple[Path, int, int]] = []
+        for data in posts:
+            for name, state in (data.deps or {}).items():
+                path = self._dep_path(name)
+                if path is not None and state:
+                    keep.append((path, state[0], state[1]))
+        return keep
+
+    def _record_dep(self, fs_path: Path) -> None:
+        deps = getattr(self._render_deps, "deps", None)
+        if deps is not None:
+            deps[self._dep_name(fs_path)] = self._dep_state(fs_path)
+
+    def _img_placeholder(self, html_img: str, ph: str, base_dir: Optional[Path], source: Optional[Path]) -> str:
+        # 提取 src
+        src_m = re.search(r"\bsrc\s*=\s*(\"([^\"]*)\"|'([^']*)')", html_img, re.IGNORECASE)
+        src_val = src_m.group(2) if src_m and src_m.group(2) is not None else (src_m.group(3) if src_m else '')
+        lqip_url, wh = self._gen_lqip(src_val or '', base_dir, source)
+        style_bits: List[str] = []
+        if wh and wh[0] > 0 and wh[1] > 0:
+            style_bits.append(f"aspect-ratio: {wh[0]} / {wh[1]}")
+        if lqip_url:
+            # 直接内联背景，便于在图片块到达前展示模糊预览
+            style_bits.append(f"background-image: url('{lqip_url}')")
+            style_bits.append("background-size: cover")
+            style_bits.append("background-position: center")
+            style_bits.append("filter: blur(14px)")
+        style_attr = (" style=\"" + "; ".join(style_bits) + "\"") if style_bits else ""
+        data_attr = (f" data-lqip=\"{lqip_url}\"") if lqip_url else ""
+        return f'<div class="img-ph" data-ph="{ph}"{data_attr}{style_attr}><div class="lazy-spinner"></div></div>'
 
     def _renumber_ol_by_heading(self, html_content: str) -> str:
         # 将 HTML 拆分为基于块级标题的段，然后在每段内按出现顺序重写 <ol> 中的 <li> 序号
@@ -372,21 +1050,406 @@ class DocsIndexer:
         return '\n'.join(result_lines)
 
     def scan_all(self) -> None:
+        """全量重建：在旁路构建新快照（含新的倒排索引与统计），完成后一次性切换。
+
+        构建期间读取方继续使用旧快照；删除的文件随切换一并消失。
+        """
+        with self._scan_lock:
+            self._scan_all()
+
+    def rebuild_in_background(self) -> threading.Thread:
+        """在后台线程中全量重建，不阻塞调用方与读取方。"""
+        t = threading.Thread(target=self.scan_all, name="docs-rebuild", daemon=True)
+        t.start()
+        return t
+
+    def _scan_all(self) -> None:
         if not self.docs_root.exists():
             self.docs_root.mkdir(parents=True, exist_ok=True)
+        t0 = time.perf_counter()
+        if self._render_cache is not None:
+            self._render_cache.reset_touched()
+        with self._lock:
+            self._scanning = True
+        loaded: Dict[str, _PostData] = {}
+        timings: List[Tuple[str, float]] = []
+        pending: List[Tuple[Path, bytes, Optional[str]]] = []
+        cached = 0
+        # slug -> 渲染缓存中已有条目的 key（预压缩结果随条目缓存）
+        cache_keys: Dict[str, Optional[str]] = {}
+        # 懒渲染模式下仍存在的文件对应的缓存 key（扫描时不读取缓存，清理时据此保留）
+        live_keys: Set[str] = set()
+        fingerprints: Dict[str, Tuple[int, int, str]] = {}
         for path in self.docs_root.rglob('*.md'):
-            self.index_file(path, bump=False)
-        # 全量扫描完毕后统一 bump
+            try:
+                st = path.stat()
+                raw = path.read_bytes()
+            except Exception:
+                continue
+            fingerprints[self._make_slug(path)] = (st.st_size, st.st_mtime_ns, _content_digest(raw))
+            # 懒渲染模式不读取渲染缓存：其条目含完整正文，启动时只需元数据
+            if self.lazy:
+                data, key = None, None
+                live = self._cache_key(path, raw)
+                if live:
+                    live_keys.add(live)
+            else:
+                data, key = self._cache_lookup(path, raw)
+            if data is not None:
+                loaded[data.meta.slug] = data
+                cache_keys[data.meta.slug] = key
+                cached += 1
+            else:
+                pending.append((path, raw, key))
+
+        # 懒渲染模式只解析 frontmatter，开销不足以抵消进程池的启动与序列化
+        workers = 1 if self.lazy else min(self.scan_workers, len(pending))
+        if workers > 1:
+            try:
+                self._render_parallel(pending, workers, loaded, timings, cache_keys)
+            except Exception as exc:
+                # 进程池不可用（受限环境等）时退回串行
+                logger.warning("parallel scan failed, falling back to serial: %s", exc)
+                workers = 1
+                timings.clear()
+        if workers <= 1:
+            for path, raw, key in pending:
+                t1 = time.perf_counter()
+                data = self._build_post(path, raw)
+                timings.append((path.relative_to(self.docs_root).as_posix(), (time.perf_counter() - t1) * 1000.0))
+                if data is None:
+                    continue
+                if not self._lqip.is_pending(path):
+                    cache_keys[data.meta.slug] = self._cache_store(key, data)
+                loaded[data.meta.slug] = data
+
+        # 全量扫描后清理不再对应任何文件的缓存条目（懒渲染模式按现存文件的 key 保留，正文渲染时才读取）
+        if self._render_cache is not None:
+            self._render_cache.prune(keep=live_keys if self.lazy else None)
+        # LQIP 磁盘缓存只保留当前文章引用的图片状态（懒渲染的占位不含图片依赖，无从判断，不清理）
+        if not self.lazy:
+            self._lqip.prune(self._lqip_keep(loaded.values()))
+        for slug, data in loaded.items():
+            self._attach_encoded(data, cache_keys.get(slug))
+        # 派生索引与排序在旁路构建
+        search = SearchIndex()
+        stats = PostAggregates()
+        sort_keys, order = self._build_order(loaded)
+        for slug, data in loaded.items():
+            self._index_derived(data, sort_keys[slug], search, stats)
+        # 全量扫描完毕后一次性切换并 bump
+        with self._lock:
+            old = self._snapshot
+            changed = [slug for slug, data in loaded.items() if not self._is_hidden(data)]
+            removed = [slug for slug, data in old.posts.items()
+                       if not self._is_hidden(data) and (slug not in loaded or self._is_hidden(loaded[slug]))]
+            self._fingerprints = {slug: fingerprints[slug] for slug in loaded}
+            self._snapshot = _IndexSnapshot(
+                version=old.version + 1,
+                posts=PersistentMap(loaded),
+                sort_keys=sort_keys,
+                order=order,
+                last_modified=max((pd.updated_at for pd in loaded.values()), default=None),
+                search=search,
+                stats=stats,
+            )
+            version = self._snapshot.version
+            self._scanning = False
+            held, self._lqip_held = self._lqip_held, set()
+            dirty, self._scan_dirty = self._scan_dirty, set()
+        for slug in set(old.posts) | set(loaded):
+            self._bodies.discard(slug)
+        self._notify(version, changed, removed)
+        # 扫描期间经变更队列发布的文件可能已被切换覆盖：重新入队，由指纹判断是否需要重建
+        for path_str in dirty:
+            self._changes.put(Path(path_str))
+        if dirty:
+            self._changes.start()
+        for path_str in held:
+            self._on_lqip_ready(Path(path_str))
+
+        wall_ms = (time.perf_counter() - t0) * 1000.0
+        timings.sort(key=lambda t: t[1], reverse=True)
+        self.scan_stats = {
+            "files": len(loaded),
+            "rendered": 0 if self.lazy else len(pending),
+            "cached": cached,
+            "lazy": self.lazy,
+            "workers": max(1, workers),
+            "wall_ms": round(wall_ms, 1),
+            "render_ms_total": round(sum(t[1] for t in timings), 1),
+            "markdown_pool": self._md_pool.stats(),
+            "per_file_ms": {name: round(ms, 2) for name, ms in timings},
+        }
+        logger.info(
+            "docs scan: %d files (%d rendered, %d cached) in %.1f ms with %d worker(s); slowest: %s",
+            len(loaded), len(pending), cached, wall_ms, max(1, workers),
+            ", ".join(f"{name} {ms:.1f}ms" for name, ms in timings[:5]) or "-",
+        )
+
+    def _build_order(self, posts: Mapping[str, _PostData]) -> Tuple[PersistentMap, Dict[str, PersistentSortedList]]:
+        sort_keys: Dict[str, Tuple[float, str]] = {}
+        parts: Dict[str, List[Tuple[float, str]]] = {p: [] for p in _ORDER_PARTITIONS}
+        for slug, data in posts.items():
+            key = (-self._sort_ts(data), slug)
+            sort_keys[slug] = key
+            for part in _partitions_for(data):
+                parts[part].append(key)
+        return PersistentMap(sort_keys), {p: PersistentSortedList(keys) for p, keys in parts.items()}
+
+    def adopt(self, snapshot: _IndexSnapshot, changed: List[str], removed: List[str],
+              dirty: Optional[Iterable[str]] = None) -> None:
+        """整体切换为由其他进程构建的快照（共享索引的只读进程）。
+
+        changed/removed 由调用方比对得出，原样通知监听者；dirty 为内容有变化的全部 slug（含 hidden），
+        只丢弃这些文章按需渲染的正文，省略时全部丢弃。
+        """
         with self._lock:
-            self.version += 1
+            old = self._snapshot
+            self._snapshot = snapshot
+        if dirty is None:
+            self._bodies.clear()
+        else:
+            for slug in dirty:
+                self._bodies.discard(slug)
+        if snapshot.version != old.version:
+            self._notify(snapshot.version, changed, removed)
+
+    def _render_parallel(self, pending: List[Tuple[Path, bytes, Optional[str]]], workers: int,
+                         loaded: Dict[str, _PostData], timings: List[Tuple[str, float]],
+                         cache_keys: Dict[str, Optional[str]]) -> None:
+        from concurrent.futures import ProcessPoolExecutor
+
+        keys = {str(path): key for path, _, key in pending}
+        jobs = [(str(path), raw) for path, raw, _ in pending]
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_scan_worker_init,
+            initargs=(str(self.docs_root), str(self.public_dir) if self.public_dir else None, self.precompress,
+                      str(self._lqip_cache_dir) if self._lqip_cache_dir else None),
+        ) as pool:
+            for path_str, data, ms in pool.map(_scan_worker_render, jobs, chunksize=chunksize):
+                timings.append((Path(path_str).relative_to(self.docs_root).as_posix(), ms))
+                if data is None:
+                    continue
+                cache_keys[data.meta.slug] = self._cache_store(keys.get(path_str), data)
+                loaded[data.meta.slug] = data
 
     def index_file(self, path: Path, bump: bool = True) -> None:
-        if not path.exists():
+        data = self._load_post(path)
+        if data is None:
             return
+        self._publish([data], [], bump=bump)
+
+    def _load_post(self, path: Path, force: bool = False) -> Optional[_PostData]:
+        # 读取 + 缓存查找/渲染 + 预压缩，不发布；内容与已发布版本一致时返回 None
+        # force=True：跳过指纹判断与渲染缓存（渲染结果依赖的图片等外部状态已变化）
         try:
-            fm = frontmatter.load(path)
+            st = path.stat()
+        except OSError:
+            return None
+        slug = self._make_slug(path)
+        with self._lock:
+            known = self._fingerprints.get(slug) if slug in self._snapshot.posts and not force else None
+        # 大小与 mtime 均未变：视为未修改，连文件都不必读取
+        if known is not None and known[:2] == (st.st_size, st.st_mtime_ns):
+            return None
+        try:
+            raw = path.read_bytes()
         except Exception:
+            return None
+        digest = _content_digest(raw)
+        fingerprint = (st.st_size, st.st_mtime_ns, digest)
+        if known is not None and known[2] == digest:
+            # touch / chmod / 原子保存等仅元数据变化：更新指纹，跳过渲染
+            with self._lock:
+                self._fingerprints[slug] = fingerprint
+            return None
+        if self.lazy:
+            data, cache_key = None, None
+        elif force:
+            data, cache_key = None, self._cache_key(path, raw)
+        else:
+            data, cache_key = self._cache_lookup(path, raw)
+        if data is None:
+            data = self._build_post(path, raw)
+            if data is None:
+                return None
+            # 仍有 LQIP 在后台生成：本次结果缺少预览，不写入磁盘缓存
+            cache_key = None if self._lqip.is_pending(path) else self._cache_store(cache_key, data)
+        self._attach_encoded(data, cache_key)
+        with self._lock:
+            self._fingerprints[slug] = fingerprint
+        return data
+
+    def _publish(self, upserts: List[_PostData], removals: List[str], bump: bool = True) -> bool:
+        """基于当前快照构造新快照并原子替换，一批新增/删除至多 bump 一次版本号；返回是否有变化。"""
+        # 通知监听者的 slug 列表：不包含 hidden 文章（由可见变为 hidden 视为删除）
+        notify_changed: List[str] = []
+        notify_removed: List[str] = []
+        with self._lock:
+            snap = self._snapshot
+            # 各容器 O(1) 复制，只复制本批改动所在的路径；旧快照保持不变，持有旧快照的读取方看不到本批改动
+            posts = snap.posts.copy()
+            sort_keys = snap.sort_keys.copy()
+            order = {part: keys.copy() for part, keys in snap.order.items()}
+            search = snap.search.clone()
+            stats = snap.stats.clone()
+            # 最近修改时间增量维护；只有当前最大值所在的文章被删除或时间回退时才整体重算
+            last_modified = snap.last_modified
+            stale = False
+            removed: List[str] = []
+            for slug in removals:
+                old = posts.pop(slug, None)
+                if old is None:
+                    continue
+                stale = stale or old.updated_at == last_modified
+                if not self._is_hidden(old):
+                    notify_removed.append(slug)
+                if self._scanning:
+                    self._scan_dirty.add(str(self.docs_root / old.meta.path))
+                self._order_remove(order, sort_keys, slug)
+                self._fingerprints.pop(slug, None)
+                search.remove(slug)
+                stats.remove(slug)
+                removed.append(slug)
+            for data in upserts:
+                slug = data.meta.slug
+                if not self._is_hidden(data):
+                    notify_changed.append(slug)
+                elif slug in posts and not self._is_hidden(posts[slug]):
+                    notify_removed.append(slug)
+                if self._scanning:
+                    self._scan_dirty.add(str(self.docs_root / data.meta.path))
+                prev = posts.get(slug)
+                if prev is not None and prev.updated_at == last_modified and data.updated_at < prev.updated_at:
+                    stale = True
+                posts[slug] = data
+                self._order_add(order, sort_keys, data)
+                # 派生索引随快照一同切换，新文章在列表与检索中同时出现
+                self._index_derived(data, sort_keys[slug], search, stats)
+            changed = bool(removed or upserts)
+            if not changed:
+                return False
+            if stale:
+                last_modified = max((pd.updated_at for pd in posts.values()), default=None)
+            else:
+                last_modified = max((t for t in [last_modified] + [d.updated_at for d in upserts] if t is not None),
+                                    default=None)
+            self._snapshot = _IndexSnapshot(
+                version=snap.version + 1 if bump else snap.version,
+                posts=posts,
+                sort_keys=sort_keys,
+                order=order,
+                last_modified=last_modified,
+                search=search,
+                stats=stats,
+            )
+            version = self._snapshot.version
+        for slug in removed:
+            self._bodies.discard(slug)
+        for data in upserts:
+            self._bodies.discard(data.meta.slug)
+        if bump:
+            self._notify(version, notify_changed, notify_removed)
+        return changed
+
+    def _payloads(self, data: _PostData) -> List[bytes]:
+        # 响应体与 app 中对应接口的 JSON 完全一致，可直接作为压缩后的包体返回：[整篇文章, 分块 0, 分块 1, ...]
+        slug = data.meta.slug
+        hashes = data.chunk_hashes or []
+        bodies = [orjson.dumps(self._to_post(data).model_dump())]
+        for i, c in enumerate(data.chunk_list()):
+            bodies.append(orjson.dumps(chunk_payload(slug, i, hashes[i] if i < len(hashes) else None, c)))
+        return bodies
+
+    def _attach_encoded(self, data: _PostData, cache_key: Optional[str] = None) -> None:
+        """预压缩整篇文章与各分块的响应体。
+
+        cache_key 为该文章渲染缓存条目的 key：压缩结果按响应体内容哈希存入条目旁的 .enc 文件，
+        热重启时直接读取，只有内容变化的响应体（如改名后的 slug）才重新压缩。
+        """
+        if not self.precompress or data.stub:
+            return
+        cache = self._render_cache if cache_key else None
+        if data.encoded is not None:
+            # 已在扫描工作进程中压缩：只需写入缓存
+            if cache is not None:
+                variants = [data.encoded.post] + data.encoded.chunks
+                cache.put_encoded(cache_key, {_content_digest(b): v for b, v in zip(self._payloads(data), variants)})
             return
+        known = cache.get_encoded(cache_key) if cache is not None else {}
+        table: Dict[str, Dict[str, bytes]] = {}
+        encoded: List[Dict[str, bytes]] = []
+        for body in self._payloads(data):
+            digest = _content_digest(body)
+            variants = table.get(digest)
+            if variants is None:
+                variants = known.get(digest)
+                if variants is None or set(variants) != _expected_encodings(len(body)):
+                    variants = compress_variants(body)
+                table[digest] = variants
+            encoded.append(variants)
+        data.encoded = _EncodedPayloads(post=encoded[0], chunks=encoded[1:])
+        if cache is not None and table != known:
+            cache.put_encoded(cache_key, table)
+
+    @staticmethod
+    def _index_derived(data: _PostData, sort_key: Tuple[float, str], search: SearchIndex, stats: PostAggregates) -> None:
+        # 派生索引：倒排索引与统计聚合
+        # 原样纯文本只用于建立倒排索引，子串检索的小写副本由 SearchIndex 保存
+        # （懒渲染占位的正文不参与子串匹配，只保留标题与标签）
+        search.add(data.meta.slug, data.meta.title, data.meta.tags, data.content_text, keep_text=not data.stub)
+        data.text = None
+        stats.add(data.meta, sort_key, data.updated_at)
+
+    @staticmethod
+    def _is_hidden(pd: _PostData) -> bool:
+        return getattr(pd.meta, 'visibility', 'public') == 'hidden'
+
+    def add_listener(self, listener: Callable[[int, List[str], List[str]], None]) -> None:
+        """注册版本变更监听；每次 bump 后以 (新版本号, 新增/修改的 slug, 删除的 slug) 调用。"""
+        self._listeners.append(listener)
+
+    def _notify(self, version: int, changed: List[str], removed: List[str]) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(version, changed, removed)
+            except Exception:
+                logger.exception("version listener failed")
+
+    def _cache_key(self, path: Path, raw: bytes) -> Optional[str]:
+        if self._render_cache is None:
+            return None
+        # 相对图片路径依赖所在目录，故将目录作为 key 的一部分
+        scope = path.parent.relative_to(self.docs_root).as_posix()
+        return self._render_cache.key_for(raw, scope)
+
+    def _cache_lookup(self, path: Path, raw: bytes) -> Tuple[Optional[_PostData], Optional[str]]:
+        key = self._cache_key(path, raw)
+        if key is None or self._render_cache is None:
+            return None, None
+        entry = self._render_cache.get(key)
+        if entry is None:
+            return None, key
+        return self._post_from_cache(path, entry), key
+
+    def _cache_store(self, key: Optional[str], data: _PostData) -> Optional[str]:
+        """写入渲染缓存，返回写入的 key（未写入时为 None）。"""
+        if self._render_cache is not None and key and not data.stub:
+            self._render_cache.put(key, self._post_to_cache(data))
+            return key
+        return None
+
+    def _build_post(self, path: Path, raw: bytes, render: Optional[bool] = None) -> Optional[_PostData]:
+        # render=False（懒渲染模式默认）：只生成元数据占位，摘要与字数由 Markdown 源文本近似计算
+        if render is None:
+            render = not self.lazy
+        try:
+            fm = frontmatter.loads(raw.decode('utf-8'))
+        except Exception:
+            return None
         meta = fm.metadata or {}
         title = str(meta.get('title') or path.stem)
         date_val = meta.get('date')
@@ -401,7 +1464,15 @@ class DocsIndexer:
         if vis not in ('public', 'unlisted', 'hidden'):
             vis = 'public'
         body = fm.content or ""
-        content_html, content_text, toc_html = self._render(body)
+        deps: Optional[Dict[str, Optional[List[int]]]] = None
+        if render:
+            self._render_deps.deps = deps = {}
+            try:
+                content_html, content_text, toc_html, chunks, types, ph_ids, hashes = self._render_post(body, base_dir=path.parent, source=path)
+            finally:
+                self._render_deps.deps = None
+        else:
+            content_html, content_text, toc_html, chunks, types, ph_ids, hashes = "", _markdown_to_text(body), "", [], [], [], []
         rel = path.relative_to(self.docs_root).as_posix()
         slug = self._make_slug(path)
         summary = meta.get('summary') or self._extract_summary(content_text)
@@ -427,46 +1498,148 @@ class DocsIndexer:
             reading_time=reading_time,
         )
         updated_at = path.stat().st_mtime
-        # 去除开头的 TOC 再进行分块，避免目录混入正文顶部（仅用于分块数据）
-        content_for_chunks = self._strip_leading_toc(content_html)
-        chunks, types, ph_ids = self._chunk_html(content_for_chunks, base_dir=path.parent)
-        data = _PostData(meta=post_meta, content_html=content_html, content_text=content_text, updated_at=updated_at, chunks=chunks, toc_html=toc_html or "", chunk_types=types, ph_ids=ph_ids)
-        with self._lock:
-            self._posts[slug] = data
-            if bump:
-                self.version += 1
+        data = _PostData.pack(post_meta, content_html, content_text, updated_at, chunks, toc_html or "", chunk_types=types, ph_ids=ph_ids, chunk_hashes=hashes)
+        data.stub = not render
+        data.title_from_path = not meta.get('title')
+        data.deps = deps
+        return data
+
+    def _render_body(self, stub: _PostData) -> Optional[_PostData]:
+        """懒渲染：为占位渲染正文（先查磁盘渲染缓存），元数据沿用占位中的版本。"""
+        path = self.docs_root / stub.meta.path
+        try:
+            raw = path.read_bytes()
+        except OSError:
+            return None
+        data, key = self._cache_lookup(path, raw)
+        if data is None:
+            data = self._build_post(path, raw, render=True)
+            if data is None:
+                return None
+            key = None if self._lqip.is_pending(path) else self._cache_store(key, data)
+        # 列表、sitemap 与正文接口使用同一份元数据
+        data.meta = stub.meta
+        data.updated_at = stub.updated_at
+        data.text = None
+        self._attach_encoded(data, key)
+        return data
+
+    def _body(self, data: _PostData) -> Optional[_PostData]:
+        # 非占位直接返回；占位经 LRU 取得（未命中时渲染，并发未命中只渲染一次）
+        if not data.stub:
+            return data
+        return self._bodies.get(data, self._render_body)
+
+    def _visible(self, slug: str) -> Optional[_PostData]:
+        data = self._snapshot.posts.get(slug)
+        if not data or getattr(data.meta, 'visibility', 'public') == 'hidden':
+            return None
+        return data
+
+    def _post_to_cache(self, data: _PostData) -> Dict[str, Any]:
+        return {
+            "meta": data.meta.model_dump(),
+            "content_html": data.content_html,
+            "content_text": data.content_text,
+            "toc_html": data.toc_html,
+            "chunks": data.chunk_list(),
+            "chunk_types": data.chunk_types,
+            "ph_ids": data.ph_ids,
+            "chunk_hashes": data.chunk_hashes,
+            "title_from_path": data.title_from_path,
+            "deps": data.deps or {},
+        }
+
+    def _post_from_cache(self, path: Path, entry: Dict[str, Any]) -> Optional[_PostData]:
+        try:
+            deps = entry.get("deps") or {}
+            # 引用的图片已替换/新增/删除：LQIP 与宽高比已过期，视为未命中
+            for name, state in deps.items():
+                if self._dep_state(self._dep_path(name)) != state:
+                    return None
+            meta = dict(entry["meta"])
+            # slug/path 由当前文件位置决定，不信任缓存中的值；未写 title 的文章标题随文件名变化
+            meta["slug"] = self._make_slug(path)
+            meta["path"] = path.relative_to(self.docs_root).as_posix()
+            if entry.get("title_from_path"):
+                meta["title"] = path.stem
+            data = _PostData.pack(
+                PostMeta(**meta),
+                entry["content_html"],
+                entry["content_text"],
+                path.stat().st_mtime,
+                list(entry["chunks"]),
+                entry.get("toc_html") or "",
+                chunk_types=entry.get("chunk_types"),
+                ph_ids=entry.get("ph_ids"),
+                chunk_hashes=entry.get("chunk_hashes"),
+            )
+        except Exception:
+            return None
+        data.title_from_path = bool(entry.get("title_from_path"))
+        data.deps = deps
+        return data
 
     def remove_file(self, path: Path) -> None:
-        slug = self._make_slug(path)
-        with self._lock:
-            if slug in self._posts:
-                del self._posts[slug]
-                self.version += 1
+        self._publish([], [self._make_slug(path)])
+
+    def _paths_under(self, dir_path: Path) -> List[Path]:
+        """已索引文章中位于 dir_path 之下的文件路径（用于目录删除/移动）。"""
+        try:
+            rel = dir_path.relative_to(self.docs_root).as_posix()
+        except ValueError:
+            return []
+        prefix = '' if rel in ('', '.') else rel + '/'
+        return [self.docs_root / pd.meta.path for pd in self._snapshot.posts.values() if pd.meta.path.startswith(prefix)]
+
+    @staticmethod
+    def _sort_ts(pd: _PostData) -> float:
+        # 依据 frontmatter 的 date 或文件修改时间排序（新->旧）；统一归一化为时间戳，
+        # 避免带/不带时区的 datetime 混合比较
+        if pd.meta.date:
+            try:
+                return datetime.fromisoformat(pd.meta.date.replace('Z', '+00:00')).timestamp()
+            except Exception:
+                pass
+        return pd.updated_at
+
+    @staticmethod
+    def _order_remove(order: Dict[str, PersistentSortedList], sort_keys: PersistentMap, slug: str) -> None:
+        key = sort_keys.pop(slug, None)
+        if key is None:
+            return
+        for keys in order.values():
+            keys.remove(key)
+
+    def _order_add(self, order: Dict[str, PersistentSortedList], sort_keys: PersistentMap, pd: _PostData) -> None:
+        slug = pd.meta.slug
+        self._order_remove(order, sort_keys, slug)
+        key = (-self._sort_ts(pd), slug)
+        sort_keys[slug] = key
+        for part in _partitions_for(pd):
+            order[part].add(key)
+
+    def _ordered_metas(self, partition: str, start: int = 0, end: Optional[int] = None) -> List[PostMeta]:
+        snap = self._snapshot
+        return [snap.posts[slug].meta for _, slug in snap.order[partition][start:end]]
 
     def _sorted_posts(self, metas_only: bool = True) -> List[PostMeta]:
-        # 依据 frontmatter 的 date 或文件修改时间排序（新->旧）
-        with self._lock:
-            data_list = list(self._posts.values())
-        def key(pd: _PostData):
-            if pd.meta.date:
-                try:
-                    return datetime.fromisoformat(pd.meta.date)
-                except Exception:
-                    return datetime.fromtimestamp(pd.updated_at)
-            return datetime.fromtimestamp(pd.updated_at)
-        data_list.sort(key=key, reverse=True)
+        snap = self._snapshot
+        data_list = [snap.posts[slug] for _, slug in snap.order["all"]]
         return [p.meta for p in data_list] if metas_only else data_list
 
-    def list_posts(self) -> List[PostMeta]:
-        # 列表仅显示 public
-        items = self._sorted_posts(metas_only=True)
-        return [m for m in items if getattr(m, 'visibility', 'public') == 'public']
+    def count_posts(self) -> int:
+        return len(self._snapshot.order["public"])
+
+    def list_posts(self, offset: int = 0, limit: Optional[int] = None) -> List[PostMeta]:
+        # 列表仅显示 public；按预排序分区直接切片
+        end = None if limit is None else offset + limit
+        return self._ordered_metas("public", offset, end)
 
     def search_posts(self, query: Optional[str]) -> List[PostMeta]:
         if not query:
             # 无搜索时，仅返回 public（用于分页等场景）
-            items = self._sorted_posts(metas_only=True)
-            return [m for m in items if getattr(m, 'visibility', 'public') == 'public']
+            return self.list_posts()
 
         raw_q = query.strip()
         # 支持前端传入的 tag:前缀，用于按标签精确筛选
@@ -475,84 +1648,187 @@ class DocsIndexer:
         if raw_q.lower().startswith(tag_prefix):
             tag_only = raw_q[len(tag_prefix):].strip().lower()
 
-        q = raw_q.lower()
-        with self._lock:
-            data_list = list(self._posts.values())
+        snap = self._snapshot
+        if tag_only is not None:
+            slugs = snap.search.by_tag(tag_only)
+            keys = [snap.sort_keys[s] for s in slugs if s in snap.posts]
+            # 标签筛选按新->旧
+            keys.sort()
+            hits = [snap.posts[slug] for _, slug in keys]
+            return [pd.meta for pd in hits if getattr(pd.meta, 'visibility', 'public') in ('public', 'unlisted')]
 
-        def hit(pd: _PostData) -> bool:
-            # 若为 tag: 前缀，则只按标签精确/包含匹配
-            if tag_only is not None:
-                return any(tag_only == (t or '').lower() for t in pd.meta.tags)
-            if q in (pd.meta.title or '').lower():
-                return True
-            if any(q in (t or '').lower() for t in pd.meta.tags):
-                return True
-            if q in (pd.content_text or '').lower():
-                return True
-            return False
+        ranked = snap.search.search(raw_q)
+        if ranked is None:
+            # 查询中没有可索引的词（如纯符号），退回子串匹配
+            return self._search_substring(raw_q.lower())
+        scored = [(snap.posts[s], score, snap.sort_keys[s]) for s, score in ranked if s in snap.posts]
+        scored = [item for item in scored if getattr(item[0].meta, 'visibility', 'public') in ('public', 'unlisted')]
+        # 相关度优先，同分按新->旧
+        scored.sort(key=lambda item: (-item[1], item[2]))
+        return [pd.meta for pd, _, _ in scored]
 
-        filtered = [pd for pd in data_list if hit(pd) and getattr(pd.meta, 'visibility', 'public') in ('public', 'unlisted')]
-        # 按新->旧
-        filtered.sort(key=lambda pd: datetime.fromisoformat(pd.meta.date) if pd.meta.date else datetime.fromtimestamp(pd.updated_at), reverse=True)
-        return [pd.meta for pd in filtered]
+    def _search_substring(self, q: str) -> List[PostMeta]:
+        snap = self._snapshot
+        # listed 分区已按新->旧排序
+        listed = [slug for _, slug in snap.order["listed"]]
+        hits = set(snap.search.substring(q, listed))
+        if self.lazy:
+            # 懒渲染占位只按标题与标签匹配；已在 LRU 中的正文一并参与（避免一次查询渲染全部文章）
+            for slug in listed:
+                if slug in hits:
+                    continue
+                pd = snap.posts[slug]
+                body = self._bodies.peek(pd) if pd.stub else None
+                if body is not None and q in body.search_text():
+                    hits.add(slug)
+        return [snap.posts[slug].meta for slug in listed if slug in hits]
 
     def get_post(self, slug: str) -> Optional[Post]:
-        with self._lock:
-            data = self._posts.get(slug)
-            if not data:
+        data = self._visible(slug)
+        if data is not None:
+            data = self._body(data)
+        return self._to_post(data) if data is not None else None
+
+    @staticmethod
+    def _to_post(data: _PostData) -> Post:
+        return Post(
+            slug=data.meta.slug,
+            title=data.meta.title,
+            date=data.meta.date,
+            tags=data.meta.tags,
+            summary=data.meta.summary,
+            path=data.meta.path,
+            content_html=data.content_html,
+            content_text=data.content_text,
+        )
+
+    def get_post_encoded(self, slug: str, encoding: str) -> Optional[bytes]:
+        """返回预压缩的整篇文章 JSON；无对应变体时返回 None，由调用方走常规序列化。"""
+        data = self._visible(slug)
+        if data is not None:
+            data = self._body(data)
+        if data is None or data.encoded is None:
+            return None
+        return data.encoded.post.get(encoding)
+
+    def get_chunk_encoded(self, slug: str, encoding: str, index: Optional[int] = None, digest: Optional[str] = None) -> Optional[bytes]:
+        """按索引或内容哈希返回预压缩的分块 JSON。"""
+        data = self._visible(slug)
+        if data is not None:
+            data = self._body(data)
+        if data is None or data.encoded is None:
+            return None
+        if digest is not None:
+            try:
+                pos = (data.chunk_hashes or []).index(digest)
+            except ValueError:
                 return None
-            if getattr(data.meta, 'visibility', 'public') == 'hidden':
+        else:
+            pos = index if index is not None else -1
+        variants = data.encoded.chunks
+        if pos < 0 or pos >= len(variants):
+            return None
+        return variants[pos].get(encoding)
+
+    def get_chunk_payload(self, slug: str, index: Optional[int] = None, digest: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """按索引或内容哈希返回分块 JSON（与预压缩的响应体逐字节一致），不存在时返回 None。"""
+        data = self._visible(slug)
+        if data is not None:
+            data = self._body(data)
+        if data is None:
+            return None
+        hashes = data.chunk_hashes or []
+        if digest is not None:
+            try:
+                # 同一内容出现多次时取首次出现的位置（与 get_chunk_encoded 一致）
+                index = hashes.index(digest)
+            except ValueError:
                 return None
-            return Post(
-                slug=data.meta.slug,
-                title=data.meta.title,
-                date=data.meta.date,
-                tags=data.meta.tags,
-                summary=data.meta.summary,
-                path=data.meta.path,
-                content_html=data.content_html,
-                content_text=data.content_text,
-            )
+        if index is None or index < 0 or index >= data.n_chunks:
+            return None
+        return chunk_payload(data.meta.slug, index, hashes[index] if index < len(hashes) else None, data.chunk(index))
 
     def get_post_updated_at(self, slug: str) -> Optional[float]:
-        with self._lock:
-            data = self._posts.get(slug)
-            return data.updated_at if data else None
+        data = self._snapshot.posts.get(slug)
+        return data.updated_at if data else None
 
-    def get_post_manifest(self, slug: str) -> Optional[Tuple[PostMeta, int, str, Optional[List[str]], Optional[List[Optional[str]]]]]:
-        with self._lock:
-            data = self._posts.get(slug)
-            if not data:
-                return None
-            if getattr(data.meta, 'visibility', 'public') == 'hidden':
-                return None
-            total = len(data.chunks) if data.chunks else 0
-            return (data.meta, total, data.toc_html, data.chunk_types, data.ph_ids)
+    def post_activity(self, since_ts: float) -> Dict[int, int]:
+        return self._snapshot.stats.activity(since_ts)
+
+    def tag_stats(self) -> List[Dict[str, Any]]:
+        return self._snapshot.stats.tags()
+
+    def archive_stats(self) -> List[Dict[str, Any]]:
+        return self._snapshot.stats.archive()
+
+    def last_modified(self) -> Optional[float]:
+        """所有文章中最近的文件修改时间（用于 sitemap/rss 的 Last-Modified）。"""
+        return self._snapshot.last_modified
+
+    def get_post_manifest(self, slug: str) -> Optional[Tuple[PostMeta, int, str, Optional[List[str]], Optional[List[Optional[str]]], Optional[List[str]]]]:
+        data = self._visible(slug)
+        if data is not None:
+            data = self._body(data)
+        if data is None:
+            return None
+        return (data.meta, data.n_chunks, data.toc_html, data.chunk_types, data.ph_ids, data.chunk_hashes)
 
     def get_post_chunk(self, slug: str, index: int) -> Optional[str]:
-        with self._lock:
-            data = self._posts.get(slug)
-            if not data:
-                return None
-            if getattr(data.meta, 'visibility', 'public') == 'hidden':
+        data = self._visible(slug)
+        if data is not None:
+            data = self._body(data)
+        if data is None or index < 0 or index >= data.n_chunks:
+            return None
+        return data.chunk(index)
+
+    def get_post_chunks(self, slug: str, indices: Optional[List[int]] = None, start: int = 0,
+                        end: Optional[int] = None,
+                        hashes: Optional[List[str]] = None) -> Optional[Tuple[List[int], Callable[[int], str]]]:
+        """批量取块：返回 (块索引列表, 按索引解码块的函数)，块在调用方逐个取用时才解码。
+
+        hashes 指定时按内容哈希取块（同一内容取首次出现的位置，任一未知返回 None）；
+        indices 指定时按其顺序返回（任一越界返回 None）；否则取 [start, end)，并截断到块数以内。
+        """
+        data = self._visible(slug)
+        if data is not None:
+            data = self._body(data)
+        if data is None:
+            return None
+        n = data.n_chunks
+        if hashes is not None:
+            first: Dict[str, int] = {}
+            for i, h in enumerate(data.chunk_hashes or []):
+                first.setdefault(h, i)
+            if any(h not in first for h in hashes):
                 return None
-            if index < 0 or index >= len(data.chunks):
+            return [first[h] for h in hashes], data.chunk
+        if indices is not None:
+            if any(i < 0 or i >= n for i in indices):
                 return None
-            return data.chunks[index]
+            return list(indices), data.chunk
+        return list(range(max(0, start), min(n, n if end is None else end))), data.chunk
+
+    def get_post_chunk_by_hash(self, slug: str, digest: str) -> Optional[str]:
+        data = self._visible(slug)
+        if data is not None:
+            data = self._body(data)
+        if data is None or not data.chunk_hashes:
+            return None
+        try:
+            pos = data.chunk_hashes.index(digest)
+        except ValueError:
+            return None
+        return data.chunk(pos)
 
     def get_post_meta(self, slug: str) -> Optional[PostMeta]:
-        with self._lock:
-            data = self._posts.get(slug)
-            if not data:
-                return None
-            if getattr(data.meta, 'visibility', 'public') == 'hidden':
-                return None
-            return data.meta
+        data = self._visible(slug)
+        return data.meta if data is not None else None
 
     def start_watch(self) -> None:
         if self._observer:
             return
-        handler = _DocsEventHandler(self)
+        self._changes.start()
+        handler = _DocsEventHandler(self, self._changes)
         observer = Observer()
         observer.schedule(handler, str(self.docs_root), recursive=True)
         observer.start()
@@ -563,11 +1839,62 @@ class DocsIndexer:
             self._observer.stop()
             self._observer.join(timeout=2)
             self._observer = None
+        self._changes.stop()
+        self._lqip.shutdown()
 
-    def etag_for_posts(self) -> str:
+    def wait_idle(self, timeout: float = 60.0) -> bool:
+        """等待后台 LQIP 生成及其触发的重渲染全部发布（用于静态导出等一次性构建）；超时返回 False。"""
+        deadline = time.monotonic() + timeout
+        settled = 0
+        while time.monotonic() < deadline:
+            # 连续两次检查均空闲：LQIP 完成回调与入队之间存在极短的间隙
+            settled = settled + 1 if self._lqip.pending() == 0 and self._changes.idle() else 0
+            if settled >= 2:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def _on_lqip_ready(self, path: Path) -> None:
+        # 由 LQIP 线程池回调：将所属文章作为强制变更入队，经变更队列重渲染并发布
+        if self.read_only:
+            # 只读进程不发布：丢弃按需渲染的正文，下次访问时带预览重新渲染
+            try:
+                self._bodies.discard(self._make_slug(path))
+            except ValueError:
+                pass
+            return
         with self._lock:
-            v = self.version
-        return f'W/"posts-{v}"'
+            if self._scanning:
+                self._lqip_held.add(str(path))
+                return
+        self._changes.put(path, force=True)
+        self._changes.start()
+
+    def memory_stats(self, top: int = 5) -> Dict[str, Any]:
+        """已发布文章的内存占用（字节）：总量、每篇平均值与占用最大的几篇；懒渲染模式另含正文 LRU 的情况。"""
+        items = [(slug, pd.memory_bytes()) for slug, pd in self._snapshot.posts.items()]
+        totals: Dict[str, int] = {}
+        for _, m in items:
+            for k, v in m.items():
+                totals[k] = totals.get(k, 0) + v
+        per_post = {slug: sum(m.values()) for slug, m in items}
+        total = sum(per_post.values())
+        n = len(items)
+        return {
+            "posts": n,
+            "total": total,
+            "by_kind": totals,
+            "avg_per_post": round(total / n, 1) if n else 0,
+            "largest": sorted(per_post.items(), key=lambda kv: kv[1], reverse=True)[:top],
+            "lazy_bodies": self._bodies.stats() if self.lazy else None,
+        }
+
+    def watch_stats(self) -> Dict[str, Any]:
+        """变更队列指标：队列深度、最早未处理事件的等待时长、最近一批的处理情况。"""
+        return self._changes.stats()
+
+    def etag_for_posts(self) -> str:
+        return f'W/"posts-{self.version}"'
 
     def etag_for_post(self, slug: str) -> Optional[str]:
         ts = self.get_post_updated_at(slug)
@@ -0,0 +1,194 @@
+from __future__ import annotations
+import base64
+import io
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .render_cache import RenderCache
+
+try:
+    from PIL import Image  # type: ignore
+except Exception:
+    Image = None  # Pillow 可选；缺失时跳过 LQIP 生成
+
+logger = logging.getLogger(__name__)
+
+LqipResult = Tuple[Optional[str], Optional[Tuple[int, int]]]
+
+# 模糊预览图宽度（像素）
+LQIP_WIDTH = 24
+# 内存中保留的预览条数（每条约 1 KB 的 data URL），按最近最少使用淘汰
+LQIP_MEMORY_ITEMS = 4096
+
+
+def lqip_fingerprint() -> str:
+    """预览图生成参数 + Pillow 版本；变化时磁盘缓存自动失效。"""
+    version = "none"
+    if Image is not None:
+        try:
+            import PIL  # type: ignore
+            version = PIL.__version__
+        except Exception:
+            version = "unknown"
+    return f"lqip-1|w={LQIP_WIDTH}|q=30|pil={version}"
+
+
+def generate_lqip(fs_path: Path) -> LqipResult:
+    """生成 24px 宽的 JPEG 预览（data URL）与原图尺寸；失败返回 (None, None)。"""
+    if Image is None:
+        return None, None
+    try:
+        with Image.open(str(fs_path)) as im:
+            w0, h0 = im.size
+            if w0 <= 0 or h0 <= 0:
+                return None, None
+            target_w = LQIP_WIDTH
+            target_h = max(1, int(round(h0 * (target_w / float(w0)))))
+            # JPEG 等格式支持按比例缩小解码（draft），避免完整解码大图
+            try:
+                im.draft('RGB', (target_w * 2, target_h * 2))
+            except Exception:
+                pass
+            im_small = im.convert('RGB').resize((target_w, target_h))
+            buf = io.BytesIO()
+            im_small.save(buf, format='JPEG', quality=30, optimize=True)
+            b64 = base64.b64encode(buf.getvalue()).decode('ascii')
+            return f'data:image/jpeg;base64,{b64}', (w0, h0)
+    except Exception:
+        return None, None
+
+
+class LqipCache:
+    """LQIP/尺寸缓存，key 为 (图片路径, mtime_ns, size)。
+
+    先查内存（限 max_memory 条的 LRU），再查磁盘；均未命中时：
+    - background=False：同步生成（用于并行扫描的工作进程等场景）
+    - background=True：提交到线程池，本次返回 (None, None)，完成后通过
+      on_ready(owner) 通知引用该图片的文章重新生成占位符
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        background: bool = False,
+        on_ready: Optional[Callable[[Path], None]] = None,
+        workers: int = 2,
+        max_memory: int = LQIP_MEMORY_ITEMS,
+    ) -> None:
+        self._disk: Optional[RenderCache] = RenderCache(cache_dir, lqip_fingerprint()) if cache_dir else None
+        self.background = background
+        self.on_ready = on_ready
+        self._workers = workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.max_memory = max(0, int(max_memory))
+        self._memory: "OrderedDict[str, LqipResult]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        # 图片 key -> 等待该图片的文章路径
+        self._waiters: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def _key(fs_path: Path) -> Optional[str]:
+        try:
+            st = fs_path.stat()
+        except OSError:
+            return None
+        return f"{fs_path}|{st.st_mtime_ns}|{st.st_size}"
+
+    def prune(self, keep: Iterable[Tuple[Path, int, int]]) -> int:
+        """删除磁盘上不在 keep（(图片路径, mtime_ns, size)，即当前文章引用的图片状态）中的条目，返回删除数。"""
+        if self._disk is None:
+            return 0
+        alive: List[str] = [self._disk.key_for(f"{p}|{mtime_ns}|{size}".encode("utf-8")) for p, mtime_ns, size in keep]
+        return self._disk.prune(keep=alive)
+
+    def _load(self, key: str) -> Optional[LqipResult]:
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                self._memory.move_to_end(key)
+        if hit is not None:
+            return hit
+        if self._disk is None:
+            return None
+        entry = self._disk.get(self._disk.key_for(key.encode("utf-8")))
+        if entry is None:
+            return None
+        size = entry.get("size")
+        result: LqipResult = (entry.get("data_url"), (int(size[0]), int(size[1])) if size else None)
+        self._remember(key, result)
+        return result
+
+    def _remember(self, key: str, result: LqipResult) -> None:
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
+
+    def _store(self, key: str, result: LqipResult) -> None:
+        self._remember(key, result)
+        if self._disk is not None:
+            data_url, size = result
+            self._disk.put(self._disk.key_for(key.encode("utf-8")), {"data_url": data_url, "size": list(size) if size else None})
+
+    def lookup(self, fs_path: Path, owner: Optional[Path] = None) -> LqipResult:
+        if Image is None:
+            return None, None
+        key = self._key(fs_path)
+        if key is None:
+            return None, None
+        hit = self._load(key)
+        if hit is not None:
+            return hit
+        if not self.background or owner is None:
+            result = generate_lqip(fs_path)
+            self._store(key, result)
+            return result
+        with self._lock:
+            self._waiters.setdefault(key, set()).add(str(owner))
+            if key not in self._inflight:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="lqip")
+                fut = self._pool.submit(generate_lqip, fs_path)
+                self._inflight[key] = fut
+                fut.add_done_callback(lambda f, k=key: self._done(k, f))
+        return None, None
+
+    def _done(self, key: str, fut: Future) -> None:
+        try:
+            result = fut.result()
+        except Exception:
+            result = (None, None)
+        self._store(key, result)
+        with self._lock:
+            self._inflight.pop(key, None)
+            owners = self._waiters.pop(key, set())
+        if self.on_ready is None:
+            return
+        for owner in owners:
+            try:
+                self.on_ready(Path(owner))
+            except Exception:
+                logger.exception("lqip ready callback failed for %s", owner)
+
+    def is_pending(self, owner: Path) -> bool:
+        """owner 文章是否仍有图片在后台生成中（此时其渲染结果不应写入磁盘缓存）。"""
+        o = str(owner)
+        with self._lock:
+            return any(o in owners for owners in self._waiters.values())
+
+    def pending(self) -> int:
+        """后台生成中的图片数。"""
+        with self._lock:
+            return len(self._inflight)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
@@ -35,10 +35,19 @@ class PostManifest(BaseModel):
     # 分块元数据：与 chunk 索引一一对应
     chunk_types: Optional[List[str]] = None  # 'text' | 'image'
     ph_ids: Optional[List[Optional[str]]] = None  # 图片块对应的占位符 id，文本块为 None
+    chunk_hashes: Optional[List[str]] = None  # 块内容哈希，可通过 /api/post/{slug}/c/{hash} 获取（不可变缓存）
 
 class PostChunk(BaseModel):
     slug: str
     index: int
+    hash: Optional[str] = None
+    html: str
+
+# 与 PostChunk 字段相同：/chunk/{index} 与 /c/{hash} 共用同一份响应体（index 为内容首次出现的位置）
+class HashedChunk(BaseModel):
+    slug: str
+    index: int
+    hash: str
     html: str
 
 
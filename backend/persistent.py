@@ -0,0 +1,392 @@
+"""写时复制的持久化容器：索引快照之间共享未改动的部分，一次增量发布只复制被修改的路径。
+
+- PersistentMap：按键哈希分层的 32 叉树（HAMT），叶子为小字典；copy() 为 O(1)，之后副本上的写入
+  只复制从根到被修改叶子的路径（O(log n)）
+- BucketMap：键 -> 桶（{成员: 值}）的两级映射，如 词 -> {slug: tf}；小桶为 dict，整桶复制，
+  超过 BUCKET_MAX 后换成 PersistentMap，写入只复制路径
+- PersistentSortedList：分段有序列表（每段约 _LOAD 项）；copy() 只复制段表，写入只复制被修改的段
+
+写入只发生在尚未发布的副本上（DocsIndexer._publish 持写锁构造新快照）；已发布的实例不再修改，
+读取方无需加锁。copy() 之后原实例若再被写入，同样先复制路径，不会影响副本。
+"""
+from __future__ import annotations
+import bisect
+from collections.abc import ItemsView, Mapping, ValuesView
+from itertools import islice
+from typing import Any, Dict, Generic, Hashable, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar, Union
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+T = TypeVar("T")
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_MASK = (1 << 64) - 1
+# 叶子字典超过该大小时按下一段哈希位拆分（哈希位用尽时不再拆分）
+_LEAF_MAX = 16
+# BucketMap 中桶由 dict 换成 PersistentMap 的阈值
+BUCKET_MAX = 64
+# PersistentSortedList 每段的目标长度；超过 2 倍时拆分，不足一半时与相邻段合并
+_LOAD = 256
+
+
+class _Leaf:
+    __slots__ = ("owner", "items")
+
+    def __init__(self, owner: object, items: Dict[Any, Any]) -> None:
+        self.owner = owner
+        self.items = items
+
+
+class _Node:
+    __slots__ = ("owner", "kids")
+
+    def __init__(self, owner: object, kids: List[Any]) -> None:
+        self.owner = owner
+        self.kids = kids
+
+
+class _Items(ItemsView):
+    def __iter__(self):
+        for items in self._mapping._leaves():
+            yield from items.items()
+
+
+class _Values(ValuesView):
+    def __iter__(self):
+        for items in self._mapping._leaves():
+            yield from items.values()
+
+
+class PersistentMap(Mapping, Generic[K, V]):
+    """支持 O(1) copy() 的哈希映射；读取接口与 dict 相同，迭代顺序按哈希而非插入顺序。"""
+
+    __slots__ = ("_root", "_len", "_owner")
+
+    def __init__(self, items: Union[Mapping, Iterable[Tuple[Any, Any]], None] = None) -> None:
+        # 节点的 owner 与本实例的 _owner 相同时可原地修改，否则先复制
+        self._owner = object()
+        self._root: Any = _Leaf(self._owner, {})
+        self._len = 0
+        if items:
+            for key, value in (items.items() if isinstance(items, Mapping) else items):
+                self[key] = value
+
+    def copy(self) -> "PersistentMap[K, V]":
+        other = PersistentMap.__new__(PersistentMap)
+        other._root = self._root
+        other._len = self._len
+        other._owner = object()
+        # 两者此后都不再拥有共享的节点
+        self._owner = object()
+        return other
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _leaf(self, h: int) -> Optional[_Leaf]:
+        node = self._root
+        shift = 0
+        while type(node) is _Node:
+            node = node.kids[(h >> shift) & _MASK]
+            if node is None:
+                return None
+            shift += _BITS
+        return node
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        leaf = self._leaf(hash(key) & _HASH_MASK)
+        return default if leaf is None else leaf.items.get(key, default)
+
+    def __getitem__(self, key: Any) -> Any:
+        leaf = self._leaf(hash(key) & _HASH_MASK)
+        if leaf is None:
+            raise KeyError(key)
+        return leaf.items[key]
+
+    def __contains__(self, key: Any) -> bool:
+        leaf = self._leaf(hash(key) & _HASH_MASK)
+        return leaf is not None and key in leaf.items
+
+    def _leaves(self) -> Iterator[Dict[Any, Any]]:
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if type(node) is _Leaf:
+                yield node.items
+            else:
+                stack.extend(k for k in node.kids if k is not None)
+
+    def __iter__(self) -> Iterator[Any]:
+        for items in self._leaves():
+            yield from items
+
+    def items(self) -> ItemsView:
+        return _Items(self)
+
+    def values(self) -> ValuesView:
+        return _Values(self)
+
+    def _own(self, node: Any) -> Any:
+        if node.owner is self._owner:
+            return node
+        if type(node) is _Leaf:
+            return _Leaf(self._owner, dict(node.items))
+        return _Node(self._owner, list(node.kids))
+
+    def _path(self, h: int) -> Tuple[Optional[_Node], int, _Leaf, int]:
+        """复制（如需要）从根到 h 所在叶子的路径，返回 (父节点, 在父节点中的位置, 叶子, 叶子深度的位移)。"""
+        node = self._root = self._own(self._root)
+        parent: Optional[_Node] = None
+        idx = 0
+        shift = 0
+        while type(node) is _Node:
+            idx = (h >> shift) & _MASK
+            child = node.kids[idx]
+            child = node.kids[idx] = _Leaf(self._owner, {}) if child is None else self._own(child)
+            parent, node = node, child
+            shift += _BITS
+        return parent, idx, node, shift
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        h = hash(key) & _HASH_MASK
+        parent, idx, leaf, shift = self._path(h)
+        items = leaf.items
+        if key not in items:
+            self._len += 1
+        items[key] = value
+        if len(items) > _LEAF_MAX and shift + _BITS < 64:
+            kids: List[Any] = [None] * (_MASK + 1)
+            for k, v in items.items():
+                i = ((hash(k) & _HASH_MASK) >> shift) & _MASK
+                if kids[i] is None:
+                    kids[i] = _Leaf(self._owner, {})
+                kids[i].items[k] = v
+            node = _Node(self._owner, kids)
+            if parent is None:
+                self._root = node
+            else:
+                parent.kids[idx] = node
+
+    def __delitem__(self, key: Any) -> None:
+        h = hash(key) & _HASH_MASK
+        # 键不存在时不复制路径
+        if key not in self:
+            raise KeyError(key)
+        parent, idx, leaf, _ = self._path(h)
+        del leaf.items[key]
+        self._len -= 1
+        if not leaf.items and parent is not None:
+            parent.kids[idx] = None
+
+    _MISSING = object()
+
+    def pop(self, key: Any, default: Any = _MISSING) -> Any:
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING:
+            if default is self._MISSING:
+                raise KeyError(key)
+            return default
+        del self[key]
+        return value
+
+    def __repr__(self) -> str:
+        return f"PersistentMap({dict(self.items())!r})"
+
+
+class BucketMap:
+    """键 -> 桶的两级映射（倒排表、标签/归档桶等）；桶为 {成员: 值}，读取时按 Mapping 使用。"""
+
+    __slots__ = ("_table", "_owned")
+
+    def __init__(self) -> None:
+        self._table: PersistentMap = PersistentMap()
+        # 本实例在当前这批写入中已复制（私有）的桶
+        self._owned: Set[Any] = set()
+
+    def copy(self) -> "BucketMap":
+        other = BucketMap.__new__(BucketMap)
+        other._table = self._table.copy()
+        other._owned = set()
+        self._owned = set()
+        return other
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._table
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._table)
+
+    def get(self, key: Any) -> Optional[Mapping]:
+        return self._table.get(key)
+
+    def items(self) -> ItemsView:
+        return self._table.items()
+
+    def _writable(self, key: Any, create: bool) -> Optional[Any]:
+        bucket = self._table.get(key)
+        if bucket is None:
+            if not create:
+                return None
+            bucket = {}
+        elif type(bucket) is dict and len(bucket) >= BUCKET_MAX:
+            bucket = PersistentMap(bucket)
+        elif key in self._owned:
+            return bucket
+        else:
+            bucket = bucket.copy()
+        self._table[key] = bucket
+        self._owned.add(key)
+        return bucket
+
+    def put(self, key: Any, member: Any, value: Any) -> bool:
+        """写入 bucket[member] = value；返回该键是否为新建的桶。"""
+        created = key not in self._table
+        self._writable(key, True)[member] = value
+        return created
+
+    def discard(self, key: Any, member: Any) -> bool:
+        """移除 bucket[member]；返回该键的桶是否因此变空并被删除。"""
+        bucket = self._table.get(key)
+        if bucket is None or member not in bucket:
+            return False
+        bucket = self._writable(key, False)
+        del bucket[member]
+        if bucket:
+            return False
+        del self._table[key]
+        self._owned.discard(key)
+        return True
+
+
+class PersistentSortedList(Generic[T]):
+    """分段存储的有序列表：add/remove 为 O(log n + _LOAD)，copy() 只复制段表。"""
+
+    __slots__ = ("_chunks", "_maxes", "_len", "_owned")
+
+    def __init__(self, items: Iterable[T] = ()) -> None:
+        data = sorted(items)
+        self._chunks: List[List[T]] = [data[i:i + _LOAD] for i in range(0, len(data), _LOAD)]
+        self._maxes: List[T] = [c[-1] for c in self._chunks]
+        self._len = len(data)
+        # 本实例私有（可原地修改）的段，以 id 记录；copy() 后双方都清空
+        self._owned: Set[int] = {id(c) for c in self._chunks}
+
+    def copy(self) -> "PersistentSortedList[T]":
+        other = PersistentSortedList.__new__(PersistentSortedList)
+        other._chunks = list(self._chunks)
+        other._maxes = list(self._maxes)
+        other._len = self._len
+        other._owned = set()
+        self._owned = set()
+        return other
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[T]:
+        for chunk in self._chunks:
+            yield from chunk
+
+    def __contains__(self, value: T) -> bool:
+        i = bisect.bisect_left(self._maxes, value)
+        if i == len(self._chunks):
+            return False
+        chunk = self._chunks[i]
+        j = bisect.bisect_left(chunk, value)
+        return j < len(chunk) and chunk[j] == value
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                return list(self)[index]
+            out: List[T] = []
+            pos = 0
+            for chunk in self._chunks:
+                if pos >= stop:
+                    break
+                n = len(chunk)
+                if pos + n > start:
+                    out.extend(chunk[max(0, start - pos):stop - pos])
+                pos += n
+            return out
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError(index)
+        for chunk in self._chunks:
+            if index < len(chunk):
+                return chunk[index]
+            index -= len(chunk)
+        raise IndexError(index)
+
+    def iter_from(self, value: T) -> Iterator[T]:
+        """按顺序迭代 >= value 的元素。"""
+        i = bisect.bisect_left(self._maxes, value)
+        if i == len(self._chunks):
+            return
+        chunk = self._chunks[i]
+        yield from islice(chunk, bisect.bisect_left(chunk, value), None)
+        for chunk in islice(self._chunks, i + 1, None):
+            yield from chunk
+
+    def _writable(self, i: int) -> List[T]:
+        chunk = self._chunks[i]
+        if id(chunk) not in self._owned:
+            chunk = self._chunks[i] = list(chunk)
+            self._owned.add(id(chunk))
+        return chunk
+
+    def _adopt(self, chunk: List[T]) -> List[T]:
+        self._owned.add(id(chunk))
+        return chunk
+
+    def add(self, value: T) -> None:
+        if not self._chunks:
+            self._chunks.append(self._adopt([value]))
+            self._maxes.append(value)
+            self._len = 1
+            return
+        i = bisect.bisect_left(self._maxes, value)
+        if i == len(self._chunks):
+            i -= 1
+        chunk = self._writable(i)
+        bisect.insort(chunk, value)
+        self._len += 1
+        if len(chunk) > 2 * _LOAD:
+            half = len(chunk) // 2
+            self._chunks[i:i + 1] = [self._adopt(chunk[:half]), self._adopt(chunk[half:])]
+            self._maxes[i:i + 1] = [chunk[half - 1], chunk[-1]]
+        else:
+            self._maxes[i] = chunk[-1]
+
+    def remove(self, value: T) -> bool:
+        """移除一个等于 value 的元素；不存在时返回 False。"""
+        if value not in self:
+            return False
+        i = bisect.bisect_left(self._maxes, value)
+        chunk = self._writable(i)
+        del chunk[bisect.bisect_left(chunk, value)]
+        self._len -= 1
+        if len(chunk) >= _LOAD // 2 or len(self._chunks) == 1:
+            if chunk:
+                self._maxes[i] = chunk[-1]
+            else:
+                del self._chunks[i], self._maxes[i]
+            return True
+        # 段过短：与相邻段合并（必要时再均分），避免删除后段数只增不减
+        j = i + 1 if i + 1 < len(self._chunks) else i - 1
+        lo, hi = min(i, j), max(i, j)
+        merged = self._chunks[lo] + self._chunks[hi]
+        if len(merged) > 2 * _LOAD:
+            half = len(merged) // 2
+            self._chunks[lo:hi + 1] = [self._adopt(merged[:half]), self._adopt(merged[half:])]
+            self._maxes[lo:hi + 1] = [merged[half - 1], merged[-1]]
+        else:
+            self._chunks[lo:hi + 1] = [self._adopt(merged)]
+            self._maxes[lo:hi + 1] = [merged[-1]]
+        return True
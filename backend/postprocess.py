@@ -0,0 +1,218 @@
+from __future__ import annotations
+import html
+import re
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+# HTML 后处理：在一次 Python 层遍历中完成有序列表重编号与分块，得到
+# - 有序列表按标题分段重编号后的 HTML（data-ol-index）
+# - 去标签的纯文本（摘要/搜索）
+# - 分块结果（文本块按块级结尾切分合并，<img> 替换为占位符并单独成块）
+# 前置检查与纯文本仍各是一次整篇的正则扫描（C 层，比逐标签的 Python 循环快）；
+# 分块只在成块处与图片处回到 Python 层。与逐遍实现的耗时对比见 python -m backend.bench。
+# 输出与 DocsIndexer 中逐遍正则的实现（_renumber_ol_by_heading / re.sub 去标签 /
+# _strip_leading_toc / _chunk_html）逐字节一致；遇到该实现按行/按正则语义
+# 才能确定结果的罕见输入（标签内含 '<'、特殊换行符、跨行的标题/列表标签等）时
+# 返回 None，由调用方退回逐遍实现。
+
+# 文本分块的合并阈值（字符）
+MIN_CHUNK_SIZE = 3000
+
+# 以下正则在“标签内不含 '<'”（见 _NESTED_LT_RE）的前提下，边界与
+# re.sub(r"<[^>]+>", "", ...) 的切分一致，因此可从任意 '<' 处开始搜索
+_LIST_EVENT_RE = re.compile(
+    r"<(?:(?P<h>h[1-6]\b[^>]*>)|(?P<ol>ol\b[^>]*>)|(?P<li>li\b[^>]*>)|(?P<olc>/ol>))",
+    re.IGNORECASE,
+)
+_OL_OPEN_RE = re.compile(r"<ol\b[^>]*>", re.IGNORECASE)
+_IMG_RE = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+_SEP_RE = re.compile(r"</(?:p|pre|h[1-6]|li|ul|ol|table)>|<br\s*/?>", re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+# 某个标签内部还有 '<'：逐遍实现中各正则的切分会互相错位
+_NESTED_LT_RE = re.compile(r"<[^>]*<[^>]*>")
+# str.splitlines() 认作换行、但逐遍实现会归一化为 '\n' 的字符
+_OTHER_LINEBREAKS_RE = re.compile("[\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+_LEADING_TOC_RE = re.compile(r"^\s*<div\b[^>]*\bclass=\"[^\"]*\btoc\b[^\"]*\"[^>]*>.*?</div>\s*", re.IGNORECASE | re.DOTALL)
+
+
+class ProcessedHtml(NamedTuple):
+    html: str
+    text: str
+    chunks: List[str]
+    chunk_types: List[str]
+    ph_ids: List[Optional[str]]
+
+
+def _ol_index_inserts(src: str) -> Optional[List[Tuple[int, str]]]:
+    """复现 _renumber_ol_by_heading 的按行语义，返回 [(插入位置, ' data-ol-index="N"')]。
+
+    只有最外层 <ol> 内的行会产生插入，因此只扫描 <ol> 区域：列表闭合后直接跳到下一个 <ol> 所在行。
+    """
+    inserts: List[Tuple[int, str]] = []
+    first = _OL_OPEN_RE.search(src)
+    if first is None:
+        return inserts
+    ol_counter = 0
+    ol_depth = 0
+    in_ol = False
+    line_start = src.rfind('\n', 0, first.start())
+    pos = line_start + 1
+    has_h = has_ol = has_li = has_olc = False
+
+    def flush() -> bool:
+        nonlocal ol_counter, ol_depth, in_ol
+        if has_h:
+            ol_counter = 0
+        if has_ol:
+            ol_depth += 1
+            if ol_depth == 1:
+                in_ol = True
+                ol_counter = 0
+        if has_li and in_ol and ol_depth == 1:
+            ol_counter += 1
+            end = src.find('\n', line_start + 1)
+            if end == -1:
+                end = len(src)
+            if src.find('data-ol-index', line_start + 1, end) == -1:
+                at = src.find('<li', line_start + 1, end)
+                if at < 0:
+                    return False
+                inserts.append((at + 3, f' data-ol-index="{ol_counter}"'))
+        if has_olc:
+            if ol_depth == 1:
+                in_ol = False
+                ol_counter = 0
+            ol_depth = max(0, ol_depth - 1)
+        return True
+
+    search = _LIST_EVENT_RE.search
+    while True:
+        m = search(src, pos)
+        if m is None:
+            break
+        s, e = m.span()
+        if src.find('\n', s, e) != -1:
+            return None
+        nl = src.rfind('\n', pos, s)
+        if nl != -1 and nl > line_start:
+            if not flush():
+                return None
+            has_h = has_ol = has_li = has_olc = False
+            line_start = nl
+            if ol_depth == 0:
+                # 列表外：标题/游离 </ol> 均不影响后续结果，跳到下一个 <ol> 所在行
+                nxt = _OL_OPEN_RE.search(src, s)
+                if nxt is None:
+                    return inserts
+                line_start = src.rfind('\n', 0, nxt.start())
+                pos = line_start + 1
+                continue
+        kind = m.lastgroup
+        if kind == 'h':
+            has_h = True
+        elif kind == 'ol':
+            has_ol = True
+        elif kind == 'li':
+            has_li = True
+        else:
+            has_olc = True
+        pos = e
+    if not flush():
+        return None
+    return inserts
+
+
+def process(html_content: str, image_placeholder: Callable[[str, str], str]) -> Optional[ProcessedHtml]:
+    """对 md.convert() 的输出（已按需在文首插入 TOC）做单遍后处理。
+
+    image_placeholder(img_html, ph_id) 返回替换 <img> 的占位 DOM。
+    无法保证与逐遍实现一致时返回 None。
+    """
+    if _OTHER_LINEBREAKS_RE.search(html_content) or _NESTED_LT_RE.search(html_content):
+        return None
+    # splitlines + '\n'.join 会去掉末尾的一个换行
+    if html_content.endswith('\n'):
+        html_content = html_content[:-1]
+
+    # 1) 有序列表重编号：只在 <ol> 区域内按行处理
+    inserts = _ol_index_inserts(html_content)
+    if inserts is None:
+        return None
+    if inserts:
+        parts: List[str] = []
+        prev = 0
+        for at, text in inserts:
+            parts.append(html_content[prev:at])
+            parts.append(text)
+            prev = at
+        parts.append(html_content[prev:])
+        out = "".join(parts)
+    else:
+        out = html_content
+
+    # 2) 分块：去除文首 TOC 后按块级结尾切段，累计满 MIN_CHUNK_SIZE 即在该段末尾成块；
+    #    图片替换为占位（长度按占位计）并单独成块。只在成块处与图片处做 Python 层处理。
+    toc_m = _LEADING_TOC_RE.match(out)
+    body_start = toc_m.end() if toc_m else 0
+    text_chunks: List[str] = []
+    images: List[str] = []
+    ph_for_img: List[str] = []
+    current_parts: List[str] = []
+    current_len = 0
+    pos = body_start
+
+    def next_sep_end(target: int, limit: int) -> int:
+        # target 之后（含）结束的第一个块级结尾；跨越 target 的标签从其 '<' 处开始匹配
+        start = out.rfind('<', pos, target)
+        m = _SEP_RE.search(out, start if start != -1 else pos, limit)
+        while m is not None and m.end() < target:
+            m = _SEP_RE.search(out, m.end(), limit)
+        return m.end() if m is not None else -1
+
+    def advance(limit: int) -> None:
+        # 处理 [pos, limit) 区间（其中无图片）
+        nonlocal pos, current_len, current_parts
+        while True:
+            e = next_sep_end(max(pos + MIN_CHUNK_SIZE - current_len, pos + 1), limit)
+            if e == -1:
+                if limit > pos:
+                    current_parts.append(out[pos:limit])
+                    current_len += limit - pos
+                pos = limit
+                return
+            current_parts.append(out[pos:e])
+            text_chunks.append("".join(current_parts))
+            current_parts = []
+            current_len = 0
+            pos = e
+
+    for m in _IMG_RE.finditer(out, body_start):
+        s, e = m.span()
+        advance(s)
+        img = m.group(0)
+        ph = f"ph{len(images)}"
+        images.append(img)
+        ph_for_img.append(ph)
+        placeholder = image_placeholder(img, ph)
+        current_parts.append(placeholder)
+        current_len += len(placeholder)
+        pos = e
+    # 最后一段（最后一个块级结尾之后）若为空白则丢弃；文末是块级结尾时其后不会有图片
+    end = len(out)
+    trimmed = len(out.rstrip())
+    if trimmed <= body_start:
+        end = body_start
+    elif out[trimmed - 1] == '>':
+        lt = out.rfind('<', body_start, trimmed)
+        if lt != -1 and _SEP_RE.fullmatch(out, lt, trimmed):
+            end = trimmed
+    advance(end)
+    if current_parts:
+        text_chunks.append("".join(current_parts))
+
+    return ProcessedHtml(
+        html=out,
+        text=html.unescape(_TAG_RE.sub("", out)),
+        chunks=text_chunks + images,
+        chunk_types=['text'] * len(text_chunks) + ['image'] * len(images),
+        ph_ids=[None] * len(text_chunks) + list(ph_for_img),
+    )
@@ -0,0 +1,146 @@
+from __future__ import annotations
+import hashlib
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set
+
+import orjson
+
+_HEADER_LEN = struct.Struct("<Q")
+
+
+class RenderCache:
+    """基于内容寻址的渲染结果磁盘缓存。
+
+    每个条目以 key（文件字节 + 渲染配置指纹的哈希）命名，存放在
+    ``<root>/<key[:2]>/<key>.json``，其预压缩响应体存放在同目录的 ``<key>.enc``。写入采用临时文件 + 原子替换，
+    读到损坏/不兼容的条目时视为未命中，不影响正常渲染。
+    """
+
+    def __init__(self, root: Path, fingerprint: str) -> None:
+        self.root = root
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        self._touched: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+        except Exception:
+            pass
+
+    def key_for(self, raw: bytes, scope: str = "") -> str:
+        h = hashlib.sha256()
+        h.update(self.fingerprint.encode("utf-8"))
+        h.update(b"\0")
+        h.update(scope.encode("utf-8"))
+        h.update(b"\0")
+        h.update(raw)
+        return h.hexdigest()
+
+    def _path_for(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        p = self._path_for(key)
+        try:
+            data = orjson.loads(p.read_bytes())
+        except Exception:
+            with self._lock:
+                self.misses += 1
+            return None
+        if not isinstance(data, dict) or data.get("fingerprint") != self.fingerprint:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self._touched.add(key)
+        return data
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        p = self._path_for(key)
+        payload = dict(entry)
+        payload["fingerprint"] = self.fingerprint
+        try:
+            p.parent.mkdir(parents=True, exist_ok=True)
+            tmp = p.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(orjson.dumps(payload))
+            os.replace(tmp, p)
+        except Exception:
+            # 缓存写入失败不影响渲染结果
+            return
+        with self._lock:
+            self._touched.add(key)
+
+    def _encoded_path_for(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.enc"
+
+    def get_encoded(self, key: str) -> Dict[str, Dict[str, bytes]]:
+        """读取条目的预压缩响应体：响应体内容哈希 -> {encoding: bytes}；缺失或损坏时返回空表。
+
+        布局：头部长度（8 字节小端）| 头部 JSON（哈希 -> {encoding: [偏移, 长度]}）| 数据区。
+        """
+        try:
+            blob = self._encoded_path_for(key).read_bytes()
+            (header_len,) = _HEADER_LEN.unpack_from(blob, 0)
+            base = _HEADER_LEN.size + header_len
+            header = orjson.loads(blob[_HEADER_LEN.size:base])
+            if header.get("fingerprint") != self.fingerprint:
+                return {}
+            return {
+                digest: {enc: blob[base + off:base + off + n] for enc, (off, n) in variants.items()}
+                for digest, variants in header["bodies"].items()
+            }
+        except Exception:
+            return {}
+
+    def put_encoded(self, key: str, table: Dict[str, Dict[str, bytes]]) -> None:
+        bodies: Dict[str, Dict[str, Any]] = {}
+        blobs = []
+        pos = 0
+        for digest, variants in table.items():
+            spans = {}
+            for enc, data in variants.items():
+                spans[enc] = [pos, len(data)]
+                blobs.append(data)
+                pos += len(data)
+            bodies[digest] = spans
+        header = orjson.dumps({"fingerprint": self.fingerprint, "bodies": bodies})
+        p = self._encoded_path_for(key)
+        try:
+            p.parent.mkdir(parents=True, exist_ok=True)
+            tmp = p.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(b"".join([_HEADER_LEN.pack(len(header)), header, *blobs]))
+            os.replace(tmp, p)
+        except Exception:
+            return
+
+    def reset_touched(self) -> None:
+        with self._lock:
+            self._touched = set()
+
+    def prune(self, keep: Optional[Iterable[str]] = None) -> int:
+        """删除本轮未使用的条目（默认保留自上次 reset_touched 以来读写过的 key）。"""
+        with self._lock:
+            alive = set(keep) if keep is not None else set(self._touched)
+        removed = 0
+        try:
+            files = list(self.root.glob("*/*.json")) + list(self.root.glob("*/*.enc"))
+        except Exception:
+            return 0
+        for f in files:
+            if f.stem in alive:
+                continue
+            try:
+                f.unlink()
+                removed += 1
+            except Exception:
+                pass
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
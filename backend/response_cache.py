@@ -0,0 +1,58 @@
+from __future__ import annotations
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+def etag_for_bytes(body: bytes) -> str:
+    """按响应内容计算强 ETag；进程重启后版本号会重置，内容哈希则保持稳定。"""
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+class ResponseCache(Generic[V]):
+    """按数据版本失效的 LRU 缓存。
+
+    调用方传入当前版本（如 ``indexer.version``）；版本变化时整体清空，
+    因此无需逐条跟踪依赖关系。
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, V]" = OrderedDict()
+        self._version: Any = None
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version_locked(self, version: Any) -> None:
+        if version != self._version:
+            self._data.clear()
+            self._version = version
+
+    def get(self, key: Hashable, version: Any) -> Optional[V]:
+        with self._lock:
+            self._check_version_locked(version)
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, version: Any, value: V) -> None:
+        with self._lock:
+            # 生成期间版本若已更新，这里会清空；下一次 get 按新版本再次校验，不会返回过期结果
+            self._check_version_locked(version)
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._version = None
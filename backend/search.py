@@ -0,0 +1,252 @@
+from __future__ import annotations
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from .persistent import BucketMap, PersistentMap, PersistentSortedList
+
+# CJK 字符（中日韩统一表意文字、假名、谚文等）：按单字 + 双字切分
+_CJK_RANGES = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_TOKEN_RE = re.compile(f"(?P<cjk>[{_CJK_RANGES}]+)|(?P<word>[^\\W_{_CJK_RANGES}]+)")
+_CJK_RE = re.compile(f"[{_CJK_RANGES}]")
+
+# 字段权重：标题 > 标签 > 正文
+FIELD_WEIGHTS: Dict[str, float] = {"title": 5.0, "tags": 3.0, "body": 1.0}
+# 英文前缀匹配（如 "prog" 命中 "programming"）的得分折扣
+_PREFIX_FACTOR = 0.5
+
+
+def tokenize(text: str, for_query: bool = False) -> List[str]:
+    """将文本切分为检索词。
+
+    - 拉丁等字母文字：按单词切分并转小写
+    - CJK：文档侧同时产出单字与相邻双字；查询侧长度 >= 2 时只用双字（更精确）
+    """
+    if not text:
+        return []
+    out: List[str] = []
+    for m in _TOKEN_RE.finditer(text.lower()):
+        word = m.group("word")
+        if word is not None:
+            out.append(word)
+            continue
+        run = m.group("cjk")
+        if for_query:
+            if len(run) == 1:
+                out.append(run)
+            else:
+                out.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            out.extend(run)
+            out.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return out
+
+
+def _is_cjk(token: str) -> bool:
+    return _CJK_RE.match(token) is not None
+
+
+class SearchReader:
+    """检索的只读部分：相关度打分、标签筛选与子串匹配。
+
+    SearchIndex（内存中、可增量更新）与共享索引文件的映射版本（shared_index.MappedSearchIndex）
+    分别实现底层查找：文档以各自的句柄（slug 或文件内编号）表示，结果统一换回 slug。
+    """
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def _terms(self, tok: str) -> Iterable[Tuple[Any, float]]:
+        """查询词 -> [(词条句柄, 得分系数)]：CJK 词只做精确匹配，字母词允许前缀扩展。"""
+        raise NotImplementedError
+
+    def _field_docs(self, field: str, term: Any) -> Optional[Mapping[Any, int]]:
+        """词条在某字段的倒排桶：文档句柄 -> 词频。"""
+        raise NotImplementedError
+
+    def _slug(self, doc: Any) -> str:
+        raise NotImplementedError
+
+    def by_tag(self, tag: str) -> Set[str]:
+        raise NotImplementedError
+
+    def substring(self, q: str, slugs: Iterable[str]) -> List[str]:
+        """按 slugs 的顺序返回标题、标签或正文（小写）包含 q 的文章。"""
+        raise NotImplementedError
+
+    def search(self, query: str) -> Optional[List[Tuple[str, float]]]:
+        """返回 [(slug, score)]，按得分降序；查询无法切出检索词时返回 None。"""
+        q_tokens = list(dict.fromkeys(tokenize(query, for_query=True)))
+        if not q_tokens:
+            return None
+        n_docs = max(1, len(self))
+        scores: Optional[Dict[Any, float]] = None
+        for tok in q_tokens:
+            tok_scores: Dict[Any, float] = {}
+            for term, factor in self._terms(tok):
+                fields = [(weight, self._field_docs(field, term)) for field, weight in FIELD_WEIGHTS.items()]
+                fields = [(weight, docs) for weight, docs in fields if docs]
+                if not fields:
+                    continue
+                df = len(set().union(*(docs.keys() for _, docs in fields)))
+                idf = math.log(1.0 + n_docs / df)
+                for weight, docs in fields:
+                    for doc, tf in docs.items():
+                        tok_scores[doc] = tok_scores.get(doc, 0.0) + weight * factor * (1.0 + math.log(tf)) * idf
+            # 所有检索词都需命中（AND 语义）
+            if scores is None:
+                scores = tok_scores
+            else:
+                scores = {d: v + tok_scores[d] for d, v in scores.items() if d in tok_scores}
+            if not scores:
+                return []
+        ranked = sorted((scores or {}).items(), key=lambda kv: kv[1], reverse=True)
+        return [(self._slug(doc), score) for doc, score in ranked]
+
+
+def search_text(title: str, tags: Iterable[str], body: str) -> str:
+    """子串匹配所用的小写文本：标题、各标签与正文以 NUL 分隔（查询不会跨字段命中）。"""
+    return "\x00".join([title or "", *(str(t) for t in tags or ()), body or ""]).lower()
+
+
+class SearchIndex(SearchReader):
+    """按字段（title/tags/body）维护的倒排索引，支持增量增删与相关度排序。
+
+    写时复制：发布到索引快照后不再修改，读取方无需加锁。增量更新先 clone()（O(1)，各表结构共享），
+    修改只复制变化的词条所在路径与其倒排桶，有序词表按段增量维护；完成后随新快照一并发布。
+    """
+
+    def __init__(self) -> None:
+        # field -> token -> {slug: tf}
+        self._postings: Dict[str, BucketMap] = {f: BucketMap() for f in FIELD_WEIGHTS}
+        # slug -> field -> Counter，用于删除/更新（整体替换，不原地修改）
+        self._doc_terms: PersistentMap = PersistentMap()
+        # 小写标签 -> {slug: True}，用于 tag: 精确筛选
+        self._tag_docs = BucketMap()
+        self._doc_tags: PersistentMap = PersistentMap()
+        # 英文前缀匹配所用的有序词表（各字段词的并集），随增删增量维护
+        self._vocab: PersistentSortedList[str] = PersistentSortedList()
+        # slug -> 子串匹配文本（见 search_text）
+        self._text: PersistentMap = PersistentMap()
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def clone(self) -> "SearchIndex":
+        """返回可修改的副本；原实例（已发布）保持不变。"""
+        index = SearchIndex.__new__(SearchIndex)
+        index._postings = {f: p.copy() for f, p in self._postings.items()}
+        index._doc_terms = self._doc_terms.copy()
+        index._tag_docs = self._tag_docs.copy()
+        index._doc_tags = self._doc_tags.copy()
+        index._vocab = self._vocab.copy()
+        index._text = self._text.copy()
+        return index
+
+    def _in_vocab(self, tok: str) -> bool:
+        return any(tok in p for p in self._postings.values())
+
+    def add(self, slug: str, title: str, tags: Iterable[str], body: str, keep_text: bool = True) -> None:
+        """keep_text=False：正文只建立倒排索引，不参与子串匹配（懒渲染占位）。"""
+        tags = [str(t) for t in (tags or [])]
+        fields = {
+            "title": Counter(tokenize(title or "")),
+            "tags": Counter(tokenize(" ".join(tags))),
+            "body": Counter(tokenize(body or "")),
+        }
+        tag_keys = {t.strip().lower() for t in tags if t and t.strip()}
+        self.remove(slug)
+        for field, counts in fields.items():
+            postings = self._postings[field]
+            for tok, tf in counts.items():
+                new_tok = tok not in postings and not self._in_vocab(tok)
+                postings.put(tok, slug, tf)
+                if new_tok:
+                    self._vocab.add(tok)
+        self._doc_terms[slug] = fields
+        for t in tag_keys:
+            self._tag_docs.put(t, slug, True)
+        self._doc_tags[slug] = tag_keys
+        self._text[slug] = search_text(title, tags, body if keep_text else "")
+
+    def remove(self, slug: str) -> None:
+        fields = self._doc_terms.pop(slug, None)
+        if fields:
+            for field, counts in fields.items():
+                postings = self._postings[field]
+                for tok in counts:
+                    if postings.discard(tok, slug) and not self._in_vocab(tok):
+                        self._vocab.remove(tok)
+        for t in self._doc_tags.pop(slug, None) or ():
+            self._tag_docs.discard(t, slug)
+        self._text.pop(slug, None)
+
+    @classmethod
+    def from_postings(cls, postings: Dict[str, Dict[str, Dict[str, int]]], tags: Dict[str, Iterable[str]],
+                      texts: Dict[str, str]) -> "SearchIndex":
+        """由倒排表（field -> token -> {slug: tf}）、slug -> 小写标签与子串匹配文本直接构建。"""
+        index = cls()
+        doc_terms: Dict[str, Dict[str, Counter]] = {slug: {f: Counter() for f in FIELD_WEIGHTS} for slug in texts}
+        vocab: Set[str] = set()
+        for field, table in postings.items():
+            if field not in index._postings:
+                continue
+            target = index._postings[field]
+            for tok, docs in table.items():
+                vocab.add(tok)
+                for slug, tf in docs.items():
+                    target.put(tok, slug, tf)
+                    terms = doc_terms.get(slug)
+                    if terms is None:
+                        terms = doc_terms[slug] = {f: Counter() for f in FIELD_WEIGHTS}
+                    terms[field][tok] = tf
+        index._doc_terms = PersistentMap(doc_terms)
+        index._vocab = PersistentSortedList(vocab)
+        index._text = PersistentMap(texts)
+        for slug, keys in tags.items():
+            keys = set(keys)
+            index._doc_tags[slug] = keys
+            for t in keys:
+                index._tag_docs.put(t, slug, True)
+        return index
+
+    # ---- 导出（写共享索引文件用） ----
+
+    def vocabulary(self) -> Iterable[str]:
+        """按序迭代所有词条。"""
+        return iter(self._vocab)
+
+    def field_postings(self, field: str, term: str) -> Optional[Mapping[str, int]]:
+        return self._postings[field].get(term)
+
+    def tag_postings(self) -> Iterable[Tuple[str, Mapping[str, Any]]]:
+        return self._tag_docs.items()
+
+    def text(self, slug: str) -> Optional[str]:
+        return self._text.get(slug)
+
+    # ---- 查询 ----
+
+    def by_tag(self, tag: str) -> Set[str]:
+        return set(self._tag_docs.get((tag or "").strip().lower()) or ())
+
+    def substring(self, q: str, slugs: Iterable[str]) -> List[str]:
+        text = self._text
+        return [slug for slug in slugs if q in text.get(slug, "")]
+
+    def _terms(self, tok: str) -> Iterable[Tuple[Any, float]]:
+        if _is_cjk(tok):
+            return [(tok, 1.0)]
+        out: List[Tuple[str, float]] = []
+        for term in self._vocab.iter_from(tok):
+            if not term.startswith(tok):
+                break
+            out.append((term, 1.0 if term == tok else _PREFIX_FACTOR))
+        return out
+
+    def _field_docs(self, field: str, term: Any) -> Optional[Mapping[Any, int]]:
+        return self._postings[field].get(term)
+
+    def _slug(self, doc: Any) -> str:
+        return doc
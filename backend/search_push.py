@@ -0,0 +1,243 @@
+"""搜索引擎主动推送（百度普通收录、Bing SubmitUrlbatch）的后台批量队列。
+
+/api/push 只把 URL 放入各引擎的队列即返回；每个引擎一个后台线程：
+- 去重：排队中与 dedup_ttl 内已推送过的 URL 不再重复推送（两家接口都有每日配额）
+- 批量：首个 URL 入队后等待 batch_delay 收集更多 URL，每批不超过接口上限
+- 连接复用：每个引擎保持一条 keep-alive 连接，对端关闭后自动重连
+- 重试：网络错误、429 与 5xx 按指数退避重试；其余 4xx（如配额用尽）直接放弃
+"""
+from __future__ import annotations
+import http.client
+import json
+import logging
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 各接口单次请求的 URL 上限
+BAIDU_BATCH_LIMIT = 2000
+BING_BATCH_LIMIT = 500
+# 去重表的最大条目数（超出时淘汰最早推送的 URL）
+_MAX_SEEN = 50000
+
+
+def baidu_payload(urls: List[str]) -> Tuple[bytes, str]:
+    return "\n".join(urls).encode("utf-8"), "text/plain"
+
+
+def bing_payload(site_url: str) -> Callable[[List[str]], Tuple[bytes, str]]:
+    def encode(urls: List[str]) -> Tuple[bytes, str]:
+        body = json.dumps({"siteUrl": site_url, "urlList": urls}).encode("utf-8")
+        return body, "application/json; charset=utf-8"
+    return encode
+
+
+class _PushError(Exception):
+    def __init__(self, message: str, retryable: bool) -> None:
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class SearchPushQueue:
+    """单个搜索引擎的推送队列（一个后台线程 + 一条 keep-alive 连接）。"""
+
+    def __init__(self, name: str, endpoint: str, encode: Callable[[List[str]], Tuple[bytes, str]],
+                 batch_limit: int, batch_delay: float = 2.0, dedup_ttl: float = 86400.0,
+                 max_attempts: int = 5, backoff: float = 1.0, max_backoff: float = 60.0,
+                 timeout: float = 10.0) -> None:
+        self.name = name
+        self.endpoint = endpoint
+        parts = urllib.parse.urlsplit(endpoint)
+        self._scheme = parts.scheme.lower()
+        self._host = parts.hostname or ""
+        self._port = parts.port
+        self._target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self._encode = encode
+        self.batch_limit = max(1, batch_limit)
+        self.batch_delay = max(0.0, batch_delay)
+        self.dedup_ttl = max(0.0, dedup_ttl)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = max(0.0, backoff)
+        self.max_backoff = max(self.backoff, max_backoff)
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        # 排队中的 URL（保持入队顺序）与其最早入队时间
+        self._pending: "OrderedDict[str, None]" = OrderedDict()
+        self._first_at = 0.0
+        # 已推送（或正在推送）的 URL -> 时间；按时间先后排列，过期项从头部淘汰
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.queued = 0
+        self.duplicates = 0
+        self.pushed = 0
+        self.failed = 0
+        self.requests = 0
+        self.retries = 0
+        self.connections = 0
+        self.last_result: Optional[Dict[str, Any]] = None
+
+    # ---- 生产者 ----
+
+    def submit(self, url: str) -> Dict[str, Any]:
+        """URL 入队并立即返回；重复的 URL 返回 duplicate=True。"""
+        now = time.monotonic()
+        with self._cond:
+            self._expire(now)
+            if url in self._pending or url in self._seen:
+                self.duplicates += 1
+                return {"ok": True, "queued": False, "duplicate": True}
+            if not self._pending:
+                self._first_at = now
+            self._pending[url] = None
+            self._seen[url] = now
+            while len(self._seen) > _MAX_SEEN:
+                self._seen.popitem(last=False)
+            self.queued += 1
+            self._cond.notify()
+        self._ensure_thread()
+        return {"ok": True, "queued": True}
+
+    def _expire(self, now: float) -> None:
+        while self._seen:
+            url, ts = next(iter(self._seen.items()))
+            if now - ts < self.dedup_ttl or url in self._pending:
+                break
+            self._seen.popitem(last=False)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"search-push-{self.name}", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self._close()
+
+    # ---- 后台线程 ----
+
+    def _next_batch(self) -> Optional[List[str]]:
+        with self._cond:
+            while not self._stop.is_set():
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                remaining = self._first_at + self.batch_delay - time.monotonic()
+                if remaining > 0 and len(self._pending) < self.batch_limit:
+                    self._cond.wait(remaining)
+                    continue
+                batch = []
+                while self._pending and len(batch) < self.batch_limit:
+                    batch.append(self._pending.popitem(last=False)[0])
+                # 剩余 URL 已等待过一个窗口，下一批立即发送
+                return batch
+        return None
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self._push(batch)
+            except Exception:
+                logger.exception("search push (%s) failed unexpectedly", self.name)
+
+    def _push(self, batch: List[str]) -> None:
+        body, content_type = self._encode(batch)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                status, result = self._post(body, content_type)
+            except _PushError as exc:
+                if exc.retryable and attempt < self.max_attempts and not self._stop.is_set():
+                    self.retries += 1
+                    delay = min(self.max_backoff, self.backoff * (2 ** (attempt - 1)))
+                    logger.info("search push (%s): %s; retrying %d url(s) in %.1f s", self.name, exc, len(batch), delay)
+                    if self._stop.wait(delay):
+                        return
+                    continue
+                self.failed += len(batch)
+                self.last_result = {"ok": False, "urls": len(batch), "error": str(exc), "at": time.time()}
+                logger.warning("search push (%s) gave up on %d url(s): %s", self.name, len(batch), exc)
+                # 推送失败的 URL 移出去重表，之后可再次提交
+                with self._cond:
+                    for url in batch:
+                        self._seen.pop(url, None)
+                return
+            self.pushed += len(batch)
+            self.last_result = {"ok": True, "urls": len(batch), "status": status, "body": result, "at": time.time()}
+            return
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._scheme == "https":
+            conn: http.client.HTTPConnection = http.client.HTTPSConnection(self._host, self._port, timeout=self.timeout)
+        else:
+            conn = http.client.HTTPConnection(self._host, self._port, timeout=self.timeout)
+        self.connections += 1
+        return conn
+
+    def _close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
+
+    def _post(self, body: bytes, content_type: str) -> Tuple[int, Any]:
+        headers = {"Content-Type": content_type, "Connection": "keep-alive"}
+        # 复用的连接可能已被对端关闭：此时换新连接重发一次，不计入重试
+        for reused in ((True, False) if self._conn is not None else (False,)):
+            conn = self._conn if reused else self._connect()
+            self._conn = conn
+            try:
+                self.requests += 1
+                conn.request("POST", self._target, body=body, headers=headers)
+                resp = conn.getresponse()
+                raw = resp.read().decode("utf-8", "ignore")
+            except (http.client.HTTPException, OSError) as exc:
+                self._close()
+                if reused:
+                    continue
+                raise _PushError(f"{type(exc).__name__}: {exc}", retryable=True) from None
+            if resp.will_close:
+                self._close()
+            try:
+                parsed: Any = json.loads(raw) if raw else None
+            except ValueError:
+                parsed = raw
+            if resp.status == 429 or resp.status >= 500:
+                raise _PushError(f"HTTP {resp.status}", retryable=True)
+            if resp.status >= 400:
+                raise _PushError(f"HTTP {resp.status}: {raw[:200]}", retryable=False)
+            return resp.status, parsed
+        raise _PushError("connection closed", retryable=True)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self.pending(),
+            "queued": self.queued,
+            "duplicates": self.duplicates,
+            "pushed": self.pushed,
+            "failed": self.failed,
+            "requests": self.requests,
+            "retries": self.retries,
+            "connections": self.connections,
+            "last": self.last_result,
+        }
@@ -0,0 +1,813 @@
+"""多进程部署（uvicorn --workers N）共享的磁盘索引快照。
+
+一个构建进程（持有文件锁者）负责扫描、监听文件，并在版本变化后由后台线程（防抖合并）写出快照；
+其余进程以只读方式 mmap 该文件，元数据、排序、倒排索引与统计都直接在映射内存上查找，不复制到
+进程堆中：请求只解码用到的那几篇文章（有限额的 LRU），正文与预压缩响应体为映射内存上的 memoryview，
+各进程共享同一份页缓存。
+
+文件布局：MAGIC | 头部长度（8 字节小端）| 头部 JSON | 各数据段（按 8 字节对齐）。头部只含版本号与
+段表；数据段为定长数组（本机字节序）或按偏移数组切分的字节块：
+
+- 文章按 slug（UTF-8 字节序）编号：slug、条目 JSON（元数据与正文/变体在 data 段中的位置）、
+  排序时间戳、修订标识、hidden 标记，以及三个排序分区（文章编号数组）
+- 倒排索引：有序词表，每个 (词, 字段) 一段 (文章编号, 词频) 数组；标签 -> 文章编号；子串匹配文本
+- 统计：每日发布数与标签/归档的结果 JSON
+- data：各文章的 UTF-8 正文缓冲与预压缩变体
+
+写入采用临时文件 + 原子替换，读取方打开的始终是完整的某一代文件，旧映射在不再被引用后自动释放。
+"""
+from __future__ import annotations
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+import orjson
+
+from .indexer import DocsIndexer, _EncodedPayloads, _IndexSnapshot, _ORDER_PARTITIONS, _PostData
+from .models import PostMeta
+from .persistent import PersistentMap, PersistentSortedList
+from .search import FIELD_WEIGHTS, SearchIndex, SearchReader, _is_cjk, _PREFIX_FACTOR
+from .stats import PostAggregates
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl  # type: ignore
+except ImportError:
+    fcntl = None  # Windows 等无 flock 的平台：不启用共享索引
+
+MAGIC = b"BLOGIDX1"
+_HEADER_LEN = struct.Struct("<Q")
+# 文件结构变化时递增；读到其他格式的文件视为不存在
+FORMAT_VERSION = 3
+_REV_SIZE = 12
+_FLAG_HIDDEN = 1
+_FIELDS = tuple(FIELD_WEIGHTS)
+# 只读进程中解码后的文章（元数据、偏移等，正文仍在映射内存中）保留的篇数
+DECODED_POSTS = 1024
+
+
+def _post_rev(pd: _PostData) -> bytes:
+    # 文章修订标识：元数据 + 分块哈希 + 修改时间，用于只读进程比对 changed/removed
+    h = hashlib.blake2b(digest_size=_REV_SIZE)
+    h.update(orjson.dumps(pd.meta.model_dump()))
+    h.update("|".join(pd.chunk_hashes or []).encode("ascii"))
+    h.update(repr((pd.updated_at, pd.stub)).encode("ascii"))
+    return h.digest()
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+class _Sections:
+    """按写入顺序排布各数据段，记录段表 name -> [相对偏移, 长度]。"""
+
+    def __init__(self) -> None:
+        self.table: Dict[str, List[int]] = {}
+        self.parts: List[Any] = []
+        self.size = 0
+
+    def add(self, name: str, parts: Iterable[Any]) -> None:
+        pad = _align(self.size) - self.size
+        if pad:
+            self.parts.append(b"\0" * pad)
+            self.size += pad
+        start = self.size
+        for b in parts:
+            self.parts.append(b)
+            self.size += len(b)
+        self.table[name] = [start, self.size - start]
+
+    def add_blobs(self, name: str, blobs: List[bytes]) -> None:
+        # 字节块与其偏移数组（Q，n + 1 项）
+        offsets = array("Q", [0])
+        for b in blobs:
+            offsets.append(offsets[-1] + len(b))
+        self.add(name + "_off", [offsets.tobytes()])
+        self.add(name, blobs)
+
+
+def write_snapshot(snap: _IndexSnapshot, path: Path) -> int:
+    """将快照写入 path（临时文件 + 原子替换），返回文件字节数。"""
+    search = snap.search
+    if not isinstance(search, SearchIndex):
+        raise TypeError("only an in-memory snapshot can be written")
+    slugs = sorted(snap.posts)
+    doc_ids = {slug: i for i, slug in enumerate(slugs)}
+    data: List[Any] = []
+    pos = 0
+
+    def put(b) -> List[int]:
+        nonlocal pos
+        span = [pos, len(b)]
+        data.append(b)
+        pos += len(b)
+        return span
+
+    def put_variants(variants: Dict[str, Any]) -> Dict[str, List[int]]:
+        return {enc: put(body) for enc, body in variants.items()}
+
+    entries: List[bytes] = []
+    texts: List[bytes] = []
+    sort_ts = array("d")
+    revs: List[bytes] = []
+    flags = bytearray()
+    for slug in slugs:
+        pd = snap.posts[slug]
+        encoded = None
+        if pd.encoded is not None:
+            encoded = {
+                "post": put_variants(pd.encoded.post),
+                "chunks": [put_variants(v) for v in pd.encoded.chunks],
+            }
+        layout = None
+        if pd.layout is not None:
+            head, tail, spans = pd.layout
+            layout = [head, tail, spans.tolist()]
+        entries.append(orjson.dumps({
+            "meta": pd.meta.model_dump(),
+            "updated_at": pd.updated_at,
+            "toc_html": pd.toc_html,
+            "stub": pd.stub,
+            "body": put(pd.buf),
+            "offsets": pd.offsets.tolist(),
+            "layout": layout,
+            "chunk_types": pd.chunk_types,
+            "ph_ids": pd.ph_ids,
+            "chunk_hashes": pd.chunk_hashes,
+            "encoded": encoded,
+        }))
+        texts.append((search.text(slug) or "").encode("utf-8"))
+        sort_ts.append(snap.sort_keys[slug][0])
+        revs.append(_post_rev(pd))
+        flags.append(_FLAG_HIDDEN if DocsIndexer._is_hidden(pd) else 0)
+
+    sec = _Sections()
+    sec.add_blobs("slugs", [s.encode("utf-8") for s in slugs])
+    sec.add_blobs("entries", entries)
+    sec.add("sort_ts", [sort_ts.tobytes()])
+    sec.add("revs", revs)
+    sec.add("flags", [bytes(flags)])
+    for part in _ORDER_PARTITIONS:
+        sec.add("order_" + part, [array("I", [doc_ids[slug] for _, slug in snap.order[part]]).tobytes()])
+
+    # 倒排索引：词 t 在字段 f 的 (文章编号, 词频) 位于 post_doc/post_tf 的 [range[3t+f], range[3t+f+1])
+    terms = list(search.vocabulary())
+    ranges = array("Q", [0])
+    post_doc = array("I")
+    post_tf = array("I")
+    for term in terms:
+        for field in _FIELDS:
+            docs = search.field_postings(field, term) or {}
+            for doc, tf in sorted((doc_ids[slug], tf) for slug, tf in docs.items()):
+                post_doc.append(doc)
+                post_tf.append(tf)
+            ranges.append(len(post_doc))
+    sec.add_blobs("terms", [t.encode("utf-8") for t in terms])
+    sec.add("term_range", [ranges.tobytes()])
+    sec.add("post_doc", [post_doc.tobytes()])
+    sec.add("post_tf", [post_tf.tobytes()])
+    tags = sorted((tag, sorted(doc_ids[slug] for slug in docs)) for tag, docs in search.tag_postings())
+    tag_range = array("Q", [0])
+    tag_doc = array("I")
+    for _, docs in tags:
+        tag_doc.extend(docs)
+        tag_range.append(len(tag_doc))
+    sec.add_blobs("tags", [t.encode("utf-8") for t, _ in tags])
+    sec.add("tag_range", [tag_range.tobytes()])
+    sec.add("tag_doc", [tag_doc.tobytes()])
+    sec.add_blobs("texts", texts)
+    sec.add("stats", [orjson.dumps({
+        "activity": sorted(snap.stats.activity(float("-inf")).items()),
+        "tags": snap.stats.tags(),
+        "archive": snap.stats.archive(),
+    })])
+    sec.add("data", data)
+
+    header = orjson.dumps({
+        "format": FORMAT_VERSION,
+        "version": snap.version,
+        "written_at": time.time(),
+        "last_modified": snap.last_modified,
+        "posts": len(slugs),
+        "sections": sec.table,
+    })
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    head_len = len(MAGIC) + _HEADER_LEN.size + len(header)
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LEN.pack(len(header)))
+        f.write(header)
+        f.write(b"\0" * (_align(head_len) - head_len))
+        for b in sec.parts:
+            f.write(b)
+    os.replace(tmp, path)
+    return _align(head_len) + sec.size
+
+
+class _MappedFile:
+    """已映射的快照文件：按段表取出各段的 memoryview。"""
+
+    def __init__(self, mm: mmap.mmap, header: Dict[str, Any], base: int) -> None:
+        self.mm = mm
+        self.view = memoryview(mm)
+        self.header = header
+        self.base = base
+        self.table: Dict[str, List[int]] = header["sections"]
+
+    def start(self, name: str) -> int:
+        return self.base + self.table[name][0]
+
+    def section(self, name: str) -> memoryview:
+        start, length = self.table[name]
+        return self.view[self.base + start:self.base + start + length]
+
+    def ints(self, name: str, fmt: str) -> memoryview:
+        return self.section(name).cast(fmt)
+
+
+class _Blobs:
+    """按偏移数组切分的字节块（slug、词表、标签等），支持按字节序二分查找。"""
+
+    def __init__(self, f: _MappedFile, name: str) -> None:
+        self._mm = f.mm
+        self._start = f.start(name)
+        self._off = f.ints(name + "_off", "Q")
+
+    def __len__(self) -> int:
+        return len(self._off) - 1
+
+    def span(self, i: int) -> Tuple[int, int]:
+        return self._start + self._off[i], self._start + self._off[i + 1]
+
+    def raw(self, i: int) -> bytes:
+        a, b = self.span(i)
+        return self._mm[a:b]
+
+    def str(self, i: int) -> str:
+        return self.raw(i).decode("utf-8")
+
+    def lower_bound(self, key: bytes) -> int:
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.raw(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, key: bytes) -> Optional[int]:
+        i = self.lower_bound(key)
+        return i if i < len(self) and self.raw(i) == key else None
+
+
+class MappedPosts(Mapping[str, _PostData]):
+    """slug -> 文章，直接读取映射文件；只解码被访问的文章，解码结果保留最近 DECODED_POSTS 篇。"""
+
+    def __init__(self, f: _MappedFile) -> None:
+        self._f = f
+        self._slugs = _Blobs(f, "slugs")
+        self._entries = _Blobs(f, "entries")
+        self._revs = f.section("revs")
+        self._flags = f.section("flags")
+        self._data = f.section("data")
+        self._lock = threading.Lock()
+        self._decoded: "OrderedDict[int, _PostData]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._slugs)
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._slugs.str(i) for i in range(len(self._slugs)))
+
+    def __contains__(self, slug: object) -> bool:
+        return isinstance(slug, str) and self.find(slug) is not None
+
+    def __getitem__(self, slug: str) -> _PostData:
+        i = self.find(slug) if isinstance(slug, str) else None
+        if i is None:
+            raise KeyError(slug)
+        return self.at(i)
+
+    def find(self, slug: str) -> Optional[int]:
+        return self._slugs.find(slug.encode("utf-8"))
+
+    def slug_at(self, i: int) -> str:
+        return self._slugs.str(i)
+
+    def at(self, i: int) -> _PostData:
+        with self._lock:
+            pd = self._decoded.get(i)
+            if pd is not None:
+                self._decoded.move_to_end(i)
+                return pd
+        pd = self._decode(i)
+        with self._lock:
+            self._decoded[i] = pd
+            while len(self._decoded) > DECODED_POSTS:
+                self._decoded.popitem(last=False)
+        return pd
+
+    def _decode(self, i: int) -> _PostData:
+        a, b = self._entries.span(i)
+        e = orjson.loads(self._f.view[a:b])
+        data = self._data
+
+        def span(s: List[int]) -> memoryview:
+            return data[s[0]:s[0] + s[1]]
+
+        def variants(d: Dict[str, List[int]]) -> Dict[str, Any]:
+            return {enc: span(s) for enc, s in d.items()}
+
+        layout = None
+        if e["layout"] is not None:
+            head, tail, spans = e["layout"]
+            layout = (head, tail, array("I", spans))
+        encoded = None
+        if e["encoded"] is not None:
+            enc = e["encoded"]
+            encoded = _EncodedPayloads(post=variants(enc["post"]), chunks=[variants(v) for v in enc["chunks"]])
+        return _PostData(
+            meta=PostMeta(**e["meta"]),
+            updated_at=e["updated_at"],
+            toc_html=e["toc_html"],
+            buf=span(e["body"]),
+            offsets=array("I", e["offsets"]),
+            layout=layout,
+            chunk_types=e["chunk_types"],
+            ph_ids=e["ph_ids"],
+            chunk_hashes=e["chunk_hashes"],
+            encoded=encoded,
+            stub=e["stub"],
+        )
+
+    def revisions(self) -> Iterator[Tuple[bytes, bytes, bool]]:
+        """按 slug 顺序迭代 (slug 字节串, 修订标识, 是否 hidden)，不解码文章。"""
+        revs, flags = self._revs, self._flags
+        for i in range(len(self._slugs)):
+            yield self._slugs.raw(i), bytes(revs[i * _REV_SIZE:(i + 1) * _REV_SIZE]), bool(flags[i] & _FLAG_HIDDEN)
+
+    def copy(self) -> PersistentMap:
+        # 接任构建者后的首次发布：转为内存中的可写映射（正文仍引用映射内存）
+        return PersistentMap({self.slug_at(i): self._decode(i) for i in range(len(self))})
+
+
+class MappedSortKeys(Mapping[str, Tuple[float, str]]):
+    """slug -> 排序 key (-时间戳, slug)。"""
+
+    def __init__(self, f: _MappedFile, posts: MappedPosts) -> None:
+        self._posts = posts
+        self._ts = f.ints("sort_ts", "d")
+
+    def __len__(self) -> int:
+        return len(self._posts)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._posts)
+
+    def __getitem__(self, slug: str) -> Tuple[float, str]:
+        i = self._posts.find(slug) if isinstance(slug, str) else None
+        if i is None:
+            raise KeyError(slug)
+        return (self._ts[i], slug)
+
+    def key_at(self, i: int) -> Tuple[float, str]:
+        return (self._ts[i], self._posts.slug_at(i))
+
+    def copy(self) -> PersistentMap:
+        return PersistentMap({key[1]: key for key in (self.key_at(i) for i in range(len(self)))})
+
+
+class MappedOrder(Sequence[Tuple[float, str]]):
+    """排序分区：按 key 升序（新->旧）的文章编号数组，取出时换成 (key, slug)。"""
+
+    def __init__(self, f: _MappedFile, part: str, sort_keys: MappedSortKeys) -> None:
+        self._ids = f.ints("order_" + part, "I")
+        self._keys = sort_keys
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, index):  # type: ignore[override]
+        if isinstance(index, slice):
+            return [self._keys.key_at(i) for i in self._ids[index]]
+        return self._keys.key_at(self._ids[index])
+
+    def __iter__(self) -> Iterator[Tuple[float, str]]:
+        return (self._keys.key_at(i) for i in self._ids)
+
+    def copy(self) -> PersistentSortedList:
+        return PersistentSortedList(list(self))
+
+
+class _MappedPostings:
+    """某个 (词, 字段) 的倒排桶：文章编号 -> 词频。"""
+
+    __slots__ = ("_docs", "_tfs")
+
+    def __init__(self, docs: memoryview, tfs: memoryview) -> None:
+        self._docs = docs
+        self._tfs = tfs
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def keys(self) -> memoryview:
+        return self._docs
+
+    def items(self) -> Iterator[Tuple[int, int]]:
+        return zip(self._docs, self._tfs)
+
+
+class MappedSearchIndex(SearchReader):
+    """映射文件上的倒排索引：词表二分查找，倒排桶与子串匹配文本直接读取映射内存。"""
+
+    def __init__(self, f: _MappedFile, posts: MappedPosts) -> None:
+        self._mm = f.mm
+        self._posts = posts
+        self._terms_blob = _Blobs(f, "terms")
+        self._range = f.ints("term_range", "Q")
+        self._doc = f.ints("post_doc", "I")
+        self._tf = f.ints("post_tf", "I")
+        self._tags = _Blobs(f, "tags")
+        self._tag_range = f.ints("tag_range", "Q")
+        self._tag_doc = f.ints("tag_doc", "I")
+        self._texts = _Blobs(f, "texts")
+
+    def __len__(self) -> int:
+        return len(self._posts)
+
+    def _terms(self, tok: str) -> Iterable[Tuple[Any, float]]:
+        key = tok.encode("utf-8")
+        terms = self._terms_blob
+        i = terms.lower_bound(key)
+        if _is_cjk(tok):
+            return [(i, 1.0)] if i < len(terms) and terms.raw(i) == key else []
+        out: List[Tuple[int, float]] = []
+        while i < len(terms):
+            term = terms.raw(i)
+            if not term.startswith(key):
+                break
+            out.append((i, 1.0 if term == key else _PREFIX_FACTOR))
+            i += 1
+        return out
+
+    def _field_docs(self, field: str, term: Any) -> Optional[_MappedPostings]:
+        k = 3 * term + _FIELDS.index(field)
+        a, b = self._range[k], self._range[k + 1]
+        return _MappedPostings(self._doc[a:b], self._tf[a:b]) if b > a else None
+
+    def _slug(self, doc: Any) -> str:
+        return self._posts.slug_at(doc)
+
+    def _tag_ids(self, i: int) -> memoryview:
+        return self._tag_doc[self._tag_range[i]:self._tag_range[i + 1]]
+
+    def by_tag(self, tag: str) -> Set[str]:
+        i = self._tags.find((tag or "").strip().lower().encode("utf-8"))
+        return set() if i is None else {self._posts.slug_at(d) for d in self._tag_ids(i)}
+
+    def substring(self, q: str, slugs: Iterable[str]) -> List[str]:
+        key = q.encode("utf-8")
+        out: List[str] = []
+        for slug in slugs:
+            i = self._posts.find(slug)
+            if i is None:
+                continue
+            a, b = self._texts.span(i)
+            # 在映射内存上查找，不解码文本
+            if self._mm.find(key, a, b) != -1:
+                out.append(slug)
+        return out
+
+    def clone(self) -> SearchIndex:
+        postings: Dict[str, Dict[str, Dict[str, int]]] = {f: {} for f in _FIELDS}
+        slug_at = self._posts.slug_at
+        for t in range(len(self._terms_blob)):
+            term = self._terms_blob.str(t)
+            for field in _FIELDS:
+                docs = self._field_docs(field, t)
+                if docs is not None:
+                    postings[field][term] = {slug_at(d): tf for d, tf in docs.items()}
+        tags: Dict[str, List[str]] = {}
+        for i in range(len(self._tags)):
+            tag = self._tags.str(i)
+            for d in self._tag_ids(i):
+                tags.setdefault(slug_at(d), []).append(tag)
+        texts = {slug_at(i): self._texts.str(i) for i in range(len(self._texts))}
+        return SearchIndex.from_postings(postings, tags, texts)
+
+
+class MappedAggregates:
+    """映射文件上的统计：写入时已算好的结果，首次使用时解码（体积与标签/月份数成正比）。"""
+
+    def __init__(self, f: _MappedFile, posts: MappedPosts, sort_keys: MappedSortKeys) -> None:
+        self._section = f.section("stats")
+        self._posts = posts
+        self._sort_keys = sort_keys
+        self._decoded: Optional[Dict[str, Any]] = None
+
+    def _stats(self) -> Dict[str, Any]:
+        if self._decoded is None:
+            self._decoded = orjson.loads(self._section)
+        return self._decoded
+
+    def activity(self, since_ts: float) -> Dict[int, int]:
+        return {day: n for day, n in self._stats()["activity"] if day > since_ts}
+
+    def tags(self) -> List[Dict[str, Any]]:
+        return self._stats()["tags"]
+
+    def archive(self) -> List[Dict[str, Any]]:
+        return self._stats()["archive"]
+
+    def clone(self) -> PostAggregates:
+        stats = PostAggregates()
+        for i in range(len(self._posts)):
+            pd = self._posts.at(i)
+            stats.add(pd.meta, self._sort_keys.key_at(i), pd.updated_at)
+        return stats
+
+
+def load_snapshot(path: Path) -> Optional[_IndexSnapshot]:
+    """映射快照文件并返回只读快照；文件不存在或格式不符时返回 None。"""
+    try:
+        with open(path, "rb") as fp:
+            mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        if mm[:len(MAGIC)] != MAGIC:
+            return None
+        (header_len,) = _HEADER_LEN.unpack_from(mm, len(MAGIC))
+        start = len(MAGIC) + _HEADER_LEN.size
+        header = orjson.loads(mm[start:start + header_len])
+        if header.get("format") != FORMAT_VERSION:
+            return None
+    except Exception:
+        return None
+    f = _MappedFile(mm, header, _align(start + header_len))
+    posts = MappedPosts(f)
+    sort_keys = MappedSortKeys(f, posts)
+    return _IndexSnapshot(
+        version=header["version"],
+        posts=posts,
+        sort_keys=sort_keys,
+        order={part: MappedOrder(f, part, sort_keys) for part in _ORDER_PARTITIONS},
+        last_modified=header["last_modified"],
+        search=MappedSearchIndex(f, posts),
+        stats=MappedAggregates(f, posts, sort_keys),  # type: ignore[arg-type]
+    )
+
+
+def diff_posts(old: Optional[MappedPosts], new: MappedPosts) -> Tuple[List[str], List[str], List[str]]:
+    """比对两代快照的修订标识（两者均按 slug 有序，归并一遍）。
+
+    返回 (changed, removed, dirty)：前两者只计非 hidden 文章（由可见变为 hidden 视为删除），
+    dirty 为内容或存在性有变化的全部 slug。
+    """
+    changed: List[str] = []
+    removed: List[str] = []
+    dirty: List[str] = []
+    a = iter(old.revisions()) if old is not None else iter(())
+    b = iter(new.revisions())
+    x = next(a, None)
+    y = next(b, None)
+    while x is not None or y is not None:
+        if y is None or (x is not None and x[0] < y[0]):
+            slug = x[0].decode("utf-8")
+            dirty.append(slug)
+            if not x[2]:
+                removed.append(slug)
+            x = next(a, None)
+        elif x is None or y[0] < x[0]:
+            slug = y[0].decode("utf-8")
+            dirty.append(slug)
+            if not y[2]:
+                changed.append(slug)
+            y = next(b, None)
+        else:
+            if x[1] != y[1]:
+                slug = y[0].decode("utf-8")
+                dirty.append(slug)
+                if not y[2]:
+                    changed.append(slug)
+                elif not x[2]:
+                    removed.append(slug)
+            elif x[2] != y[2]:
+                # 修订标识含元数据（可见性），相同时 hidden 标记必然一致；保守处理
+                slug = y[0].decode("utf-8")
+                dirty.append(slug)
+                (removed if y[2] else changed).append(slug)
+            x = next(a, None)
+            y = next(b, None)
+    return changed, removed, dirty
+
+
+class SharedIndex:
+    """多进程共享索引的协调：选出构建进程，其余进程装载并跟随快照文件。
+
+    - 构建者：以非阻塞 flock 抢占 <path>.lock；抢到后先装载已有快照（可立即提供服务），
+      再在后台全量扫描并开始监听文件，此后版本变化由写出线程合并后写出新快照：
+      最后一次变化后静默 write_delay 秒再写，连续变化时最长间隔 write_max_delay 秒
+    - 只读者：装载快照并定期检查文件是否被替换；构建进程退出（锁释放）后由某个只读者接任
+    """
+
+    def __init__(self, indexer: DocsIndexer, path: Path, reader_only: bool = False, poll_interval: float = 1.0,
+                 startup_wait: float = 60.0, write_delay: float = 0.5, write_max_delay: float = 5.0) -> None:
+        self.indexer = indexer
+        self.path = path
+        self.reader_only = reader_only
+        self.poll_interval = max(0.1, poll_interval)
+        # 只读者启动时最多等待构建者写出首个快照的秒数（与单进程模式下启动即完成扫描的行为一致）
+        self.startup_wait = max(0.0, startup_wait)
+        self.write_delay = max(0.0, write_delay)
+        self.write_max_delay = max(self.write_delay, write_max_delay)
+        self.role = "none"
+        self._lock_fd: Optional[int] = None
+        self._write_lock = threading.Lock()
+        self._written: Optional[_IndexSnapshot] = None
+        # 写出线程：_due 为计划写出的时刻，_first 为本批首个变化的时刻（None 表示无待写）
+        self._cond = threading.Condition()
+        self._due: Optional[float] = None
+        self._first: Optional[float] = None
+        self._writer: Optional[threading.Thread] = None
+        # 已装载文件的标识 (st_ino, st_mtime_ns, st_size) 与其中的文章（用于比对下一代）
+        self._file_id: Optional[Tuple[int, int, int]] = None
+        self._posts: Optional[MappedPosts] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.loads = 0
+        self.writes = 0
+        self.last_load_ms = 0.0
+        self.last_write_ms = 0.0
+        self.bytes = 0
+
+    @staticmethod
+    def supported() -> bool:
+        return fcntl is not None
+
+    def start(self) -> None:
+        self.role = "reader"
+        self.indexer.read_only = True
+        deadline = time.monotonic() + self.startup_wait
+        while True:
+            if not self.reader_only and self._try_lock():
+                self._become_builder(background=self._load())
+                return
+            if self._load():
+                break
+            if time.monotonic() >= deadline:
+                logger.warning("shared index %s not ready after %.0f s; serving an empty index until it appears",
+                               self.path, self.startup_wait)
+                break
+            time.sleep(min(self.poll_interval, 0.2))
+        self._thread = threading.Thread(target=self._follow, name="shared-index-follow", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止跟随与写出线程；构建者尚有未写出的变化时先写出。"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in (self._thread, self._writer):
+            if thread is not None:
+                thread.join(timeout=30)
+        self._thread = self._writer = None
+
+    def _try_lock(self) -> bool:
+        if fcntl is None:
+            return False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        # 锁随进程退出自动释放，fd 保持打开
+        self._lock_fd = fd
+        return True
+
+    def _become_builder(self, background: bool) -> None:
+        # background=True：已装载现有快照，全量扫描不阻塞启动
+        self.role = "builder"
+        self.indexer.read_only = False
+        # 装载的快照即文件内容，无需写回
+        self._written = self.indexer._snapshot
+        self._writer = threading.Thread(target=self._write_loop, name="shared-index-write", daemon=True)
+        self._writer.start()
+        self.indexer.add_listener(self._on_version)
+        logger.info("shared index %s: this process (pid %d) is the builder", self.path, os.getpid())
+        if background:
+            self.indexer.start_watch()
+            self.indexer.rebuild_in_background()
+        else:
+            self.indexer.scan_all()
+            self.indexer.start_watch()
+
+    def _on_version(self, version: int, changed: List[str], removed: List[str]) -> None:
+        # 在发布线程中调用：只登记，写出由后台线程完成
+        now = time.monotonic()
+        with self._cond:
+            if self._first is None:
+                self._first = now
+            self._due = min(now + self.write_delay, self._first + self.write_max_delay)
+            self._cond.notify()
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._due is None:
+                        if self._stop.is_set():
+                            return
+                        self._cond.wait()
+                        continue
+                    wait = self._due - time.monotonic()
+                    if wait <= 0 or self._stop.is_set():
+                        break
+                    self._cond.wait(wait)
+                self._due = self._first = None
+            self.write()
+
+    def write(self) -> None:
+        """写出当前快照；多个线程同时触发时只写最新的一份。"""
+        with self._write_lock:
+            snap = self.indexer._snapshot
+            if snap is self._written:
+                return
+            t0 = time.perf_counter()
+            try:
+                self.bytes = write_snapshot(snap, self.path)
+            except Exception:
+                logger.exception("failed to write shared index %s", self.path)
+                return
+            self._written = snap
+            self.writes += 1
+            self.last_write_ms = round((time.perf_counter() - t0) * 1000.0, 1)
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _load(self) -> bool:
+        file_id = self._stat()
+        if file_id is None:
+            return False
+        t0 = time.perf_counter()
+        snap = load_snapshot(self.path)
+        if snap is None:
+            return False
+        posts: MappedPosts = snap.posts  # type: ignore[assignment]
+        changed, removed, dirty = diff_posts(self._posts, posts)
+        self.indexer.adopt(snap, changed, removed, dirty)
+        self._file_id = file_id
+        self._posts = posts
+        self.loads += 1
+        self.last_load_ms = round((time.perf_counter() - t0) * 1000.0, 1)
+        self.bytes = file_id[2]
+        return True
+
+    def _follow(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if not self.reader_only and self._try_lock():
+                    # 原构建进程已退出：装载最新快照后接任
+                    self._load()
+                    self._become_builder(background=True)
+                    return
+                file_id = self._stat()
+                if file_id is not None and file_id != self._file_id:
+                    self._load()
+            except Exception:
+                logger.exception("failed to follow shared index %s", self.path)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = self._due is not None
+        return {
+            "role": self.role,
+            "path": str(self.path),
+            "pid": os.getpid(),
+            "loads": self.loads,
+            "writes": self.writes,
+            "write_pending": pending,
+            "last_load_ms": self.last_load_ms,
+            "last_write_ms": self.last_write_ms,
+            "bytes": self.bytes,
+        }
@@ -0,0 +1,312 @@
+"""public/ 静态资源的内容指纹表。
+
+启动时为 public/ 下每个文件计算内容哈希，生成同目录下的指纹文件名（app.js -> app.<hash>.js，
+保证 katex.min.css 中 fonts/ 之类的相对引用仍然有效）。页面外壳中的 /static/... 引用改写为指纹地址，
+指纹地址的响应可长期缓存（immutable）；文件内容变化后地址随之变化，客户端缓存不会读到旧内容。
+
+可压缩的文本资源另备 .gz/.br 变体：public/ 中已有的同名 .gz/.br（不旧于原文件）直接使用，
+否则在后台线程中生成一次并按内容哈希缓存到 cache_dir（未设置时保存在内存中）。
+
+public/ 的变化由 watchdog 监听，去抖后在后台线程中 refresh()，请求路径上不再扫描目录。
+"""
+from __future__ import annotations
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import queue
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli  # type: ignore
+except Exception:
+    brotli = None  # brotli 可选；缺失时仅生成 gzip 变体
+
+# 指纹长度（十六进制字符数）
+HASH_LEN = 10
+# 预压缩变体的文件后缀
+VARIANT_SUFFIX = {"br": ".br", "gzip": ".gz"}
+# 需要预压缩的文件类型（图片、woff2 等已压缩格式不再处理）
+_COMPRESSIBLE = {".js", ".css", ".html", ".json", ".svg", ".txt", ".xml", ".map", ".webmanifest", ".ttf", ".otf"}
+_MIN_COMPRESS_SIZE = 1000
+# 外壳中可改写的引用：属性值或 url() 中以 /static/ 开头的路径（不含查询串）
+_STATIC_REF = re.compile(r"""(?<=["'(])/static/([^"'()?#\s<>]+)""")
+
+
+@dataclass(frozen=True)
+class Asset:
+    rel: str          # 相对 public/ 的路径（posix）
+    hashed_rel: str   # 指纹文件名，与 rel 同目录
+    digest: str       # 完整内容哈希，预压缩缓存以此寻址
+    size: int
+    mtime_ns: int
+    media_type: str
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        """各编码的响应体不同，ETag 也各不相同（强校验要求字节一致）。"""
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+
+def _hashed_name(rel: str, short: str) -> str:
+    head, sep, name = rel.rpartition("/")
+    stem, dot, ext = name.partition(".")
+    # 多重后缀（katex.min.css）整体保留在指纹之后，后缀映射的类型不变
+    hashed = f"{stem}.{short}.{ext}" if dot else f"{name}.{short}"
+    return f"{head}{sep}{hashed}"
+
+
+def _is_variant(path: Path) -> bool:
+    # public/ 中的 x.js.gz 等视为 x.js 的预压缩变体，本身不登记
+    return path.suffix in (".gz", ".br") and path.with_suffix("").is_file()
+
+
+class _AssetEventHandler(FileSystemEventHandler):
+    def __init__(self, manifest: "AssetManifest") -> None:
+        super().__init__()
+        self.manifest = manifest
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed", "closed_no_write"):
+            return
+        self.manifest._schedule_refresh()
+
+
+class AssetManifest:
+    """public/ 的指纹表：rel <-> 指纹文件名，以及各资源的预压缩变体。
+
+    build() 在启动时调用；refresh() 按 (mtime, size) 检查变化并重算变化文件的哈希，generation
+    随之递增（外壳缓存以此失效）。start_watch() 后由文件监听在后台触发 refresh()。
+    """
+
+    def __init__(self, root: Path, cache_dir: Optional[Path] = None, precompress: bool = True,
+                 watch_debounce: float = 0.3) -> None:
+        self.root = root
+        self.cache_dir = cache_dir
+        self.precompress = precompress
+        self.watch_debounce = max(0.0, watch_debounce)
+        self.generation = 0
+        # (rel -> Asset, hashed_rel -> Asset) 整体替换，读取方无需加锁
+        self._maps: Tuple[Dict[str, Asset], Dict[str, Asset]] = ({}, {})
+        self._lock = threading.Lock()
+        self._observer: Optional[Observer] = None
+        self._timer: Optional[threading.Timer] = None
+        self._timer_lock = threading.Lock()
+        # cache_dir 为 None 时生成的变体保存在内存：(digest, encoding) -> bytes
+        self._memory: Dict[Tuple[str, str], bytes] = {}
+        self._queue: "queue.Queue[Asset]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self.compressed = 0
+        self.build_ms = 0.0
+
+    # ---- 指纹表 ----
+
+    def build(self) -> None:
+        t0 = time.perf_counter()
+        self.refresh()
+        self.build_ms = round((time.perf_counter() - t0) * 1000.0, 1)
+        by_rel = self._maps[0]
+        logger.info("static assets: %d files fingerprinted in %.1f ms", len(by_rel), self.build_ms)
+
+    def refresh(self) -> bool:
+        """重新检查 public/；有文件增删改时更新指纹表并返回 True。"""
+        with self._lock:
+            old = self._maps[0]
+            by_rel: Dict[str, Asset] = {}
+            fresh = []
+            changed = False
+            for path in sorted(self.root.rglob("*")) if self.root.is_dir() else []:
+                try:
+                    if not path.is_file() or _is_variant(path):
+                        continue
+                    st = path.stat()
+                except OSError:
+                    continue
+                rel = path.relative_to(self.root).as_posix()
+                prev = old.get(rel)
+                if prev is not None and prev.mtime_ns == st.st_mtime_ns and prev.size == st.st_size:
+                    by_rel[rel] = prev
+                    continue
+                asset = self._fingerprint(path, rel, st)
+                if asset is None:
+                    continue
+                by_rel[rel] = asset
+                changed = changed or prev is None or prev.digest != asset.digest
+                fresh.append(asset)
+            changed = changed or len(by_rel) != len(old)
+            if changed or any(old.get(rel) is not a for rel, a in by_rel.items()):
+                # 仅 mtime 变化（内容不变）时也替换，记录新的 mtime；指纹不变，generation 不递增
+                self._maps = (by_rel, {a.hashed_rel: a for a in by_rel.values()})
+            if changed:
+                self.generation += 1
+            for asset in fresh:
+                self._enqueue(asset)
+            return changed
+
+    def start_watch(self) -> None:
+        if self._observer or not self.root.is_dir():
+            return
+        observer = Observer()
+        observer.schedule(_AssetEventHandler(self), str(self.root), recursive=True)
+        observer.start()
+        self._observer = observer
+
+    def stop_watch(self) -> None:
+        if self._observer:
+            self._observer.stop()
+            self._observer.join(timeout=2)
+            self._observer = None
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _schedule_refresh(self) -> None:
+        # 一次复制/部署会产生大量事件：去抖后只扫描一次
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.watch_debounce, self._watch_refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _watch_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("failed to refresh static assets")
+
+    def _fingerprint(self, path: Path, rel: str, st: os.stat_result) -> Optional[Asset]:
+        h = hashlib.blake2b(digest_size=16)
+        try:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+        except OSError:
+            return None
+        digest = h.hexdigest()
+        media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        return Asset(rel=rel, hashed_rel=_hashed_name(rel, digest[:HASH_LEN]), digest=digest,
+                     size=st.st_size, mtime_ns=st.st_mtime_ns, media_type=media_type)
+
+    def url(self, rel: str) -> Optional[str]:
+        asset = self._maps[0].get(rel.lstrip("/"))
+        return f"/static/{asset.hashed_rel}" if asset else None
+
+    def rewrite(self, html_text: str) -> str:
+        """将 html 中指向已登记资源的 /static/<rel> 改写为指纹地址，未登记的路径保持原样。"""
+        by_rel = self._maps[0]
+
+        def sub(m: "re.Match[str]") -> str:
+            asset = by_rel.get(m.group(1))
+            return f"/static/{asset.hashed_rel}" if asset else m.group(0)
+
+        return _STATIC_REF.sub(sub, html_text)
+
+    def resolve(self, hashed_rel: str) -> Optional[Asset]:
+        """按指纹文件名查找资源；磁盘上的文件已变化（尚未 refresh）时返回 None，避免以旧地址长期缓存新内容。
+
+        由异步请求处理直接调用：只做一次 stat，不在调用线程中重算指纹，变化由后台 refresh() 处理。
+        """
+        asset = self._maps[1].get(hashed_rel)
+        if asset is None:
+            return None
+        try:
+            st = (self.root / asset.rel).stat()
+        except OSError:
+            return None
+        if st.st_mtime_ns != asset.mtime_ns or st.st_size != asset.size:
+            # 文件监听尚未处理（或未启用）：安排后台刷新，本次按未知地址处理
+            self._schedule_refresh()
+            return None
+        return asset
+
+    def items(self) -> Dict[str, Asset]:
+        return dict(self._maps[0])
+
+    # ---- 预压缩变体 ----
+
+    def _compressible(self, asset: Asset) -> bool:
+        return self.precompress and asset.size >= _MIN_COMPRESS_SIZE and \
+            Path(asset.rel).suffix.lower() in _COMPRESSIBLE
+
+    def variant(self, asset: Asset, encoding: str) -> Optional[Any]:
+        """返回 encoding 变体：Path（磁盘文件）或 bytes（内存）；尚未生成或不适用时返回 None。"""
+        suffix = VARIANT_SUFFIX.get(encoding)
+        if suffix is None:
+            return None
+        sibling = self.root / (asset.rel + suffix)
+        try:
+            if sibling.stat().st_mtime_ns >= asset.mtime_ns:
+                return sibling
+        except OSError:
+            pass
+        if not self._compressible(asset):
+            return None
+        if self.cache_dir is None:
+            return self._memory.get((asset.digest, encoding))
+        cached = self.cache_dir / (asset.digest + suffix)
+        return cached if cached.is_file() else None
+
+    def _enqueue(self, asset: Asset) -> None:
+        if not self._compressible(asset):
+            return
+        self._queue.put(asset)
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._compress_loop, name="asset-precompress", daemon=True)
+            self._worker.start()
+
+    def _compress_loop(self) -> None:
+        while True:
+            asset = self._queue.get()
+            try:
+                self._compress(asset)
+            except Exception:
+                logger.exception("failed to precompress static asset %s", asset.rel)
+
+    def _compress(self, asset: Asset) -> None:
+        if self._maps[0].get(asset.rel) is not asset:
+            return  # 已被更新的版本取代
+        encodings = ["gzip"] + (["br"] if brotli is not None else [])
+        missing = [enc for enc in encodings if self.variant(asset, enc) is None]
+        if not missing:
+            return
+        body = (self.root / asset.rel).read_bytes()
+        if hashlib.blake2b(body, digest_size=16).hexdigest() != asset.digest:
+            return  # 读取时文件已变化，等待下次 refresh
+        for enc in missing:
+            data = gzip.compress(body, compresslevel=9, mtime=0) if enc == "gzip" else brotli.compress(body, quality=11)
+            if len(data) >= len(body):
+                continue
+            if self.cache_dir is None:
+                self._memory[(asset.digest, enc)] = data
+            else:
+                # 多进程可能同时生成同一变体：临时文件 + 原子替换
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                target = self.cache_dir / (asset.digest + VARIANT_SUFFIX[enc])
+                tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+                tmp.write_bytes(data)
+                os.replace(tmp, target)
+            self.compressed += 1
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "files": len(self._maps[0]),
+            "generation": self.generation,
+            "build_ms": self.build_ms,
+            "compressed": self.compressed,
+            "pending": self.pending(),
+        }
@@ -0,0 +1,118 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import PostMeta
+from .persistent import BucketMap, PersistentMap
+
+
+@dataclass(frozen=True)
+class _Contribution:
+    """单篇文章对各聚合桶的贡献，删除/更新时据此精确回退。"""
+    meta: PostMeta
+    sort_key: Tuple[float, str]
+    day: Optional[int]  # 发布日（UTC 零点时间戳），仅 frontmatter 含合法 date 时存在
+    year_month: Tuple[int, int]
+    tags: Tuple[str, ...]
+    listed: bool  # 仅 public 文章计入标签与归档
+
+
+def _parse_date(date_str: Optional[str]) -> Optional[datetime]:
+    if not date_str:
+        return None
+    try:
+        return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+    except (ValueError, TypeError):
+        return None
+
+
+class PostAggregates:
+    """增量维护的统计：每日发布数、标签 -> 文章、年/月归档。
+
+    与 SearchIndex 相同采用写时复制：已发布的实例不再修改，增量更新在 clone()（O(1)）出的副本上进行，
+    只复制被修改的路径与桶。
+    """
+
+    def __init__(self) -> None:
+        self._contrib: PersistentMap = PersistentMap()
+        # 发布日 -> 篇数
+        self._activity: PersistentMap = PersistentMap()
+        # 标签 / (年, 月) -> {slug: sort_key}
+        self._tags = BucketMap()
+        self._archive = BucketMap()
+
+    def clone(self) -> "PostAggregates":
+        """返回可修改的副本；原实例（已发布）保持不变。"""
+        agg = PostAggregates.__new__(PostAggregates)
+        agg._contrib = self._contrib.copy()
+        agg._activity = self._activity.copy()
+        agg._tags = self._tags.copy()
+        agg._archive = self._archive.copy()
+        return agg
+
+    def add(self, meta: PostMeta, sort_key: Tuple[float, str], updated_at: float) -> None:
+        dt = _parse_date(meta.date)
+        day: Optional[int] = None
+        if dt is not None:
+            ts = int(dt.timestamp())
+            day = ts - (ts % 86400)
+        when = dt or datetime.fromtimestamp(updated_at)
+        tags = tuple(dict.fromkeys(str(t).strip() for t in (meta.tags or []) if str(t).strip()))
+        c = _Contribution(
+            meta=meta,
+            sort_key=sort_key,
+            day=day,
+            year_month=(when.year, when.month),
+            tags=tags,
+            listed=getattr(meta, 'visibility', 'public') == 'public',
+        )
+        self.remove(meta.slug)
+        self._contrib[meta.slug] = c
+        if c.day is not None:
+            self._activity[c.day] = self._activity.get(c.day, 0) + 1
+        if c.listed:
+            for t in c.tags:
+                self._tags.put(t, meta.slug, sort_key)
+            self._archive.put(c.year_month, meta.slug, sort_key)
+
+    def remove(self, slug: str) -> None:
+        c = self._contrib.pop(slug, None)
+        if c is None:
+            return
+        if c.day is not None:
+            n = self._activity.get(c.day, 0) - 1
+            if n > 0:
+                self._activity[c.day] = n
+            else:
+                self._activity.pop(c.day, None)
+        if c.listed:
+            for t in c.tags:
+                self._tags.discard(t, slug)
+            self._archive.discard(c.year_month, slug)
+
+    def activity(self, since_ts: float) -> Dict[int, int]:
+        """since_ts 之后每日的发布数（含所有可见性，与原热力图口径一致）。"""
+        return {day: n for day, n in self._activity.items() if day > since_ts}
+
+    def tags(self) -> List[Dict[str, Any]]:
+        out = []
+        for tag, posts in self._tags.items():
+            slugs = [slug for slug, _ in sorted(posts.items(), key=lambda kv: kv[1])]
+            out.append({"tag": tag, "count": len(slugs), "slugs": slugs})
+        out.sort(key=lambda item: item["tag"])
+        return out
+
+    def archive(self) -> List[Dict[str, Any]]:
+        by_year: Dict[int, List[Dict[str, Any]]] = {}
+        for (year, month), posts in self._archive.items():
+            items = []
+            for slug, _ in sorted(posts.items(), key=lambda kv: kv[1]):
+                meta = self._contrib[slug].meta
+                items.append({"slug": slug, "title": meta.title, "date": meta.date})
+            by_year.setdefault(year, []).append({"month": month, "count": len(items), "posts": items})
+        out = []
+        for year in sorted(by_year, reverse=True):
+            months = sorted(by_year[year], key=lambda m: m["month"], reverse=True)
+            out.append({"year": year, "count": sum(m["count"] for m in months), "months": months})
+        return out
@@ -1,6 +1,8 @@
 const $ = (sel, el = document) => el.querySelector(sel);
 const $$ = (sel, el = document) => Array.from(el.querySelectorAll(sel));
 const API_BASE = (document.querySelector('meta[name="api-base"]')?.content || (window.__API_BASE__ || '')).trim();
+// 静态导出站点（python -m backend.export）：/api/* 改为读取预渲染的 .json 文件
+const STATIC_EXPORT = !!document.getElementById('static-export');
 
 const state = {
   config: null,
@@ -29,7 +31,43 @@ function withBust(url) {
   }
 }
 
+function staticApiPath(path) {
+  const [p, query = ''] = path.split('?');
+  if (new URLSearchParams(query).get('chunked')) return `${p}/manifest.json`;
+  return `${p}.json`;
+}
+
+// 静态站点无法按查询参数响应：分页、标签筛选与搜索在全部 public 文章（/api/posts.json）上本地完成；
+// 搜索只匹配标题、摘要与标签
+let staticPostList = null;
+async function staticPosts(path) {
+  if (!staticPostList) staticPostList = api('/api/posts').then((list) => list || []);
+  const all = await staticPostList;
+  const sp = new URLSearchParams(path.split('?')[1] || '');
+  const q = (sp.get('q') || '').trim().toLowerCase();
+  const page = Math.max(1, Number(sp.get('page') || 1) || 1);
+  const pageSize = Math.max(1, Number(sp.get('pageSize') || 10) || 10);
+  if (sp.get('paged') !== 'true' && !sp.has('q') && page === 1) return all;
+  let items = all;
+  if (q.startsWith('tag:')) {
+    const tag = q.slice(4).trim();
+    items = all.filter((m) => (m.tags || []).some((t) => String(t).trim().toLowerCase() === tag));
+  } else if (q) {
+    items = all.filter((m) => [m.title, m.summary, ...(m.tags || [])].some((v) => String(v || '').toLowerCase().includes(q)));
+  }
+  const total = items.length;
+  const totalPages = Math.ceil(total / pageSize);
+  return {
+    items: items.slice((page - 1) * pageSize, page * pageSize),
+    page: { total, page, pageSize, totalPages, hasPrev: page > 1, hasNext: page < totalPages },
+  };
+}
+
 async function api(path, opts = {}) {
+  if (STATIC_EXPORT) {
+    if (path.startsWith('/api/posts?')) return staticPosts(path);
+    path = staticApiPath(path);
+  }
   const { cacheKey, bustOn304 } = opts;
   const storageKey = cacheKey ? 'apiCache:' + cacheKey : null;
   const readCache = () => {
@@ -83,6 +121,84 @@ async function api(path, opts = {}) {
   return cached;
 }
 
+// 批量取块时每个请求携带的块数上限（控制 URL 长度）
+const CHUNK_BATCH_SIZE = 200;
+
+// 以 NDJSON 流读取批量分块接口，每收到一行即回调 onItem(chunk)
+async function streamChunks(path, onItem) {
+  try {
+    const res = await fetch(joinUrl(API_BASE, path), { headers: { 'Accept': 'application/x-ndjson' } });
+    if (!res.ok || !res.body) return;
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buf = '';
+    const handle = (line) => {
+      if (!line.trim()) return;
+      const ck = JSON.parse(line);
+      if (ck && ck.html != null) onItem(ck);
+    };
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buf += decoder.decode(value, { stream: true });
+      let nl;
+      while ((nl = buf.indexOf('\n')) >= 0) {
+        handle(buf.slice(0, nl));
+        buf = buf.slice(nl + 1);
+      }
+    }
+    handle(buf + decoder.decode());
+  } catch {}
+}
+
+// 只查浏览器 HTTP 缓存、不发网络请求；跨域或浏览器不支持 only-if-cached 时视为未命中
+async function cachedJson(url) {
+  try {
+    const res = await fetch(url, { cache: 'only-if-cached', mode: 'same-origin', headers: { 'Accept': 'application/json' } });
+    return res.ok ? await res.json() : null;
+  } catch { return null; }
+}
+
+// 获取一组分块，每拿到一块回调 onChunk(index, html)；返回已拿到的块索引集合，其余由调用方逐块补取。
+// 有内容哈希的块先查浏览器缓存中的不可变 /c/{hash} 响应，只把未命中的哈希合并成批量流式请求；
+// 按哈希的批量响应同样可长期缓存，无哈希的块按索引批量获取
+async function fetchChunks(slug, indices, hashes, onChunk) {
+  const received = new Set();
+  // 静态站点没有批量接口：返回空集合，由调用方逐块请求
+  if (!indices.length || STATIC_EXPORT) return received;
+  const deliver = (i, html) => {
+    if (received.has(i)) return;
+    received.add(i);
+    onChunk(i, html);
+  };
+  const base = `/api/post/${encodeURIComponent(slug)}`;
+  // 同一内容可能出现在多个位置：按哈希归并，只取一次
+  const byHash = new Map();
+  const plain = [];
+  for (const i of indices) {
+    const h = hashes && hashes[i];
+    if (!h) { plain.push(i); continue; }
+    if (!byHash.has(h)) byHash.set(h, []);
+    byHash.get(h).push(i);
+  }
+  const hits = await Promise.all(Array.from(byHash.keys()).map(h => cachedJson(joinUrl(API_BASE, `${base}/c/${h}`))));
+  // 未命中的哈希保持文档顺序，使同一篇文章再次访问时批量 URL 一致、能命中缓存
+  const missing = [];
+  Array.from(byHash.entries()).forEach(([h, targets], k) => {
+    const ck = hits[k];
+    if (ck && ck.html != null) targets.forEach(i => deliver(i, ck.html));
+    else missing.push(h);
+  });
+  const queries = [];
+  for (let k = 0; k < missing.length; k += CHUNK_BATCH_SIZE) queries.push(`hashes=${missing.slice(k, k + CHUNK_BATCH_SIZE).join(',')}`);
+  for (let k = 0; k < plain.length; k += CHUNK_BATCH_SIZE) queries.push(`indices=${plain.slice(k, k + CHUNK_BATCH_SIZE).join(',')}`);
+  await Promise.all(queries.map(q => streamChunks(`${base}/chunks?stream=true&${q}`, (ck) => {
+    const targets = ck.hash ? (byHash.get(ck.hash) || []) : [ck.index];
+    targets.forEach(i => { if (typeof i === 'number') deliver(i, ck.html); });
+  })));
+  return received;
+}
+
 async function loadConfig() {
   // 优先使用服务端内联注入的配置（绕过 CDN 对 /api/config 的干扰）
   try {
@@ -620,7 +736,7 @@ function renderList() {
   applyLanguageIfNeeded(el);
 }
 
-function renderTagsPage() {
+function renderTagsPage(tagStats) {
   const el = $('#app');
   el.innerHTML = '';
   const title = document.createElement('h1');
@@ -632,13 +748,21 @@ function renderTagsPage() {
   el.appendChild(title);
 
   const tagMap = new Map(); // tag -> count
-  (state.posts || []).forEach(p => {
-    (p.tags || []).forEach(t => {
-      const key = String(t || '').trim();
-      if (!key) return;
-      tagMap.set(key, (tagMap.get(key) || 0) + 1);
+  if (Array.isArray(tagStats)) {
+    // 后端预聚合的标签统计（/api/tags）
+    tagStats.forEach(item => {
+      const key = String(item.tag || '').trim();
+      if (key) tagMap.set(key, Number(item.count) || 0);
     });
-  });
+  } else {
+    (state.posts || []).forEach(p => {
+      (p.tags || []).forEach(t => {
+        const key = String(t || '').trim();
+        if (!key) return;
+        tagMap.set(key, (tagMap.get(key) || 0) + 1);
+      });
+    });
+  }
 
   if (!tagMap.size) {
     const empty = document.createElement('div');
@@ -668,7 +792,7 @@ function renderTagsPage() {
   el.appendChild(list);
 }
 
-function renderArchivePage() {
+function renderArchivePage(archive) {
   const el = $('#app');
   el.innerHTML = '';
   
@@ -677,12 +801,20 @@ function renderArchivePage() {
 
   // 按年份分组
   const groups = {};
-  state.posts.forEach(p => {
-    const d = p.date ? new Date(p.date) : new Date();
-    const y = d.getFullYear();
-    if (!groups[y]) groups[y] = [];
-    groups[y].push(p);
-  });
+  if (Array.isArray(archive)) {
+    // 后端预聚合的年/月归档（/api/archive），已按新->旧排序
+    archive.forEach(yr => {
+      groups[yr.year] = [];
+      (yr.months || []).forEach(m => (m.posts || []).forEach(p => groups[yr.year].push(p)));
+    });
+  } else {
+    state.posts.forEach(p => {
+      const d = p.date ? new Date(p.date) : new Date();
+      const y = d.getFullYear();
+      if (!groups[y]) groups[y] = [];
+      groups[y].push(p);
+    });
+  }
 
   // 年份倒序
   const years = Object.keys(groups).sort((a, b) => b - a);
@@ -1279,20 +1411,27 @@ async function renderPost(slug, opts = {}) {
   const total = Number(data.totalChunks || 0);
   const types = Array.isArray(data.chunk_types) ? data.chunk_types : null;
   const phIds = Array.isArray(data.ph_ids) ? data.ph_ids : null;
+  // 有内容哈希时走不可变 URL（可被浏览器/CDN 长期缓存），否则按索引获取
+  const chunkHashes = Array.isArray(data.chunk_hashes) ? data.chunk_hashes : null;
+  const chunkUrl = (i) => (chunkHashes && chunkHashes[i])
+    ? `/api/post/${encodeURIComponent(slug)}/c/${chunkHashes[i]}`
+    : `/api/post/${encodeURIComponent(slug)}/chunk/${i}`;
   const textIndices = [];
   const imageIndices = [];
   for (let i = 0; i < total; i++) {
     const t = types ? types[i] : 'text';
     if (t === 'image') imageIndices.push(i); else textIndices.push(i);
   }
-  // 并发获取所有文本块内容
+  // 批量获取所有文本块内容（浏览器已缓存的哈希块不再请求），批量未取到的再逐块获取
   const textHtmlByIndex = new Map();
-  const textResults = await Promise.all(textIndices.map(async (i) => {
+  const textReceived = await fetchChunks(slug, textIndices, chunkHashes, (i, html) => {
+    if (typeof html === 'string') textHtmlByIndex.set(i, html);
+  });
+  await Promise.all(textIndices.filter(i => !textReceived.has(i)).map(async (i) => {
     try {
-      const ck = await api(`/api/post/${encodeURIComponent(slug)}/chunk/${i}`, { cacheKey: `post-chunk:${slug}:${i}`, bustOn304: false });
+      const ck = await api(chunkUrl(i), { cacheKey: `post-chunk:${slug}:${i}`, bustOn304: false });
       if (ck && typeof ck.html === 'string') textHtmlByIndex.set(i, ck.html);
-      return true;
-    } catch { return false; }
+    } catch {}
   }));
   // 完整性与顺序校验：必须全部拿到文本块
   const allTextOk = textIndices.every(i => textHtmlByIndex.has(i));
@@ -1409,50 +1548,52 @@ async function renderPost(slug, opts = {}) {
   renderMermaid(contentEl);
   applyGlobalLazyLoading(contentEl);
   applyLanguageIfNeeded(contentEl);
-  // 并发请求所有图片块并替换占位符（文本已整体稳定渲染）
-  await Promise.all(imageIndices.map(async (i) => {
+  // 图片块：一个 NDJSON 流按顺序逐块到达并替换占位符（文本已整体稳定渲染）；流中缺失的块再逐个请求
+  const applyImageChunk = (i, html) => {
     const ph = phIds && phIds[i] ? String(phIds[i]) : null;
-    const ck = await api(`/api/post/${encodeURIComponent(slug)}/chunk/${i}`, { cacheKey: `post-chunk:${slug}:${i}`, bustOn304: false });
-    if (ck && ck.html != null) {
-      const tmp = document.createElement('div'); tmp.innerHTML = ck.html;
-      const node = tmp.firstElementChild || null;
-      const placeholder = ph ? contentEl.querySelector(`.img-ph[data-ph="${CSS.escape(ph)}"]`) : null;
-      if (placeholder) {
-        if (node) {
-          const lqip = placeholder.getAttribute('data-lqip') || '';
-          if (lqip) {
-            // 使用占位符作为 LQIP 背景，插入真实 <img> 后淡入，最后移除包装
-            try { placeholder.innerHTML = ''; } catch {}
-            placeholder.classList.add('lqip-holder');
-            // 将 LQIP 传递给 <img>，以便懒加载包装器识别
-            try { node.setAttribute('data-lqip', lqip); } catch {}
-            placeholder.appendChild(node);
-            // 仅作用于该占位节点，避免全局重新扫描
-            applyGlobalLazyLoading(placeholder);
-            applyLanguageIfNeeded(placeholder);
-            const img = node;
-            const unwrap = () => {
-              try { placeholder.style.backgroundImage = 'none'; placeholder.style.filter = 'none'; } catch {}
-              // 等待过渡结束后再移除包装（保留一次微小延时）
-              setTimeout(() => { if (placeholder.parentNode) placeholder.replaceWith(img); }, 120);
-            };
-            if (img.complete) unwrap();
-            else { img.addEventListener('load', unwrap, { once: true }); img.addEventListener('error', unwrap, { once: true }); }
-          } else {
-            placeholder.replaceWith(node);
-            applyGlobalLazyLoading(contentEl);
-            applyLanguageIfNeeded(contentEl);
-          }
+    const tmp = document.createElement('div'); tmp.innerHTML = html;
+    const node = tmp.firstElementChild || null;
+    const placeholder = ph ? contentEl.querySelector(`.img-ph[data-ph="${CSS.escape(ph)}"]`) : null;
+    if (placeholder) {
+      if (node) {
+        const lqip = placeholder.getAttribute('data-lqip') || '';
+        if (lqip) {
+          // 使用占位符作为 LQIP 背景，插入真实 <img> 后淡入，最后移除包装
+          try { placeholder.innerHTML = ''; } catch {}
+          placeholder.classList.add('lqip-holder');
+          // 将 LQIP 传递给 <img>，以便懒加载包装器识别
+          try { node.setAttribute('data-lqip', lqip); } catch {}
+          placeholder.appendChild(node);
+          // 仅作用于该占位节点，避免全局重新扫描
+          applyGlobalLazyLoading(placeholder);
+          applyLanguageIfNeeded(placeholder);
+          const img = node;
+          const unwrap = () => {
+            try { placeholder.style.backgroundImage = 'none'; placeholder.style.filter = 'none'; } catch {}
+            // 等待过渡结束后再移除包装（保留一次微小延时）
+            setTimeout(() => { if (placeholder.parentNode) placeholder.replaceWith(img); }, 120);
+          };
+          if (img.complete) unwrap();
+          else { img.addEventListener('load', unwrap, { once: true }); img.addEventListener('error', unwrap, { once: true }); }
         } else {
-          placeholder.outerHTML = ck.html;
+          placeholder.replaceWith(node);
           applyGlobalLazyLoading(contentEl);
           applyLanguageIfNeeded(contentEl);
         }
       } else {
-        const wrap = document.createElement('div'); wrap.innerHTML = ck.html; contentEl.appendChild(wrap);
-        applyGlobalLazyLoading(wrap); applyLanguageIfNeeded(wrap);
+        placeholder.outerHTML = html;
+        applyGlobalLazyLoading(contentEl);
+        applyLanguageIfNeeded(contentEl);
       }
+    } else {
+      const wrap = document.createElement('div'); wrap.innerHTML = html; contentEl.appendChild(wrap);
+      applyGlobalLazyLoading(wrap); applyLanguageIfNeeded(wrap);
     }
+  };
+  const streamed = await fetchChunks(slug, imageIndices, chunkHashes, applyImageChunk);
+  await Promise.all(imageIndices.filter(i => !streamed.has(i)).map(async (i) => {
+    const ck = await api(chunkUrl(i), { cacheKey: `post-chunk:${slug}:${i}`, bustOn304: false });
+    if (ck && ck.html != null) applyImageChunk(i, ck.html);
   }));
   // 全部块完成后再挂 TOC，保证出现在右侧目录栏
   try {
@@ -1554,7 +1695,9 @@ async function router(opts = {}) {
 
   // /tags 或 #/tags -> 标签页
   if (path === '/tags' || hash === '#/tags') {
-    // 加载全部文章以统计标签
+    // 优先使用后端预聚合的标签统计；失败时回退为加载全部文章统计
+    const tagStats = await api('/api/tags', { cacheKey: 'tags', bustOn304: true });
+    if (Array.isArray(tagStats)) { renderTagsPage(tagStats); return; }
     await loadPosts({ page: 1, q: '' });
     renderTagsPage();
     return;
@@ -1562,9 +1705,10 @@ async function router(opts = {}) {
 
   // /archive 或 #/archive -> 归档页
   if (path === '/archive' || hash === '#/archive') {
-    // 加载全部文章（不分页）以构建时间轴
-    // 注意：这里复用 loadPosts 但传入较大的 pageSize 以获取所有文章
-    // 或者后端支持 pageSize=-1，目前先传 1000
+    // 优先使用后端预聚合的归档（/api/archive）构建时间轴
+    const archive = await api('/api/archive', { cacheKey: 'archive', bustOn304: true });
+    if (Array.isArray(archive)) { renderArchivePage(archive); return; }
+    // 回退：复用 loadPosts 并传入较大的 pageSize 以获取所有文章
     await loadPosts({ page: 1, pageSize: 1000, q: '' });
     renderArchivePage();
     return;
@@ -1680,24 +1824,50 @@ window.addEventListener('hashchange', () => {
       applyLanguageIfNeeded(document.body);
     }
   } catch {}
-  // 轻量轮询版本变化，触发重新加载（仅在首页列表时刷新，避免详情页被意外跳回主页）
-  setInterval(async () => {
-    try {
-      const path = location.pathname || '/';
-      const hash = location.hash || '';
-      const isHome = path === '/' && (!hash || hash === '#/' || hash.startsWith('#/?'));
-      if (!isHome) return;
-      const v = await api('/api/version');
-      if (v && v.docsVersion != null) {
-        if (state.version != null && state.version !== v.docsVersion) {
-          const { page, q } = parseListParamsFromHash();
-          await loadPosts({ page, q });
-          renderList();
-        }
-        state.version = v.docsVersion;
-      }
-    } catch {}
-  }, 10000);
+  // 版本变化时重新加载列表（仅在首页列表时刷新，避免详情页被意外跳回主页）
+  const isHomeView = () => {
+    const path = location.pathname || '/';
+    const hash = location.hash || '';
+    return path === '/' && (!hash || hash === '#/' || hash.startsWith('#/?'));
+  };
+  const onDocsVersion = async (docsVersion) => {
+    if (docsVersion == null) return;
+    const prev = state.version;
+    state.version = docsVersion;
+    if (prev != null && prev !== docsVersion && isHomeView()) {
+      const { page, q } = parseListParamsFromHash();
+      await loadPosts({ page, q });
+      renderList();
+    }
+  };
+  // 首选服务端推送（SSE，断线由浏览器自动重连）；不支持或连接持续失败时退回 10 秒轮询 /api/version
+  let pollTimer = null;
+  const startPolling = () => {
+    if (pollTimer) return;
+    pollTimer = setInterval(async () => {
+      try {
+        if (!isHomeView()) return;
+        const v = await api('/api/version');
+        if (v) await onDocsVersion(v.docsVersion);
+      } catch {}
+    }, 10000);
+  };
+  if (window.EventSource && !STATIC_EXPORT) {
+    let failures = 0;
+    const es = new EventSource(joinUrl(API_BASE, '/api/events'));
+    const handle = (ev) => {
+      failures = 0;
+      try { onDocsVersion(JSON.parse(ev.data).docsVersion); } catch {}
+    };
+    es.addEventListener('hello', handle);
+    es.addEventListener('docs', handle);
+    es.onerror = () => {
+      // 连续失败（如 CDN 不支持长连接）时放弃推送
+      if (++failures >= 3) { es.close(); startPolling(); }
+    };
+  } else {
+    startPolling();
+  }
 
   // 回到顶部逻辑
   const backToTop = document.getElementById('back-to-top');
@@ -1,11 +1,19 @@
-const CACHE_NAME = 'blog-cache-v1';
-const ASSETS = [
-  '/',
-  '/static/app.css',
-  '/static/app.js',
-  '/static/highlight.min.js',
-  '/static/translate.js'
-];
+const CACHE_NAME = 'blog-cache-v2';
+// 静态资源由页面外壳以内容指纹地址引用（/static/app.<hash>.js），首次访问时缓存
+const ASSETS = ['/'];
+// 指纹地址：内容永不变化，命中缓存后无需再向网络校验
+const FINGERPRINTED = /^\/static\/.+\.[0-9a-f]{10}(\.[^/]+)?$/;
+
+// 去掉指纹后的资源路径；同一资源的旧指纹版本在新版本入缓存后删除
+const logicalPath = (p) => p.replace(/\.[0-9a-f]{10}(?=\.[^/]+$|$)/, '');
+
+function evictOlder(cache, pathname) {
+  const logical = logicalPath(pathname);
+  return cache.keys().then((reqs) => Promise.all(reqs.map((req) => {
+    const p = new URL(req.url).pathname;
+    return p !== pathname && FINGERPRINTED.test(p) && logicalPath(p) === logical ? cache.delete(req) : null;
+  })));
+}
 
 self.addEventListener('install', (e) => {
   self.skipWaiting();
@@ -15,7 +23,12 @@ self.addEventListener('install', (e) => {
 });
 
 self.addEventListener('activate', (e) => {
-  e.waitUntil(self.clients.claim());
+  // 清理旧版本缓存（其中的无指纹资源已不再被外壳引用）
+  e.waitUntil(
+    caches.keys()
+      .then((keys) => Promise.all(keys.filter((k) => k !== CACHE_NAME).map((k) => caches.delete(k))))
+      .then(() => self.clients.claim())
+  );
 });
 
 self.addEventListener('fetch', (e) => {
@@ -29,6 +42,19 @@ self.addEventListener('fetch', (e) => {
   // 忽略 API 请求（API 有自己的缓存策略）
   if (url.pathname.startsWith('/api/')) return;
 
+  if (FINGERPRINTED.test(url.pathname)) {
+    e.respondWith(
+      caches.match(e.request).then((cached) => cached || fetch(e.request).then((networkResp) => {
+        if (networkResp && networkResp.status === 200 && networkResp.type === 'basic') {
+          const clone = networkResp.clone();
+          caches.open(CACHE_NAME).then((cache) => cache.put(e.request, clone).then(() => evictOlder(cache, url.pathname)));
+        }
+        return networkResp;
+      }))
+    );
+    return;
+  }
+
   e.respondWith(
     caches.match(e.request).then((cached) => {
       // Stale-while-revalidate 策略
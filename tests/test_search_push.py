@@ -0,0 +1,124 @@
+"""SearchPushQueue 的端到端测试：本机起一个 http.server 充当搜索引擎推送接口。"""
+from __future__ import annotations
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.search_push import SearchPushQueue, baidu_payload, bing_payload
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with server.lock:
+            server.received.append((time.monotonic(), self.headers.get("Content-Type"), body.decode("utf-8")))
+            status = server.statuses.pop(0) if server.statuses else 200
+        payload = json.dumps({"success": 1}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def endpoint():
+    """返回 (server, url)；server.statuses 依次作为各请求的响应码，用完后一律 200。"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.received = []
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server, f"http://127.0.0.1:{server.server_address[1]}/urls?site=example.com&token=t"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _wait_for(cond, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def test_batches_retries_429_and_skips_repeats(endpoint):
+    server, url = endpoint
+    server.statuses = [429, 200]
+    queue = SearchPushQueue("baidu", url, baidu_payload, batch_limit=10, batch_delay=0.2, backoff=0.3)
+    try:
+        t0 = time.monotonic()
+        assert queue.submit("https://example.com/post/a") == {"ok": True, "queued": True}
+        assert queue.submit("https://example.com/post/b")["queued"]
+        assert queue.submit("https://example.com/post/a")["duplicate"]
+        _wait_for(lambda: queue.pushed == 2)
+
+        # 一个批次：首次 429，退避 backoff 后原样重发
+        assert len(server.received) == 2
+        (t1, ctype, body1), (t2, _, body2) = server.received
+        assert ctype == "text/plain"
+        assert body1 == body2 == "https://example.com/post/a\nhttps://example.com/post/b"
+        assert t1 - t0 >= 0.2
+        assert t2 - t1 >= 0.3
+        assert queue.retries == 1 and queue.failed == 0
+        assert queue.last_result["ok"] and queue.last_result["status"] == 200
+        # 两次请求复用同一条 keep-alive 连接
+        assert queue.connections == 1
+
+        # 已推送的 URL 不再发送；新的 URL 单独成批
+        assert queue.submit("https://example.com/post/b")["duplicate"]
+        assert queue.submit("https://example.com/post/c")["queued"]
+        _wait_for(lambda: queue.pushed == 3)
+        assert [body for _, _, body in server.received[2:]] == ["https://example.com/post/c"]
+        assert queue.duplicates == 2
+        assert queue.pending() == 0
+    finally:
+        queue.stop()
+
+
+def test_splits_batches_at_limit(endpoint):
+    server, url = endpoint
+    queue = SearchPushQueue("bing", url, bing_payload("https://example.com"), batch_limit=2, batch_delay=0.1)
+    try:
+        for name in ("a", "b", "c"):
+            queue.submit(f"https://example.com/post/{name}")
+        _wait_for(lambda: queue.pushed == 3)
+        assert [json.loads(body) for _, _, body in server.received] == [
+            {"siteUrl": "https://example.com", "urlList": ["https://example.com/post/a", "https://example.com/post/b"]},
+            {"siteUrl": "https://example.com", "urlList": ["https://example.com/post/c"]},
+        ]
+        assert server.received[0][1].startswith("application/json")
+    finally:
+        queue.stop()
+
+
+def test_gives_up_on_client_error_and_allows_resubmit(endpoint):
+    server, url = endpoint
+    server.statuses = [400]
+    queue = SearchPushQueue("baidu", url, baidu_payload, batch_limit=10, batch_delay=0.0, backoff=0.1)
+    try:
+        queue.submit("https://example.com/post/a")
+        _wait_for(lambda: queue.failed == 1)
+        # 4xx（429 除外）不重试
+        assert len(server.received) == 1 and queue.retries == 0
+        assert not queue.last_result["ok"]
+
+        # 失败的 URL 移出去重表，可以再次提交
+        assert queue.submit("https://example.com/post/a")["queued"]
+        _wait_for(lambda: queue.pushed == 1)
+        assert len(server.received) == 2
+    finally:
+        queue.stop()